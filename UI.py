@@ -1,14 +1,261 @@
 from PySide6.QtWidgets import (
-    QApplication, QWidget, QPushButton, QLabel, QVBoxLayout, QHBoxLayout, QSpacerItem, QSizePolicy, QComboBox, QLineEdit, QTextEdit, QMessageBox, QFormLayout, QTableWidget, QTableWidgetItem
+    QApplication, QWidget, QPushButton, QLabel, QVBoxLayout, QHBoxLayout, QSpacerItem, QSizePolicy, QComboBox, QLineEdit, QTextEdit, QMessageBox, QFormLayout, QTableView, QProgressBar, QFileDialog, QCheckBox
 )
 from PySide6.QtGui import QIcon, QIntValidator
-from PySide6.QtCore import Qt
-import sys
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, Signal, QAbstractTableModel, QModelIndex
+import sys, csv, io, os, threading, time
 import mysql.connector
 import queries
+from pool import ConnectionPool
+import backend, cache
+from cache import dimension_cache, query_cache
+from columnar import column_store
+from graph import friend_graph
+from leaderboard import leaderboards
+from instrument import monitor
+import initialize as loader
 from initialize import initialize
 from decimal import Decimal
 from datetime import datetime
+from itertools import islice
+
+class ResultModel(QAbstractTableModel):
+    """
+    Read-only table model over raw result rows.
+
+    Rows stay the tuples the query returned and are only turned into text
+    when the view paints them. The view sees them in chunks of CHUNK rows,
+    pulled from `rows` (a list or any iterator, e.g. a cursor) through
+    canFetchMore()/fetchMore() as the user scrolls.
+    """
+    CHUNK = 500
+
+    def __init__(self, columns, rows, formatter=str, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.formatter = formatter
+        self.rows = []
+        self._source = iter(rows)
+        self._exhausted = False
+        self.rows.extend(self._take())
+
+    def _take(self):
+        chunk = list(islice(self._source, self.CHUNK))
+        if len(chunk) < self.CHUNK:
+            self._exhausted = True
+        return chunk
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if not isinstance(row, (list, tuple)):
+            row = (row,)
+        return self.formatter(row[index.column()])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            # the header may still ask for sections of the previous model
+            return self.columns[section] if section < len(self.columns) else None
+        return section + 1
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        chunk = self._take()
+        if not chunk:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(chunk) - 1)
+        self.rows.extend(chunk)
+        self.endInsertRows()
+
+
+class ResultView(QTableView):
+    """Table for query results; column widths are measured on a sample of rows."""
+    SAMPLE_ROWS = 100
+
+    def __init__(self):
+        super().__init__()
+        self.horizontalHeader().setResizeContentsPrecision(self.SAMPLE_ROWS)
+        self.verticalHeader().setResizeContentsPrecision(self.SAMPLE_ROWS)
+
+    def show_rows(self, columns, rows, formatter=str):
+        self._replace_model(ResultModel(columns, rows, formatter, self))
+        self.resizeColumnsToContents()
+
+    def clear_rows(self):
+        self._replace_model(ResultModel([], [], parent=self))
+
+    def _replace_model(self, model):
+        # the old model is owned by the view; free it once Qt is done with it
+        old = self.model()
+        self.setModel(model)
+        if old is not None:
+            old.deleteLater()
+
+
+def format_value(val):
+    # SQLite returns sums of DECIMAL columns as floats
+    if isinstance(val, (Decimal, float)):
+        return f"{float(val):.2f}"
+    if isinstance(val, datetime):
+        return val.strftime("%Y-%m-%d %H:%M:%S")
+    return str(val)
+
+
+class QuerySignals(QObject):
+    finished = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+
+# KILL QUERY statements run here: on the global pool they would wait
+# behind the very queries they are meant to stop
+kill_pool = QThreadPool()
+
+
+class QueryWorker(QRunnable):
+    """Run one queries.q_* function on a pooled connection off the Qt main thread."""
+
+    def __init__(self, pool, fn, args):
+        super().__init__()
+        self.pool = pool
+        self.fn = fn
+        self.args = args
+        self.signals = QuerySignals()
+        # the connection this worker holds, None once it is given back;
+        # a cancel checks it under the lock before interrupting it
+        self.connection_id = None
+        self.connection = None
+        self._lock = threading.Lock()
+        self.cancel_requested = False
+
+    def run(self):
+        try:
+            with self.pool.connection() as connection:
+                with self._lock:
+                    self.connection_id = connection.connection_id
+                    self.connection = connection
+                cursor = queries.PreparedCursor(connection)
+                try:
+                    result = self.fn(cursor, *self.args)
+                finally:
+                    # waits for a cancel in flight, so the connection is not
+                    # back in the pool, serving another query, when it lands
+                    with self._lock:
+                        self.connection_id = None
+                        self.connection = None
+                    try:
+                        cursor.close()
+                    except mysql.connector.Error:
+                        pass
+        except Exception as e:
+            if self.cancel_requested:
+                self.signals.cancelled.emit()
+            else:
+                self.signals.failed.emit(str(e))
+            return
+
+        if self.cancel_requested:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(result)
+
+    def cancel(self):
+        """
+        Interrupt the running statement: with KILL QUERY from another pooled
+        connection on MySQL, in-process on SQLite.
+        """
+        self.cancel_requested = True
+        with self._lock:
+            connection_id, connection = self.connection_id, self.connection
+            if connection_id is None:
+                return
+            if getattr(connection, "dialect", "mysql") == "sqlite":
+                # an embedded database is interrupted in-process
+                connection.interrupt()
+                return
+
+        def kill():
+            try:
+                with self.pool.cursor() as cursor:
+                    with self._lock:
+                        if self.connection_id != connection_id:
+                            # finished meanwhile; the connection may run another query now
+                            return
+                        cursor.execute(f"KILL QUERY {int(connection_id)}")
+            except mysql.connector.Error as err:
+                print("❌ Could not cancel query:", err)
+
+        kill_pool.start(kill)
+
+
+class QueryRunner:
+    """
+    Mixin for the query windows: runs a query on a QueryWorker and shows a
+    busy bar and a Cancel button while it is in flight.
+
+    Expects self.pool, self.run_button and self.result_output.
+    """
+
+    def add_query_controls(self, layout):
+        self.worker = None
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 0)  # busy indicator
+        self.progress.hide()
+        layout.addWidget(self.progress)
+
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_query)
+        self.cancel_button.hide()
+        layout.addWidget(self.cancel_button)
+
+    def start_query(self, fn, args, on_result):
+        if self.worker is not None:
+            return
+        worker = QueryWorker(self.pool, fn, args)
+        worker.signals.finished.connect(on_result)
+        worker.signals.failed.connect(self.query_failed)
+        worker.signals.cancelled.connect(self.query_cancelled)
+        for signal in (worker.signals.finished, worker.signals.failed, worker.signals.cancelled):
+            signal.connect(self.query_done)
+
+        self.worker = worker
+        self.run_button.setEnabled(False)
+        self.progress.show()
+        self.cancel_button.setEnabled(True)
+        self.cancel_button.show()
+        QThreadPool.globalInstance().start(worker)
+
+    def cancel_query(self):
+        if self.worker is not None:
+            self.cancel_button.setEnabled(False)
+            self.worker.cancel()
+
+    def query_done(self, *args):
+        self.worker = None
+        self.run_button.setEnabled(True)
+        self.progress.hide()
+        self.cancel_button.hide()
+
+    def query_failed(self, message):
+        self.result_output.setStyleSheet("color: red")
+        self.result_output.setText(f"Query failed: {message}")
+
+    def query_cancelled(self):
+        self.result_output.setStyleSheet("color: orange")
+        self.result_output.setText("Query cancelled.")
+
 
 class Intro(QWidget):
     def __init__(self):
@@ -30,10 +277,25 @@ class Intro(QWidget):
         layout.addWidget(title)
 
         # Instructions
-        instruction = QLabel("Please input your MySQL login info:")
+        instruction = QLabel("Please input your MySQL login info, or pick a local SQLite file:")
         instruction.setStyleSheet("font-size: 14px;")
         layout.addWidget(instruction)
 
+        # Where the data lives: a MySQL server, or a local SQLite file
+        self.backend_selector = QComboBox()
+        self.backend_selector.addItems(["MySQL server", "SQLite file (offline)"])
+        self.backend_selector.currentIndexChanged.connect(self.update_login_fields)
+        layout.addWidget(self.backend_selector)
+
+        self.host_input = QLineEdit("localhost")
+        self.host_input.setPlaceholderText("Host")
+        layout.addWidget(self.host_input)
+
+        self.path_input = QLineEdit("GameInfo.sqlite3")
+        self.path_input.setPlaceholderText("Database file")
+        self.path_input.hide()
+        layout.addWidget(self.path_input)
+
         # Username input
         self.user_input = QLineEdit()
         self.user_input.setPlaceholderText("Username")
@@ -62,36 +324,50 @@ class Intro(QWidget):
         self.connect_button.clicked.connect(self.try_connect)
         layout.addWidget(self.connect_button)
 
+    def update_login_fields(self):
+        sqlite = self.backend_selector.currentIndex() == 1
+        for widget in (self.host_input, self.user_input, self.pass_input):
+            widget.setVisible(not sqlite)
+        self.path_input.setVisible(sqlite)
+
     def try_connect(self):
-        user = self.user_input.text()
-        password = self.pass_input.text()
+        if self.backend_selector.currentIndex() == 1:
+            store = backend.SQLiteBackend(self.path_input.text() or "GameInfo.sqlite3")
+        else:
+            store = backend.MySQLBackend(self.user_input.text(), self.pass_input.text(),
+                                         self.host_input.text() or "localhost")
 
         try:
-            myConnection = mysql.connector.connect(
-                user=user,
-                password=password,
-                host='localhost',
-            )
-            print("✅ MySQL connected:", myConnection)
+            myConnection = store.connect()
+            print("✅ Connected:", myConnection)
 
             cursorObject = myConnection.cursor()
-            initialize(cursorObject, "GameInfo")
+            # tables of the same foreign-key level load on parallel connections
+            initialize(cursorObject, "GameInfo", connect=store.connect if store.parallel_load else None)
+            myConnection.close()
+
+            # windows and workers borrow connections from here
+            pool = ConnectionPool(
+                min_size=1,
+                max_size=5,
+                connect=lambda: store.connect("GameInfo"),
+            )
 
-            QMessageBox.information(self, "Success", "Connected to MySQL and database initialized successfully!")
+            QMessageBox.information(self, "Success", "Connected and database initialized successfully!")
 
             self.close()
-            self.main_window = MainWindow(myConnection)
+            self.main_window = MainWindow(pool)
             self.main_window.show()
 
         except mysql.connector.Error as err:
-            print("❌ MySQL connection failed:", err)
-            QMessageBox.critical(self, "Connection Error", f"Failed to connect to MySQL:\n{err}")
+            print("❌ Connection failed:", err)
+            QMessageBox.critical(self, "Connection Error", f"Failed to connect:\n{err}")
 
 class MainWindow(QWidget):
-    def __init__(self, connection):
+    def __init__(self, pool):
         super().__init__()
-        # store connection
-        self.connection = connection
+        # store connection pool
+        self.pool = pool
 
         self.setWindowTitle("Games Information Query (IQ) Databases")
         self.setWindowIcon(QIcon("icon.png"))
@@ -128,7 +404,8 @@ class MainWindow(QWidget):
         button_layout = QHBoxLayout()
         self.update_button = QPushButton("Update Dataset")
         self.query_button = QPushButton("Query Information")
-        for button in [self.update_button, self.query_button]:
+        self.performance_button = QPushButton("Performance")
+        for button in [self.update_button, self.query_button, self.performance_button]:
             button.setMinimumWidth(150)
             button.setStyleSheet("""
                 QPushButton {
@@ -146,33 +423,40 @@ class MainWindow(QWidget):
         button_layout.addWidget(self.update_button)
         button_layout.addSpacing(40)
         button_layout.addWidget(self.query_button)
+        button_layout.addSpacing(40)
+        button_layout.addWidget(self.performance_button)
         button_layout.addStretch()
         layout.addLayout(button_layout)
 
         self.update_button.clicked.connect(self.open_update_window)
         self.query_button.clicked.connect(self.open_query_window)
+        self.performance_button.clicked.connect(self.open_performance_window)
 
     def open_update_window(self):
-        self.update_window = UpdateWindow(self, self.connection)
+        self.update_window = UpdateWindow(self, self.pool)
         self.update_window.show()
         self.hide()
 
     def open_query_window(self):
-        self.query_window = QueryWindow(self, self.connection)
+        self.query_window = QueryWindow(self, self.pool)
         self.query_window.show()
         self.hide()
 
+    def open_performance_window(self):
+        self.performance_window = PerformanceWindow(self, self.pool)
+        self.performance_window.show()
+        self.hide()
+
 class UpdateWindow(QWidget):
-    def __init__(self, main_window, connection):
+    def __init__(self, main_window, pool):
         super().__init__()
 
-        # store connection
-        self.connection = connection
+        # store connection pool
+        self.pool = pool
         self.main_window = main_window
-        self.cursor = connection.cursor()
 
         self.setWindowTitle("Update Dataset")
-        self.resize(500, 400)
+        self.resize(600, 700)
 
         layout = QVBoxLayout()
         self.setLayout(layout)
@@ -201,7 +485,29 @@ class UpdateWindow(QWidget):
         self.show_button.clicked.connect(self.show_last_record)
         layout.addWidget(self.show_button)
 
+        # bulk mode: many rows as CSV, pasted or from a file
+        layout.addWidget(QLabel("Or insert many rows as CSV, header line first:"))
+        self.bulk_input = QTextEdit()
+        self.bulk_input.setAcceptRichText(False)
+        self.bulk_input.textChanged.connect(self.forget_csv_file)
+        layout.addWidget(self.bulk_input)
+
+        bulk_buttons = QHBoxLayout()
+        self.file_button = QPushButton("Load CSV File...")
+        self.file_button.clicked.connect(self.choose_csv_file)
+        bulk_buttons.addWidget(self.file_button)
+        self.import_button = QPushButton("Import Rows")
+        self.import_button.clicked.connect(self.import_csv)
+        bulk_buttons.addWidget(self.import_button)
+        layout.addLayout(bulk_buttons)
+
+        self.csv_file = None
+        self.error_view = ResultView()
+        self.error_view.hide()
+        layout.addWidget(self.error_view)
+
         self.status_label = QLabel("")
+        self.status_label.setWordWrap(True)
         layout.addWidget(self.status_label)
 
         back_button = QPushButton("Back")
@@ -237,44 +543,95 @@ class UpdateWindow(QWidget):
             input_field = QLineEdit()
             self.form_layout.addRow(field + ":", input_field)
             self.fields[field] = input_field
-
-    def get_next_id(self, table, id_field):
-        self.cursor.execute(f"SELECT MAX({id_field}) FROM {table}")
-        result = self.cursor.fetchone()
-        return (result[0] or 0) + 1
+        self.bulk_input.setPlaceholderText(",".join(self.fields_map[selected_table]))
 
     def insert_record(self):
         table = self.table_selector.currentText()
         field_values = {field: widget.text() or None for field, widget in self.fields.items()}
 
-        auto_ids = {
-            "Games": "GameID",
-            "Player": "UserID",
-            "Platform": "PlatformID",
-            "Developer": "DeveloperID",
-            "Publisher": "PublisherID",
-            "Achievement": "AchievementID",
-            "DLC": "DLCID"
-        }
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    new_id = "Composed"
+                    if table in loader.ID_SEQUENCES:
+                        id_field, scope_field = loader.ID_SEQUENCES[table]
+                        if scope_field and not field_values[scope_field]:
+                            raise ValueError(f"{scope_field} is required, {id_field} is numbered per {scope_field}.")
+                        new_id = loader.allocate_ids(cursor, table, scope=field_values.get(scope_field))
+                        field_values[id_field] = new_id
+
+                    columns = ", ".join(f"`{k}`" for k in field_values)
+                    placeholders = ", ".join(["%s"] * len(field_values))
+                    values = tuple(field_values.values())
+
+                    query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+
+                    started = time.monotonic()
+                    cursor.execute(query, values)
+                    connection.commit()
+                    cache.inserted(table, list(field_values), [values], started)
+                    self.status_label.setText(f"✅ Inserted into {table} successfully with ID {new_id}.")
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.close()
+        except Exception as e:
+            self.status_label.setText(f"❌ Insert failed: {str(e)}")
 
-        new_id = "Composed"
-        if table in auto_ids:
-            new_id = self.get_next_id(table, auto_ids[table])
-            field_values[auto_ids[table]] = new_id
+    def choose_csv_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Choose CSV File", "", "CSV files (*.csv);;All files (*)")
+        if not path:
+            return
+        # the file is streamed at import time rather than pasted into the editor
+        self.bulk_input.clear()
+        self.csv_file = path
+        self.status_label.setText(f"Ready to import {os.path.basename(path)}; paste rows instead to discard it.")
 
-        columns = ", ".join(f"`{k}`" for k in field_values)
-        placeholders = ", ".join(["%s"] * len(field_values))
-        values = tuple(field_values.values())
+    def forget_csv_file(self):
+        if self.bulk_input.toPlainText():
+            self.csv_file = None
 
-        query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+    def import_csv(self):
+        table = self.table_selector.currentText()
+        self.error_view.clear_rows()
+        self.error_view.hide()
 
         try:
-            self.cursor.execute(query, values)
-            self.connection.commit()
-            self.status_label.setText(f"✅ Inserted into {table} successfully with ID {new_id}.")
+            if self.csv_file:
+                path, self.csv_file = self.csv_file, None
+                header, rows = loader.csv_rows(path)
+            else:
+                rows = csv.reader(io.StringIO(self.bulk_input.toPlainText().strip()))
+                header = next(rows, None)
+                if header is None:
+                    self.status_label.setText("❌ Paste CSV rows or choose a file first.")
+                    return
+            header = [col.strip() for col in header]
+
+            with self.pool.connection() as connection:
+                cursor = monitor.cursor(connection.cursor(), source="import")
+                try:
+                    report = loader.import_rows(cursor, table, header, rows, self.fields_map[table])
+                finally:
+                    cursor.close()
         except Exception as e:
-            self.connection.rollback()
-            self.status_label.setText(f"❌ Insert failed: {str(e)}")
+            self.status_label.setText(f"❌ Import failed: {str(e)}")
+            return
+
+        message = f"Inserted {report['inserted']} rows into {table}"
+        # achievement and DLC IDs are numbered per game, so one range would mislead
+        if report["first_id"] is not None and not loader.ID_SEQUENCES[table][1]:
+            message += f" with IDs {report['first_id']} to {report['last_id']}"
+        message = ("✅ " if not report["errors"] else "⚠️ ") + message + "."
+        if report["errors"]:
+            message += f" {len(report['errors'])} rows were rejected, listed above by line number."
+            self.error_view.show_rows(["Line", "Error"], report["errors"])
+            self.error_view.show()
+        else:
+            self.bulk_input.clear()
+        self.status_label.setText(message)
 
     def show_last_record(self):
         table = self.table_selector.currentText()
@@ -289,13 +646,14 @@ class UpdateWindow(QWidget):
         }
 
         try:
-            if table in primary_keys:
-                pk = primary_keys[table]
-                self.cursor.execute(f"SELECT * FROM {table} ORDER BY {pk} DESC LIMIT 1")
-            else:
-                self.cursor.execute(f"SELECT * FROM {table} ORDER BY 1 DESC LIMIT 1")
-
-            row = self.cursor.fetchone()
+            with self.pool.cursor(buffered=True) as cursor:
+                if table in primary_keys:
+                    pk = primary_keys[table]
+                    cursor.execute(f"SELECT * FROM {table} ORDER BY {pk} DESC LIMIT 1")
+                else:
+                    cursor.execute(f"SELECT * FROM {table} ORDER BY 1 DESC LIMIT 1")
+
+                row = cursor.fetchone()
             if row:
                 QMessageBox.information(self, "Last Inserted Record", str(row))
             else:
@@ -308,11 +666,11 @@ class UpdateWindow(QWidget):
         self.close()
 
 class QueryWindow(QWidget):
-    def __init__(self, main_window, connection):
+    def __init__(self, main_window, pool):
         super().__init__()
 
-        # store connection
-        self.connection = connection
+        # store connection pool
+        self.pool = pool
 
         self.setWindowTitle("Query Interface")
         self.resize(400, 300)
@@ -350,31 +708,30 @@ class QueryWindow(QWidget):
         self.close()
     
     def open_platform_query_window(self):
-        self.platform_query_window = PlatformQueryWindow(self, self.connection)
+        self.platform_query_window = PlatformQueryWindow(self, self.pool)
         self.platform_query_window.show()
         self.close()
 
     def open_game_query_window(self):
-        self.platform_query_window = GamesQueryWindow(self, self.connection)
+        self.platform_query_window = GamesQueryWindow(self, self.pool)
         self.platform_query_window.show()
         self.close()
     
     def open_dev_pub_query_window(self):
-        self.platform_query_window = DevPubQueryWindow(self, self.connection)
+        self.platform_query_window = DevPubQueryWindow(self, self.pool)
         self.platform_query_window.show()
         self.close()
 
     def open_user_query_window(self):
-        self.platform_query_window = UserQueryWindow(self, self.connection)
+        self.platform_query_window = UserQueryWindow(self, self.pool)
         self.platform_query_window.show()
         self.close()
 
-class PlatformQueryWindow(QWidget):
-    def __init__(self, main_window, connection):
+class PlatformQueryWindow(QueryRunner, QWidget):
+    def __init__(self, main_window, pool):
         super().__init__()
 
-        self.connection = connection
-        self.cursor = connection.cursor()
+        self.pool = pool
         self.main_window = main_window
 
         self.setWindowTitle("Platform Queries")
@@ -404,13 +761,14 @@ class PlatformQueryWindow(QWidget):
         self.run_button = QPushButton("Run Query")
         self.run_button.clicked.connect(self.run_query)
         layout.addWidget(self.run_button)
+        self.add_query_controls(layout)
 
         self.result_output = QLabel()
         self.result_output.setStyleSheet("color: red")
         self.result_output.setText("")
         layout.addWidget(self.result_output) 
 
-        self.table_output = QTableWidget()
+        self.table_output = ResultView()
         layout.addWidget(self.table_output)
 
         back_button = QPushButton("Back")
@@ -425,16 +783,20 @@ class PlatformQueryWindow(QWidget):
 
         # All use platform dropdown
         platform_combo = QComboBox()
-        self.cursor.execute("SELECT DISTINCT PlatformName FROM Platform")
-        platforms = [row[0] for row in self.cursor.fetchall()]
+        platforms = dimension_cache.values(self.pool, "platform")
         platform_combo.addItems(platforms)
         self.input_widgets['platform'] = platform_combo
         self.form_layout.addRow("Platform:", platform_combo)
 
-        if idx == 1:
+        if idx == 0:
+            limit_edit = QLineEdit("20")
+            limit_edit.setValidator(QIntValidator(1, 100000))
+            limit_edit.setPlaceholderText("Most games to list")
+            self.input_widgets['limit'] = limit_edit
+            self.form_layout.addRow("Limit:", limit_edit)
+        elif idx == 1:
             year_combo = QComboBox()
-            self.cursor.execute("SELECT DISTINCT YEAR(IssuedTime) FROM Platform_Support_Games ORDER BY YEAR(IssuedTime) DESC")
-            years = [str(row[0]) for row in self.cursor.fetchall() if row[0] is not None]
+            years = dimension_cache.values(self.pool, "year")
             year_combo.addItems(years)
             self.input_widgets['year'] = year_combo
             self.form_layout.addRow("Year:", year_combo)
@@ -451,75 +813,58 @@ class PlatformQueryWindow(QWidget):
 
     def run_query(self):
         idx = self.query_selector.currentIndex()
-        try:
-            platform = self.input_widgets['platform'].currentText()
-            self.result_output.setText("")
-            self.table_output.clear()
-            self.table_output.setRowCount(0)
-            self.table_output.setColumnCount(0)
-
-            if idx == 0:
-                # 0. Find exclusive games on a platform
-                results = queries.q_platform_exclusive_games(self.cursor, platform)
-                columns = ["Exclusive Game Title"]
-
-                if not results:
-                    self.result_output.setStyleSheet("color: orange")
-                    self.result_output.setText("No exclusive games found.")
-                    return
+        platform = self.input_widgets['platform'].currentText()
+        self.result_output.setText("")
+        self.table_output.clear_rows()
 
-                self.table_output.setColumnCount(len(columns))
-                self.table_output.setHorizontalHeaderLabels(columns)
-                self.table_output.setRowCount(len(results))
+        if idx == 0:
+            # 0. Find exclusive games on a platform
+            limit = int(self.input_widgets['limit'].text() or 20)
+            self.start_query(queries.q_platform_exclusive_games, (platform, limit), self.show_exclusive_games)
 
-                for i, row in enumerate(results):
-                    item = QTableWidgetItem(str(row[0]))
-                    self.table_output.setItem(i, 0, item)
+        elif idx == 1:
+            # 1. Revenue estimation
+            year = self.input_widgets['year'].currentText()
+            self.start_query(queries.q_platform_revenue, (platform, year), self.show_revenue)
 
-            elif idx == 1:
-                # 1. Revenue estimation
-                year = self.input_widgets['year'].currentText()
-                result = queries.q_platform_revenue(self.cursor, platform, year)
+        elif idx == 2:
+            # 2. Number of users who played more than X hours
+            hours = self.input_widgets['hours'].text()
+            if not hours.isdigit():
+                self.result_output.setStyleSheet("color: red")
+                self.result_output.setText("Please enter a valid number for hours.")
+                return
+            self.start_query(queries.q_platform_user, (platform, hours), self.show_user_count)
 
-                if not result or result[0] is None:
-                    self.result_output.setStyleSheet("color: orange")
-                    self.result_output.setText("No revenue result found.")
-                    return
+    def show_exclusive_games(self, results):
+        columns = ["Exclusive Game Title"]
 
-                columns = ["Estimated Revenue"]
-                self.table_output.setColumnCount(1)
-                self.table_output.setHorizontalHeaderLabels(columns)
-                self.table_output.setRowCount(1)
-                self.table_output.setItem(0, 0, QTableWidgetItem(str(result[0])))
+        if not results:
+            self.result_output.setStyleSheet("color: orange")
+            self.result_output.setText("No exclusive games found.")
+            return
 
-            elif idx == 2:
-                # 2. Number of users who played more than X hours
-                hours = self.input_widgets['hours'].text()
-                if not hours.isdigit():
-                    self.result_output.setStyleSheet("color: red")
-                    self.result_output.setText("Please enter a valid number for hours.")
-                    return
+        self.table_output.show_rows(columns, results)
 
-                result = queries.q_platform_user(self.cursor, platform, hours)
-                columns = ["Users Played > Hours"]
-                self.table_output.setColumnCount(1)
-                self.table_output.setHorizontalHeaderLabels(columns)
-                self.table_output.setRowCount(1)
-                self.table_output.setItem(0, 0, QTableWidgetItem(str(result[0] if result else 0)))
+    def show_revenue(self, result):
+        if not result or result[0] is None:
+            self.result_output.setStyleSheet("color: orange")
+            self.result_output.setText("No revenue result found.")
+            return
 
-            self.table_output.resizeColumnsToContents()
+        columns = ["Estimated Revenue"]
+        self.table_output.show_rows(columns, [result])
 
-        except Exception as e:
-            self.result_output.setStyleSheet("color: red")
-            self.result_output.setText(f"Query failed: {e}")
+    def show_user_count(self, result):
+        columns = ["Users Played > Hours"]
+        self.table_output.show_rows(columns, [(result[0] if result else 0,)])
 
-class GamesQueryWindow(QWidget):
-    def __init__(self, main_window, connection):
+class GamesQueryWindow(QueryRunner, QWidget):
+    def __init__(self, main_window, pool):
         super().__init__()
 
-        # store connection
-        self.connection = connection
-        self.cursor = connection.cursor()
+        # store connection pool
+        self.pool = pool
 
         self.setWindowTitle("Game Queries")
         self.resize(600, 400)
@@ -557,13 +902,14 @@ class GamesQueryWindow(QWidget):
         self.run_button = QPushButton("Run Query")
         self.run_button.clicked.connect(self.run_query)
         layout.addWidget(self.run_button)
+        self.add_query_controls(layout)
 
         self.result_output = QLabel()
         self.result_output.setStyleSheet("color: red")
         self.result_output.setText("")
         layout.addWidget(self.result_output) 
 
-        self.table_output = QTableWidget()
+        self.table_output = ResultView()
         layout.addWidget(self.table_output)
 
         back_button = QPushButton("Back")
@@ -582,8 +928,7 @@ class GamesQueryWindow(QWidget):
         if idx == 0:
             # 1. platform (QComboBox), top_n (QLineEdit with int validator)
             platform_combo = QComboBox()
-            self.cursor.execute("SELECT DISTINCT PlatformName FROM Platform")
-            platforms = [row[0] for row in self.cursor.fetchall()]
+            platforms = dimension_cache.values(self.pool, "platform")
             platform_combo.addItems(platforms)
 
             top_n_edit = QLineEdit()
@@ -597,8 +942,7 @@ class GamesQueryWindow(QWidget):
         elif idx == 1:
             # 2. genre (QComboBox), order_attri (QComboBox), order (QComboBox)
             genre_combo = QComboBox()
-            self.cursor.execute("SELECT DISTINCT Genre FROM Games")
-            genres = [row[0] for row in self.cursor.fetchall()]
+            genres = dimension_cache.values(self.pool, "genre")
             genre_combo.addItems(genres)
             order_attri_combo = QComboBox()
             order_attri_combo.addItems(['ReleaseDate', 'UnitsSold'])
@@ -625,11 +969,7 @@ class GamesQueryWindow(QWidget):
                 role = search_by_combo.currentText()
                 name_combo.clear()
                 try:
-                    if role == 'Publisher':
-                        self.cursor.execute("SELECT PublisherName FROM Publisher")
-                    else:
-                        self.cursor.execute("SELECT DeveloperName FROM Developer")
-                    names = [row[0] for row in self.cursor.fetchall()]
+                    names = dimension_cache.values(self.pool, "publisher" if role == 'Publisher' else "developer")
                     name_combo.addItems(names)
                 except Exception as e:
                     name_combo.addItem(f"Error: {e}")
@@ -657,7 +997,6 @@ class GamesQueryWindow(QWidget):
 
     def run_query(self):
         idx = self.query_selector.currentIndex()
-        result = None
         columns = []
 
         try:
@@ -670,7 +1009,7 @@ class GamesQueryWindow(QWidget):
                 except Exception:
                     self.result_output.setText("Please enter a valid number for Top N.")
                     return
-                result = queries.q_game_rating(self.cursor, platform, top_n)
+                fn, args = queries.q_game_rating, (platform, top_n)
                 columns = ["Game Name", "Rating"]
 
             elif idx == 1:
@@ -678,7 +1017,7 @@ class GamesQueryWindow(QWidget):
                 genre = self.input_widgets['genre'].currentText()
                 order_attri = self.input_widgets['order_attri'].currentText()
                 order = self.input_widgets['order'].currentText()
-                result = queries.q_game_genre(self.cursor, genre, order_attri, order)
+                fn, args = queries.q_game_genre, (genre, order_attri, order)
                 columns = ["Game Name", "Genre", "Attribute Value"]
 
             elif idx == 2:
@@ -687,7 +1026,7 @@ class GamesQueryWindow(QWidget):
                 name = self.input_widgets['name'].currentText()
                 publisher = name if search_by == 'Publisher' else None
                 developer = name if search_by == 'Developer' else None
-                result = queries.q_game_pub_dev(self.cursor, publisher=publisher, developer=developer)
+                fn, args = queries.q_game_pub_dev, (publisher, developer)
                 columns = ["Game Name", "Publisher/Developer"]
 
             elif idx == 3:
@@ -698,50 +1037,43 @@ class GamesQueryWindow(QWidget):
                 except Exception:
                     self.result_output.setText("Please enter a valid year.")
                     return
-                result = queries.q_game_year(self.cursor, year)
-                columns = ["Game Name", "Release Year", "Platform", "Developer", "Publisher"]
+                fn, args = queries.q_game_year, (year,)
+                columns = ["Game Name", "Release Date", "Platforms", "Developers", "Publishers"]
 
             elif idx == 4:
                 # Genre average rating/units sold
                 type_val = self.input_widgets['type'].currentText()
-                result = queries.q_genre_avg_rating(self.cursor, type=type_val)
+                fn, args = queries.q_genre_avg_rating, (type_val,)
                 columns = ["Genre", f"Average {type_val}"]
 
-            # ==== Display table ====
-            if hasattr(result, "fetchall"):
-                rows = result.fetchall()
             else:
-                rows = result
-
-            if not rows:
-                self.result_output.setText("No results found.")
-                self.table_output.clear()
-                self.table_output.setRowCount(0)
-                self.table_output.setColumnCount(0)
                 return
 
-            self.table_output.clear()
-            self.table_output.setRowCount(len(rows))
-            self.table_output.setColumnCount(len(columns))
-            self.table_output.setHorizontalHeaderLabels(columns)
-
-            for i, row in enumerate(rows):
-                for j, value in enumerate(row):
-                    item = QTableWidgetItem(str(value))
-                    self.table_output.setItem(i, j, item)
-
-            self.table_output.resizeColumnsToContents()
-            self.result_output.clear()
+            self.start_query(fn, args, lambda rows: self.show_rows(rows, columns))
 
         except Exception as e:
             self.result_output.setText(f"An error occurred:\n{str(e)}")
 
-class UserQueryWindow(QWidget):
-    def __init__(self, main_window, connection):
+    def show_rows(self, result, columns):
+        # ==== Display table ====
+        if hasattr(result, "fetchall"):
+            rows = result.fetchall()
+        else:
+            rows = result
+
+        if not rows:
+            self.result_output.setText("No results found.")
+            self.table_output.clear_rows()
+            return
+
+        self.table_output.show_rows(columns, rows)
+        self.result_output.clear()
+
+class UserQueryWindow(QueryRunner, QWidget):
+    def __init__(self, main_window, pool):
         super().__init__()
 
-        self.connection = connection
-        self.cursor = connection.cursor()
+        self.pool = pool
         self.setWindowTitle("User Queries")
         self.resize(600, 400)
         self.main_window = main_window
@@ -758,7 +1090,12 @@ class UserQueryWindow(QWidget):
             "2. Top N players by playtime of a game",
             "3. Total money spent by a player",
             "4. All purchases of a player",
-            "5. List friends with mutual time above threshold"
+            "5. List friends with mutual time above threshold",
+            "6. Players within N friendship hops",
+            "7. Friends within N hops who play a game",
+            "8. Mutual friends of two players",
+            "9. Profile of a player",
+            "10. Rank of a player in a game"
         ])
         layout.addWidget(self.query_selector)
 
@@ -772,13 +1109,14 @@ class UserQueryWindow(QWidget):
         self.run_button = QPushButton("Run Query")
         self.run_button.clicked.connect(self.run_query)
         layout.addWidget(self.run_button)
+        self.add_query_controls(layout)
 
         self.result_output = QLabel()
         self.result_output.setStyleSheet("color: red")
         self.result_output.setText("")
         layout.addWidget(self.result_output) 
 
-        self.table_output = QTableWidget()
+        self.table_output = ResultView()
         layout.addWidget(self.table_output)
 
         back_button = QPushButton("Back")
@@ -813,7 +1151,7 @@ class UserQueryWindow(QWidget):
             self.form_layout.addRow("User ID:", user_id_edit)
             self.input_widgets['user_id'] = user_id_edit
 
-        elif idx == 3:  # user_id only, no top_n
+        elif idx in [3, 8]:  # user_id only, no top_n
             user_id_edit = QLineEdit()
             user_id_edit.setValidator(QIntValidator(1, 100000))
             user_id_edit.setPlaceholderText("Enter User ID")
@@ -833,6 +1171,42 @@ class UserQueryWindow(QWidget):
             self.form_layout.addRow("Mutual Time ≥ :", mutual_time_edit)
             self.input_widgets['user_id'] = user_id_edit
             self.input_widgets['mutual_time'] = mutual_time_edit
+        elif idx in [5, 6, 7, 9]:
+            user_id_edit = QLineEdit()
+            user_id_edit.setValidator(QIntValidator(1, 100000))
+            user_id_edit.setPlaceholderText("Enter User ID")
+            self.form_layout.addRow("User ID:", user_id_edit)
+            self.input_widgets['user_id'] = user_id_edit
+
+            if idx == 7:
+                other_id_edit = QLineEdit()
+                other_id_edit.setValidator(QIntValidator(1, 100000))
+                other_id_edit.setPlaceholderText("Enter the other User ID")
+                self.form_layout.addRow("Other User ID:", other_id_edit)
+                self.input_widgets['other_id'] = other_id_edit
+                return
+
+            if idx in [6, 9]:
+                game_id_edit = QLineEdit()
+                game_id_edit.setValidator(QIntValidator(1, 100000))
+                game_id_edit.setPlaceholderText("Enter Game ID")
+                self.form_layout.addRow("Game ID:", game_id_edit)
+                self.input_widgets['game_id'] = game_id_edit
+                if idx == 9:
+                    return
+
+            hops_edit = QLineEdit("2")
+            hops_edit.setValidator(QIntValidator(1, 6))
+            hops_edit.setPlaceholderText("Hops (1-6)")
+            self.form_layout.addRow("Hops:", hops_edit)
+            self.input_widgets['hops'] = hops_edit
+
+            if idx == 5:
+                mutual_time_edit = QLineEdit("0")
+                mutual_time_edit.setValidator(QIntValidator(0, 100000))
+                mutual_time_edit.setPlaceholderText("Minimum Mutual Time")
+                self.form_layout.addRow("Mutual Time ≥ :", mutual_time_edit)
+                self.input_widgets['mutual_time'] = mutual_time_edit
 
     def go_back(self):
         self.main_window.show()
@@ -840,72 +1214,93 @@ class UserQueryWindow(QWidget):
 
     def run_query(self):
         idx = self.query_selector.currentIndex()
-        result = []
         columns = []
 
         try:
             if idx == 0:
                 game_id = int(self.input_widgets['game_id'].text())
                 top_n = int(self.input_widgets['top_n'].text())
-                result = queries.q_user_achievements_by_game(self.cursor, game_id, top_n)
+                fn, args = queries.q_user_achievements_by_game, (game_id, top_n)
                 columns = ["Player ID", "Achievements Unlocked"]
 
             elif idx == 1:
                 game_id = int(self.input_widgets['game_id'].text())
                 top_n = int(self.input_widgets['top_n'].text())
-                result = queries.q_user_top_playtime_by_game(self.cursor, game_id, top_n)
+                fn, args = queries.q_user_top_playtime_by_game, (game_id, top_n)
                 columns = ["Player Name", "Total Playtime (hrs)"]
 
             elif idx == 2:
                 user_id = int(self.input_widgets['user_id'].text())
-                result = queries.q_user_total_spent(self.cursor, user_id)
+                fn, args = queries.q_user_total_spent, (user_id,)
                 columns = ["Total Spent ($)"]
 
             elif idx == 3:
                 user_id = int(self.input_widgets['user_id'].text())
-                result = queries.q_user_purchases(self.cursor, user_id)
+                fn, args = queries.q_user_purchases, (user_id,)
                 columns = ["Game", "Platform", "Price ($)", "Purchase Time"]
 
             elif idx == 4:
                 user_id = int(self.input_widgets['user_id'].text())
                 min_time = int(self.input_widgets['mutual_time'].text())
-                result = queries.q_user_friends_by_mutualtime(self.cursor, user_id, min_time)
+                fn, args = queries.q_user_friends_by_mutualtime, (user_id, min_time)
                 columns = ["Friend ID", "Name", "Email", "Region", "Mutual Time (min)"]
 
-            self.table_output.clear()
-            self.table_output.setRowCount(0)
-            self.table_output.setColumnCount(0)
+            elif idx == 5:
+                user_id = int(self.input_widgets['user_id'].text())
+                hops = int(self.input_widgets['hops'].text())
+                min_time = int(self.input_widgets['mutual_time'].text() or 0)
+                fn, args = queries.q_user_friends_within, (user_id, hops, min_time)
+                columns = ["Player ID", "Name", "Region", "Hops"]
 
-            if not result:
-                self.result_output.setStyleSheet("color: orange")
-                self.result_output.setText("No results found.")
-                return
+            elif idx == 6:
+                user_id = int(self.input_widgets['user_id'].text())
+                game_id = int(self.input_widgets['game_id'].text())
+                hops = int(self.input_widgets['hops'].text())
+                fn, args = queries.q_user_friends_playing, (user_id, game_id, hops)
+                columns = ["Player ID", "Name", "Hops", "Total Playtime (hrs)"]
+
+            elif idx == 7:
+                user_id = int(self.input_widgets['user_id'].text())
+                other_id = int(self.input_widgets['other_id'].text())
+                fn, args = queries.q_user_mutual_friends, (user_id, other_id)
+                columns = ["Player ID", "Name", "Region"]
+
+            elif idx == 8:
+                user_id = int(self.input_widgets['user_id'].text())
+                fn, args = queries.q_user_profile, (user_id,)
+                columns = ["Player ID", "Name", "Total Spent ($)", "Total Playtime (hrs)", "Games Owned",
+                           "Achievements", "Last Activity"]
 
-            self.result_output.setText("")
-            self.table_output.setColumnCount(len(columns))
-            self.table_output.setHorizontalHeaderLabels(columns)
-            self.table_output.setRowCount(len(result))
+            elif idx == 9:
+                user_id = int(self.input_widgets['user_id'].text())
+                game_id = int(self.input_widgets['game_id'].text())
+                fn, args = queries.q_user_game_rank, (game_id, user_id)
+                columns = ["Leaderboard", "Score", "Rank", "Players"]
 
-            for i, row in enumerate(result):
-                for j, val in enumerate(row if isinstance(row, (list, tuple)) else [row]):
-                    if isinstance(val, Decimal):
-                        val = f"{float(val):.2f}"
-                    elif isinstance(val, datetime):
-                        val = val.strftime("%Y-%m-%d %H:%M:%S")
-                    item = QTableWidgetItem(str(val))
-                    self.table_output.setItem(i, j, item)
+            else:
+                return
 
-            self.table_output.resizeColumnsToContents()
+            self.start_query(fn, args, lambda result: self.show_rows(result, columns))
 
         except Exception as e:
             self.result_output.setStyleSheet("color: red")
             self.result_output.setText(f"Query failed: {e}")
 
-class DevPubQueryWindow(QWidget):
-    def __init__(self, main_window, connection):
+    def show_rows(self, result, columns):
+        self.table_output.clear_rows()
+
+        if not result:
+            self.result_output.setStyleSheet("color: orange")
+            self.result_output.setText("No results found.")
+            return
+
+        self.result_output.setText("")
+        self.table_output.show_rows(columns, result, format_value)
+
+class DevPubQueryWindow(QueryRunner, QWidget):
+    def __init__(self, main_window, pool):
         super().__init__()
-        self.connection = connection
-        self.cursor = connection.cursor()
+        self.pool = pool
         self.main_window = main_window
 
         self.setWindowTitle("Developer / Publisher Queries")
@@ -935,13 +1330,14 @@ class DevPubQueryWindow(QWidget):
         self.run_button = QPushButton("Run Query")
         self.run_button.clicked.connect(self.run_query)
         layout.addWidget(self.run_button)
+        self.add_query_controls(layout)
 
         self.result_output = QLabel()
         self.result_output.setStyleSheet("color: red")
         self.result_output.setText("")
         layout.addWidget(self.result_output) 
 
-        self.table_output = QTableWidget()
+        self.table_output = ResultView()
         layout.addWidget(self.table_output)
 
         back_button = QPushButton("Back")
@@ -991,7 +1387,6 @@ class DevPubQueryWindow(QWidget):
     def run_query(self):
         idx = self.query_selector.currentIndex()
         role = self.input_widgets["role"].currentText()
-        result = []
         columns = []
 
         try:
@@ -999,48 +1394,23 @@ class DevPubQueryWindow(QWidget):
                 start_year = int(self.input_widgets["start_year"].text())
                 end_year = int(self.input_widgets["end_year"].text())
                 top_n = int(self.input_widgets["top_n"].text())
-                result = queries.q_dev_pub_revenues(self.cursor, role, start_year, end_year, top_n)
+                fn, args = queries.q_dev_pub_revenues, (role, start_year, end_year, top_n)
                 columns = ["Name", "Total Revenue"]
 
             elif idx == 1:
                 threshold = float(self.input_widgets["rating_threshold"].text())
-                result = queries.q_dev_pub_rating(self.cursor, role, threshold)
+                fn, args = queries.q_dev_pub_rating, (role, threshold)
                 columns = ["Name", "High Rated Games"]
 
             elif idx == 2:
                 threshold = int(self.input_widgets["platform_threshold"].text())
-                result = queries.q_dev_pub_compatibility(self.cursor, role, threshold)
+                fn, args = queries.q_dev_pub_compatibility, (role, threshold)
                 columns = ["Name", "Platform Count"]
 
             else:
-                result = []
-                columns = []
-
-            # ==== Display table ====
-            if hasattr(result, "fetchall"):
-                rows = result.fetchall()
-            else:
-                rows = result
-
-            if not rows:
-                self.result_output.setText("No results found.")
-                self.table_output.clear()
-                self.table_output.setRowCount(0)
-                self.table_output.setColumnCount(0)
                 return
 
-            self.table_output.clear()
-            self.table_output.setRowCount(len(rows))
-            self.table_output.setColumnCount(len(columns))
-            self.table_output.setHorizontalHeaderLabels(columns)
-
-            for i, row in enumerate(rows):
-                for j, value in enumerate(row):
-                    item = QTableWidgetItem(str(value))
-                    self.table_output.setItem(i, j, item)
-
-            self.table_output.resizeColumnsToContents()
-            self.result_output.clear()
+            self.start_query(fn, args, lambda result: self.show_rows(result, columns))
 
         except ValueError:
             self.result_output.setStyleSheet("color: red")
@@ -1049,6 +1419,132 @@ class DevPubQueryWindow(QWidget):
             self.result_output.setStyleSheet("color: red")
             self.result_output.setText(f"Query failed: {e}")
 
+    def show_rows(self, result, columns):
+        # ==== Display table ====
+        if hasattr(result, "fetchall"):
+            rows = result.fetchall()
+        else:
+            rows = result
+
+        if not rows:
+            self.result_output.setText("No results found.")
+            self.table_output.clear_rows()
+            return
+
+        self.table_output.show_rows(columns, rows)
+        self.result_output.clear()
+
+    def go_back(self):
+        self.main_window.show()
+        self.close()
+
+class PerformanceWindow(QWidget):
+    SUMMARY_COLUMNS = ["Source", "Query / Statement", "Calls", "Cache Hits", "Errors", "Slow",
+                       "p50 ms", "p95 ms", "Max ms", "Server ms", "Rows", "Bytes"]
+    SLOW_COLUMNS = ["Time", "Query / Statement", "Wall ms", "Server ms", "Rows", "Arguments"]
+
+    def __init__(self, main_window, pool):
+        super().__init__()
+
+        # store connection pool
+        self.pool = pool
+
+        self.setWindowTitle("Performance")
+        self.resize(1000, 700)
+        self.main_window = main_window
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        self.cache_label = QLabel()
+        self.cache_label.setWordWrap(True)
+        layout.addWidget(self.cache_label)
+
+        form = QFormLayout()
+        self.threshold_input = QLineEdit(str(monitor.threshold_ms))
+        self.threshold_input.setValidator(QIntValidator(0, 3600000))
+        self.threshold_input.editingFinished.connect(self.set_threshold)
+        form.addRow("Slow query threshold (ms):", self.threshold_input)
+        self.column_store_check = QCheckBox("Answer the dashboard aggregates from an in-memory column store")
+        self.column_store_check.setChecked(column_store.enabled)
+        self.column_store_check.setEnabled(column_store.available())
+        if not column_store.available():
+            self.column_store_check.setToolTip("Needs NumPy (pip install numpy).")
+        self.column_store_check.toggled.connect(self.set_column_store)
+        form.addRow("Column store:", self.column_store_check)
+        layout.addLayout(form)
+
+        layout.addWidget(QLabel("Queries and loader statements, slowest first:"))
+        self.summary_output = ResultView()
+        layout.addWidget(self.summary_output)
+
+        layout.addWidget(QLabel(f"Recent slow calls (also logged to {monitor.log_path}):"))
+        self.slow_output = ResultView()
+        layout.addWidget(self.slow_output)
+
+        button_layout = QHBoxLayout()
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset)
+        back_button = QPushButton("Back")
+        back_button.clicked.connect(self.go_back)
+        button_layout.addWidget(refresh_button)
+        button_layout.addWidget(reset_button)
+        button_layout.addWidget(back_button)
+        layout.addLayout(button_layout)
+
+        self.refresh()
+
+    def refresh(self):
+        stats = query_cache.stats()
+        pool_stats = self.pool.stats()
+        columns = column_store.stats()
+        friends = friend_graph.stats()
+        boards = leaderboards.stats()
+        self.cache_label.setText(
+            f"Result cache: {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KB, "
+            f"hit rate {stats['hit_rate']:.0%} ({stats['hits']} hits / {stats['misses']} misses), "
+            f"{stats['evictions']} evictions, {stats['invalidations']} invalidations.    "
+            f"Connections: {pool_stats['in_use']} in use, {pool_stats['idle']} idle of {pool_stats['max_size']}.    "
+            + (f"Column store: {columns['rows']} rows, {columns['bytes'] / 1024:.0f} KB, "
+               f"{columns['loads']} loads, {columns['appended']} rows appended."
+               if columns["enabled"] else "Column store: off.")
+            + (f"    Friend graph: {friends['players']} players, {friends['edges']} friendships "
+               f"(+{friends['overlay']} inserted), {friends['loads']} loads."
+               if friends["enabled"] else "    Friend graph: off.")
+            + f"    Leaderboards: {boards['games']} games ranked ({boards['players']} players), "
+              f"{boards['loads']} loads, {boards['updates']} scores moved."
+        )
+
+        def ms(value):
+            return "" if value is None else f"{value:.2f}"
+
+        self.summary_output.show_rows(self.SUMMARY_COLUMNS, [
+            (r["source"], r["name"], r["calls"], r["cached"], r["errors"], r["slow"], ms(r["p50_ms"]),
+             ms(r["p95_ms"]), ms(r["max_ms"]), ms(r["server_ms"]), r["rows"], r["bytes"])
+            for r in monitor.summary()
+        ], lambda val: "" if val is None else str(val))
+        self.slow_output.show_rows(self.SLOW_COLUMNS, [
+            (e["time"], e["name"], ms(e["wall_ms"]), ms(e.get("server_ms")), e.get("rows"), e.get("args", ""))
+            for e in reversed(monitor.slow_calls)
+        ], lambda val: "" if val is None else str(val))
+
+    def set_threshold(self):
+        if self.threshold_input.text():
+            monitor.threshold_ms = int(self.threshold_input.text())
+
+    def set_column_store(self, checked):
+        column_store.enabled = checked
+        if not checked:
+            # free the snapshot; it is read again when switched back on
+            column_store.clear()
+        self.refresh()
+
+    def reset(self):
+        monitor.reset()
+        self.refresh()
+
     def go_back(self):
         self.main_window.show()
         self.close()
@@ -0,0 +1,338 @@
+"""
+Storage backends: a MySQL server, or an embedded SQLite file for offline use.
+
+Both hand out connections with the mysql.connector interface, so the
+loader, the queries and the pool keep their MySQL SQL. SQLite connections
+translate every statement on the way in (see SQLITE_REWRITES) and raise
+mysql.connector errors, so the existing error handling applies unchanged.
+"""
+import functools, re, sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+
+import mysql.connector
+from mysql.connector import errors
+
+# bytes of the SQLite file read through mmap instead of read() calls
+MMAP_SIZE = 256 * 1024 * 1024
+# page cache per connection, in KiB
+CACHE_KB = 64 * 1024
+# seconds a writer waits for another connection's write lock
+BUSY_TIMEOUT = 30
+
+
+def dialect_of(cursorObject):
+    """'sqlite' for cursors of a SQLite connection, 'mysql' otherwise."""
+    return getattr(cursorObject, "dialect", "mysql")
+
+
+class MySQLBackend:
+    """
+    A MySQL server, as before.
+
+    Parameters:
+    user, password, host: Login of the server account.
+    connect_args: Further mysql.connector.connect() arguments.
+    """
+    name = "mysql"
+    # tables of one foreign-key level load on separate connections
+    parallel_load = True
+
+    def __init__(self, user, password="", host="localhost", **connect_args):
+        self.connect_args = dict(user=user, password=password, host=host, allow_local_infile=True, **connect_args)
+
+    def connect(self, database=None):
+        return mysql.connector.connect(database=database, **self.connect_args)
+
+
+class SQLiteBackend:
+    """
+    A single SQLite file holding the one database.
+
+    Connections use write-ahead logging, so readers never block the writer,
+    and memory-mapped reads. The database name passed around by the rest of
+    the code is ignored: the file is the database.
+
+    Parameters:
+    path: The database file, created on first use.
+    mmap_size: Bytes of the file to memory-map.
+    """
+    name = "sqlite"
+    # SQLite admits one writer at a time; a parallel load would only queue
+    parallel_load = False
+
+    def __init__(self, path, mmap_size=MMAP_SIZE):
+        self.path = path
+        self.mmap_size = mmap_size
+
+    def connect(self, database=None):
+        return SQLiteConnection(self.path, self.mmap_size)
+
+
+def add_arguments(parser, several=False):
+    """Add --backend and the login options of both backends to an argparse parser."""
+    if several:
+        parser.add_argument("--backend", choices=["mysql", "sqlite"], nargs="+", default=["mysql"],
+                            help="run once per backend")
+    else:
+        parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql")
+    parser.add_argument("--sqlite-path", help="SQLite database file (default: DATABASE.sqlite3)")
+    parser.add_argument("--user", help="MySQL account, required for the mysql backend")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--host", default="localhost")
+
+
+def from_args(args, name=None):
+    """Build the backend chosen on the command line; `name` overrides args.backend."""
+    name = name or args.backend
+    if name == "sqlite":
+        return SQLiteBackend(args.sqlite_path or f"{args.database}.sqlite3")
+    if not args.user:
+        raise SystemExit("--user is required for the mysql backend")
+    return MySQLBackend(args.user, args.password, args.host)
+
+
+# MySQL error classes for the sqlite3 ones, most specific first
+ERRORS = [
+    (sqlite3.IntegrityError, errors.IntegrityError),
+    (sqlite3.ProgrammingError, errors.ProgrammingError),
+    (sqlite3.OperationalError, errors.OperationalError),
+    (sqlite3.DataError, errors.DataError),
+    (sqlite3.NotSupportedError, errors.NotSupportedError),
+    (sqlite3.Error, errors.DatabaseError),
+]
+
+
+# MySQL error numbers of the sqlite3 messages callers tell apart
+ERRNOS = [
+    ("no such table", 1146),  # ER_NO_SUCH_TABLE
+    ("unknown database", 1049),  # ER_BAD_DB_ERROR
+]
+
+
+def translate_error(err):
+    errno = next((number for text, number in ERRNOS if str(err).startswith(text)), None)
+    for sqlite_class, mysql_class in ERRORS:
+        if isinstance(err, sqlite_class):
+            return mysql_class(msg=str(err), errno=errno)
+
+
+# Python values stored as the text MySQL would show, and read back by the
+# declared column type
+def _converter(parse):
+    def convert(raw):
+        text = raw.decode()
+        try:
+            return parse(text)
+        except (ValueError, ArithmeticError):
+            # stored unparsed by the loader; MySQL would have rejected it
+            return text
+    return convert
+
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DECIMAL", _converter(Decimal))
+sqlite3.register_converter("DATE", _converter(lambda text: date.fromisoformat(text[:10])))
+sqlite3.register_converter("DATETIME", _converter(datetime.fromisoformat))
+
+
+def _year(value):
+    return None if value is None else int(str(value)[:4])
+
+
+def _timestamp(value):
+    # MySQL's TIMESTAMP(expr): a date or datetime as a datetime
+    if value is None:
+        return None
+    text = str(value)
+    return text + " 00:00:00" if len(text) == 10 else text
+
+
+def _greatest(*values):
+    # NULL if any argument is NULL, like MySQL's GREATEST()
+    return None if None in values else max(values)
+
+
+def _on_conflict(match):
+    # SQLite's upsert names the proposed row `excluded` and takes bare
+    # column names on the left of each assignment
+    assignments = re.sub(r"\bVALUES\((\w+)\)", r"excluded.\1", match.group(1))
+    assignments = re.sub(r"(^|,)(\s*)\w+\.(\w+)(\s*)=", r"\1\2\3\4=", assignments)
+    return "ON CONFLICT DO UPDATE SET" + assignments + match.group(2)
+
+
+def _group_concat(match):
+    # group_concat(X, separator); ordered aggregates need SQLite 3.44
+    if sqlite3.sqlite_version_info >= (3, 44):
+        return f"GROUP_CONCAT({match.group(1)}, {match.group(3)} ORDER BY {match.group(2)})"
+    return f"GROUP_CONCAT({match.group(1)}, {match.group(3)})"
+
+
+def _add_indexes(match):
+    table = match.group(1)
+    return ";".join(f"CREATE INDEX {name} ON {table} ({columns})"
+                    for name, columns in re.findall(r"ADD INDEX (\w+) \(([^)]*)\)", match.group(2)))
+
+
+# (pattern, replacement) applied in order to every statement sent to SQLite,
+# outside its quoted strings and identifiers
+SQLITE_REWRITES = [
+    # the file is the database
+    (r"^\s*(CREATE DATABASE|USE)\b.*$", ""),
+    (r"\bFROM\s+\w+\.(\w+)", r"FROM \1"),
+    (r"^\s*SET UNIQUE_CHECKS\b.*$", ""),
+    (r"^\s*SET FOREIGN_KEY_CHECKS\s*=\s*(\d)\s*$", r"PRAGMA foreign_keys = \1"),
+    # an INT primary key becomes the rowid instead of a second index
+    (r"\bINT PRIMARY KEY\b", "INTEGER PRIMARY KEY"),
+    # triggers whose body is one IF block fire on a WHEN condition instead
+    (r"(FOR EACH ROW)\s+BEGIN\s+IF\s+(.+?)\s+THEN\b(.*?)END IF;\s*END\s*$", r"\1 WHEN \2 BEGIN\3END"),
+    (r"ON DUPLICATE KEY UPDATE(.*?)(;|\Z)", _on_conflict),
+    (r"\bIF\(", "IIF("),
+    (r"\bGROUP_CONCAT\(([^()]*?) ORDER BY ([^()]*?) SEPARATOR ('[^']*')\)", _group_concat),
+    (r"<=>", " IS "),
+    # MySQL's / never truncates, SQLite's does between integers
+    (r"(?<=\s)/(?=\s)", "* 1.0 /"),
+    (r"\bCREATE TEMPORARY TABLE (\w+) LIKE (\w+)", r"CREATE TEMP TABLE \1 AS SELECT * FROM \2 WHERE 0"),
+    (r"\bDROP TEMPORARY TABLE\b", "DROP TABLE"),
+    # multi-table DELETE of one alias
+    (r"^\s*DELETE (\w+) FROM (\w+) \1 (.*)$", r"DELETE FROM \2 WHERE rowid IN (SELECT \1.rowid FROM \2 \1 \3)"),
+    (r"^\s*ALTER TABLE (\w+) ((?:,?\s*ADD INDEX \w+ \([^)]*\))+)\s*$", _add_indexes),
+    (r"^\s*ALTER TABLE \w+ DROP INDEX (\w+)\s*$", r"DROP INDEX \1"),
+    (r"%s", "?"),
+]
+
+
+# string literals and quoted identifiers, which the rewrites must not touch
+QUOTED = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|`[^`]*`", re.S)
+# what stands in for the n-th of them while the rewrites run
+MASKED = re.compile(r"(['\"`])\0(\d+)\0\1")
+
+
+@functools.lru_cache(maxsize=512)
+def translate(sql):
+    """Rewrite one MySQL statement for SQLite; returns the resulting statements."""
+    quoted = []
+
+    def mask(match):
+        quoted.append(match.group())
+        # keeps its quotes, so patterns expecting a literal still match
+        return f"{match.group()[0]}\0{len(quoted) - 1}\0{match.group()[0]}"
+
+    def unmask(text):
+        return MASKED.sub(lambda match: quoted[int(match.group(2))], text)
+
+    sql = QUOTED.sub(mask, sql)
+    for pattern, replacement in SQLITE_REWRITES:
+        sql = re.sub(pattern, replacement, sql, flags=re.S | re.I | re.M)
+    # a trigger body keeps its semicolons, anything else may have become a script
+    if re.match(r"\s*CREATE TRIGGER\b", sql, re.I):
+        return (unmask(sql),)
+    return tuple(unmask(s) for s in (s.strip() for s in sql.split(";")) if s)
+
+
+class SQLiteConnection:
+    """sqlite3 connection with the parts of the mysql.connector interface this project uses."""
+    dialect = "sqlite"
+
+    def __init__(self, path, mmap_size=MMAP_SIZE):
+        try:
+            # connections move between pool borrowers, one thread at a time
+            self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, detect_types=sqlite3.PARSE_DECLTYPES,
+                                         check_same_thread=False)
+            for pragma in ("journal_mode = WAL", "synchronous = NORMAL", f"mmap_size = {int(mmap_size)}",
+                           f"cache_size = {-CACHE_KB}", "temp_store = MEMORY", "foreign_keys = ON"):
+                self._conn.execute(f"PRAGMA {pragma}")
+        except sqlite3.Error as err:
+            raise translate_error(err) from err
+        self._conn.create_function("YEAR", 1, _year, deterministic=True)
+        self._conn.create_function("GREATEST", -1, _greatest, deterministic=True)
+        self._conn.create_function("TIMESTAMP", 1, _timestamp, deterministic=True)
+        # stands in for the server thread id that keys prepared statements
+        self.connection_id = id(self)
+
+    def cursor(self, buffered=None, prepared=None, **kwargs):
+        # SQLite caches compiled statements per connection by itself
+        return SQLiteCursor(self)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def is_connected(self):
+        return self._conn is not None
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        if self._conn is None:
+            raise errors.InterfaceError(msg="Connection is closed")
+
+    def interrupt(self):
+        """Abort the running statement; safe to call from another thread."""
+        self._conn.interrupt()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class SQLiteCursor:
+    dialect = "sqlite"
+    warning_count = 0
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection._conn.cursor()
+
+    def execute(self, sql, params=()):
+        statements = translate(sql)
+        try:
+            for i, statement in enumerate(statements):
+                if statement.upper() == "COMMIT":
+                    self.connection.commit()
+                elif statement.upper() == "ROLLBACK":
+                    self.connection.rollback()
+                else:
+                    # parameters belong to the last statement of a rewritten script
+                    last = i == len(statements) - 1
+                    self._cursor.execute(statement, tuple(params or ()) if last else ())
+        except sqlite3.Error as err:
+            raise translate_error(err) from err
+
+    def executemany(self, sql, rows):
+        statement, = translate(sql)
+        try:
+            self._cursor.executemany(statement, rows)
+        except sqlite3.Error as err:
+            raise translate_error(err) from err
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
@@ -0,0 +1,888 @@
+"""
+Benchmarks for the data loader and the predefined queries.
+
+    python benchmark.py ingest [--scale N] [--batch-size N]
+    python benchmark.py queries --user USER --password PASSWORD [--runs N] [--prepared]
+    python benchmark.py pages --user USER --password PASSWORD [--page-size N]
+    python benchmark.py scale --user USER --password PASSWORD [--scale 10 100 1000] [--output FILE]
+    python benchmark.py columnar --user USER --password PASSWORD [--runs N]
+    python benchmark.py friends --user USER --password PASSWORD [--hops 1 2 3 4] [--users N]
+    python benchmark.py leaderboards --user USER --password PASSWORD [--games N] [--top-n N]
+    python benchmark.py exclusive --user USER --password PASSWORD [--limit N]
+    python benchmark.py year --user USER --password PASSWORD [--points N]
+    python benchmark.py queries --backend mysql sqlite --user USER --password PASSWORD
+
+ingest runs each measurement in a fresh interpreter so its peak RSS is its
+own. queries times every q_* function without and with the secondary
+indexes of initialize.INDEXES. pages walks every *_page variant to the
+end and compares the time of the first and the last page. scale generates
+synthetic data at each scale factor, loads it into a separate database
+through initialize() and reports query latency percentiles as JSON.
+columnar times the aggregate queries in SQL and from the in-memory
+column store (columnar.py), after reporting the cost of its snapshot.
+friends times the k-hop friend search as a recursive CTE and on the
+in-memory friend graph (graph.py) from the best connected players.
+leaderboards times top-N and the rank of a player in the most played
+games, grouped from the base tables and read from the leaderboards
+(leaderboard.py); run it on the synthetic data of scale, whose
+popularity is skewed, to see the large games.
+exclusive times the games exclusive to each platform as NOT IN, as a
+NOT EXISTS anti-join and from the precomputed sole platform of
+Game_Platform_Count, as one --limit page and as the whole list.
+year runs q_game_year from years selecting growing shares of the
+catalog and reports rows and latency per game, which stay flat when
+both grow linearly with the number of games, next to the old fan-out join.
+
+The database benchmarks run once per --backend: a MySQL server, or a
+SQLite file (--sqlite-path, default DATABASE.sqlite3).
+"""
+import argparse, contextlib, csv, json, os, random, resource, statistics, subprocess, sys, tempfile, time
+from datetime import date, datetime, timedelta
+
+import backend
+import initialize
+import queries
+from cache import query_cache
+from columnar import column_store
+from graph import friend_graph
+from leaderboard import leaderboards
+from instrument import monitor
+
+
+class NullCursor:
+    """Cursor stand-in that discards rows, so only client-side ingestion is measured."""
+    rowcount = 0
+
+    def execute(self, sql, params=None):
+        # the loader's savepoints
+        pass
+
+    def executemany(self, sql, rows):
+        self.rowcount = len(rows)
+
+
+def peak_rss_kb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def csv_tables(folder):
+    tables = [f[:-4] for f in os.listdir(folder) if f.endswith('.csv')]
+    return sorted(tables, key=lambda t: initialize.INSERTION_ORDER.index(t))
+
+
+def legacy_ingest(folder, batch_size):
+    # the loader before the streaming pipeline: every file as a list of
+    # dicts, then each table as one list of tuples for a single executemany
+    def clean(val):
+        return None if val == '' else val
+
+    cursor = NullCursor()
+    data_batches = []
+    for table in csv_tables(folder):
+        with open(os.path.join(folder, f"{table}.csv"), newline='', encoding='utf-8') as f:
+            dataset = [{key: clean(value) for key, value in row.items()} for row in csv.DictReader(f)]
+        data_batches.append((table, dataset))
+
+    total = 0
+    for table, dataset in data_batches:
+        columns = dataset[0].keys()
+        values = [tuple(record[col] for col in columns) for record in dataset]
+        cursor.executemany(f"INSERT INTO {table}", values)
+        total += cursor.rowcount
+    return total
+
+
+def stream_ingest(folder, batch_size):
+    cursor = NullCursor()
+    total = 0
+    for table in csv_tables(folder):
+        total += initialize.load_stream(cursor, table, os.path.join(folder, f"{table}.csv"), batch_size)
+    return total
+
+
+INGEST_MODES = {"legacy": legacy_ingest, "stream": stream_ingest}
+
+
+def scale_data(folder, scale, out):
+    """Write every CSV of folder to out with its data rows repeated scale times."""
+    for table in csv_tables(folder):
+        with open(os.path.join(folder, f"{table}.csv"), newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = list(reader)
+        with open(os.path.join(out, f"{table}.csv"), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for _ in range(scale):
+                writer.writerows(rows)
+
+
+def ingest_worker(args):
+    baseline = peak_rss_kb()
+    start = time.perf_counter()
+    rows = INGEST_MODES[args.mode](args.folder, args.batch_size)
+    print(json.dumps({
+        "mode": args.mode,
+        "rows": rows,
+        "seconds": time.perf_counter() - start,
+        "baseline_rss_kb": baseline,
+        "peak_rss_kb": peak_rss_kb(),
+    }))
+
+
+def bench_ingest(args):
+    with tempfile.TemporaryDirectory() as folder:
+        scale_data(args.folder, args.scale, folder)
+        results = []
+        for mode in INGEST_MODES:
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "ingest-worker",
+                 "--mode", mode, "--folder", folder, "--batch-size", str(args.batch_size)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results.append(json.loads(out))
+
+    print(f"{'mode':<8} {'rows':>10} {'seconds':>8} {'peak RSS':>10} {'growth':>10}")
+    for r in results:
+        growth = r["peak_rss_kb"] - r["baseline_rss_kb"]
+        print(f"{r['mode']:<8} {r['rows']:>10} {r['seconds']:>8.2f} "
+              f"{r['peak_rss_kb'] / 1024:>8.1f}MB {growth / 1024:>8.1f}MB")
+
+
+def sample_params(cursor):
+    """Pick busy, representative arguments for the q_* functions from the data."""
+    def one(sql):
+        cursor.execute(sql)
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    return {
+        "platform": one("""
+            SELECT PF.PlatformName FROM Platform PF
+            JOIN Platform_Support_Games PSG ON PSG.PlatformID = PF.PlatformID
+            GROUP BY PF.PlatformID ORDER BY COUNT(*) DESC LIMIT 1
+        """),
+        "issued_year": one("""
+            SELECT YEAR(IssuedTime) FROM Platform_Support_Games
+            GROUP BY YEAR(IssuedTime) ORDER BY COUNT(*) DESC LIMIT 1
+        """),
+        "genre": one("SELECT Genre FROM Games GROUP BY Genre ORDER BY COUNT(*) DESC LIMIT 1"),
+        "publisher": one("""
+            SELECT P.PublisherName FROM Publisher P JOIN Publisher_Games PG ON PG.PublisherID = P.PublisherID
+            GROUP BY P.PublisherID ORDER BY COUNT(*) DESC LIMIT 1
+        """),
+        "developer": one("""
+            SELECT D.DeveloperName FROM Developer D JOIN Developer_Games DG ON DG.DeveloperID = D.DeveloperID
+            GROUP BY D.DeveloperID ORDER BY COUNT(*) DESC LIMIT 1
+        """),
+        "year": one("SELECT YEAR(ReleaseDate) FROM Games ORDER BY ReleaseDate LIMIT 1 OFFSET 100"),
+        "game_id": one("SELECT GameID FROM Player_Platform_Games_Play GROUP BY GameID ORDER BY COUNT(*) DESC LIMIT 1"),
+        "user_id": one("SELECT PlayerID FROM Player_Platform_Games_Play GROUP BY PlayerID ORDER BY COUNT(*) DESC LIMIT 1"),
+        "friend_id": one("SELECT Player1ID FROM Player_Friends GROUP BY Player1ID ORDER BY COUNT(*) DESC LIMIT 1"),
+    }
+
+
+def query_cases(p):
+    """Every predefined query as (label, function, arguments after the cursor)."""
+    cases = [
+        ("q_game_rating", queries.q_game_rating, (p["platform"], 10)),
+        ("q_game_genre", queries.q_game_genre, (p["genre"], "ReleaseDate", "DESC")),
+        ("q_game_pub_dev[Publisher]", queries.q_game_pub_dev, (p["publisher"], None)),
+        ("q_game_pub_dev[Developer]", queries.q_game_pub_dev, (None, p["developer"])),
+        ("q_game_year", queries.q_game_year, (p["year"] or 2000,)),
+        ("q_genre_avg_rating[Rating]", queries.q_genre_avg_rating, ("Rating",)),
+        ("q_genre_avg_rating[UnitsSold]", queries.q_genre_avg_rating, ("UnitsSold",)),
+        ("q_user_achievements_by_game", queries.q_user_achievements_by_game, (p["game_id"], 10)),
+        ("q_user_top_playtime_by_game", queries.q_user_top_playtime_by_game, (p["game_id"], 10)),
+        ("q_user_total_spent", queries.q_user_total_spent, (p["user_id"],)),
+        ("q_user_purchases", queries.q_user_purchases, (p["user_id"],)),
+        ("q_user_friends_by_mutualtime", queries.q_user_friends_by_mutualtime, (p["friend_id"], 0)),
+    ]
+    for role in ("Developer", "Publisher"):
+        cases += [
+            (f"q_dev_pub_revenues[{role}]", queries.q_dev_pub_revenues, (role, 1990, 2030, 10)),
+            (f"q_dev_pub_rating[{role}]", queries.q_dev_pub_rating, (role, 3)),
+            (f"q_dev_pub_compatibility[{role}]", queries.q_dev_pub_compatibility, (role, 1)),
+        ]
+    cases += [
+        ("q_platform_exclusive_games", queries.q_platform_exclusive_games, (p["platform"],)),
+        ("q_platform_revenue", queries.q_platform_revenue, (p["platform"], p["issued_year"] or 2020)),
+        ("q_platform_user", queries.q_platform_user, (p["platform"], 100)),
+    ]
+    return cases
+
+
+def time_queries(cursor, cases, runs):
+    """Return {label: (median milliseconds, row count)} over `runs` calls of each case."""
+    results = {}
+    for label, fn, args in cases:
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            rows = fn(cursor, *args)
+            timings.append((time.perf_counter() - start) * 1000)
+        count = len(rows) if isinstance(rows, list) else int(rows is not None)
+        results[label] = (statistics.median(timings), count)
+    return results
+
+
+def page_cases(p):
+    """Every paginated query as (label, function, arguments after the cursor)."""
+    cases = [
+        ("q_game_genre_page", queries.q_game_genre_page, (p["genre"], "ReleaseDate", "DESC")),
+        ("q_game_pub_dev_page[Publisher]", queries.q_game_pub_dev_page, (p["publisher"], None)),
+        ("q_game_year_page", queries.q_game_year_page, (p["year"] or 2000,)),
+        ("q_user_purchases_page", queries.q_user_purchases_page, (p["user_id"],)),
+        ("q_platform_exclusive_games_page", queries.q_platform_exclusive_games_page, (p["platform"],)),
+    ]
+    for role in ("Developer", "Publisher"):
+        cases += [
+            (f"q_dev_pub_rating_page[{role}]", queries.q_dev_pub_rating_page, (role, 3)),
+            (f"q_dev_pub_compatibility_page[{role}]", queries.q_dev_pub_compatibility_page, (role, 1)),
+        ]
+    return cases
+
+
+def walk_pages(cursor, fn, args, page_size):
+    """Fetch every page; return the milliseconds each page took."""
+    timings, token = [], None
+    while True:
+        start = time.perf_counter()
+        _, token = fn(cursor, *args, page_size=page_size, token=token)
+        timings.append((time.perf_counter() - start) * 1000)
+        if token is None:
+            return timings
+
+
+def backends(args):
+    """Yield (name, backend) for every --backend, with a heading when there are several."""
+    for name in args.backend:
+        if len(args.backend) > 1:
+            print(f"\n== {name} ==", file=sys.stderr if args.command == "scale" else sys.stdout)
+        yield name, backend.from_args(args, name)
+
+
+def bench_queries(args):
+    for name, store in backends(args):
+        run_queries(args, store)
+
+
+def run_queries(args, store):
+    # measure the server, not the caches or the instrumentation
+    query_cache.enabled = False
+    column_store.enabled = False
+    friend_graph.enabled = False
+    monitor.enabled = False
+    conn = store.connect(args.database)
+    cursor = queries.PreparedCursor(conn) if args.prepared else conn.cursor()
+    cases = query_cases(sample_params(cursor))
+
+    initialize.drop_indexes(cursor, args.database)
+    before = time_queries(cursor, cases, args.runs)
+    initialize.create_indexes(cursor, args.database)
+    after = time_queries(cursor, cases, args.runs)
+    conn.close()
+
+    print(f"{'query':<36} {'rows':>6} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for label, _, _ in cases:
+        (b, rows), (a, _) = before[label], after[label]
+        print(f"{label:<36} {rows:>6} {b:>10.2f} {a:>10.2f} {b / a if a else float('inf'):>7.1f}x")
+
+
+# the aggregates column_store answers without the database
+COLUMNAR_QUERIES = ("q_genre_avg_rating", "q_dev_pub_revenues", "q_dev_pub_rating",
+                    "q_dev_pub_compatibility", "q_platform_revenue")
+
+
+def bench_columnar(args):
+    if not column_store.available():
+        raise SystemExit("The column store needs NumPy: pip install numpy")
+    query_cache.enabled = False
+    monitor.enabled = False
+    for name, store in backends(args):
+        conn = store.connect(args.database)
+        cursor = conn.cursor()
+        cases = [case for case in query_cases(sample_params(cursor)) if case[1].__name__ in COLUMNAR_QUERIES]
+
+        column_store.enabled = False
+        sql = time_queries(cursor, cases, args.runs)
+        column_store.enabled = True
+        start = time.perf_counter()
+        column_store.load(cursor)
+        load_ms = (time.perf_counter() - start) * 1000
+        columnar = time_queries(cursor, cases, args.runs)
+        conn.close()
+
+        stats = column_store.stats()
+        print(f"Snapshot: {stats['rows']} rows, {stats['bytes'] / 1024:.0f} KB, loaded in {load_ms:.1f} ms")
+        print(f"{'query':<36} {'rows':>6} {'SQL ms':>10} {'columnar ms':>12} {'speedup':>8}")
+        for label, _, _ in cases:
+            (b, rows), (a, _) = sql[label], columnar[label]
+            print(f"{label:<36} {rows:>6} {b:>10.2f} {a:>12.2f} {b / a if a else float('inf'):>7.1f}x")
+
+
+def bench_friends(args):
+    query_cache.enabled = False
+    monitor.enabled = False
+    for name, store in backends(args):
+        conn = store.connect(args.database)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT UserID FROM (
+                SELECT Player1ID AS UserID FROM Player_Friends UNION ALL SELECT Player2ID FROM Player_Friends
+            ) F GROUP BY UserID ORDER BY COUNT(*) DESC LIMIT %s
+        """, (args.users,))
+        users = [row[0] for row in cursor.fetchall()]
+
+        start = time.perf_counter()
+        friend_graph.load(cursor)
+        load_ms = (time.perf_counter() - start) * 1000
+        stats = friend_graph.stats()
+        print(f"Graph: {stats['players']} players, {stats['edges']} friendships, loaded in {load_ms:.1f} ms")
+        print(f"{'hops':>4} {'reached':>8} {'CTE ms':>10} {'graph ms':>10} {'speedup':>8}")
+        for hops in args.hops:
+            cases = [(f"user {user}", queries.q_user_friends_within, (user, hops)) for user in users]
+            friend_graph.enabled = False
+            sql = time_queries(cursor, cases, args.runs)
+            friend_graph.enabled = True
+            graph = time_queries(cursor, cases, args.runs)
+            # medians per user, summed over the users
+            b, a = sum(sql[label][0] for label, _, _ in cases), sum(graph[label][0] for label, _, _ in cases)
+            reached = statistics.mean(graph[label][1] for label, _, _ in cases) if cases else 0
+            print(f"{hops:>4} {reached:>8.0f} {b:>10.2f} {a:>10.2f} {b / a if a else float('inf'):>7.1f}x")
+        conn.close()
+
+
+# the leaderboard queries as they were before the boards, grouping the base tables
+GROUPED_TOP_PLAYTIME = """
+    SELECT P.UserName, SUM(PPGP.TotalPlayingTime) AS TotalTime
+    FROM Player_Platform_Games_Play PPGP
+    JOIN Player P ON PPGP.PlayerID = P.UserID
+    WHERE PPGP.GameID = %s
+    GROUP BY P.UserID, P.UserName
+    ORDER BY TotalTime DESC
+    LIMIT %s
+"""
+GROUPED_PLAYTIME_RANK = """
+    SELECT COUNT(*) + 1 FROM (
+        SELECT SUM(TotalPlayingTime) AS TotalTime FROM Player_Platform_Games_Play
+        WHERE GameID = %s GROUP BY PlayerID
+    ) S
+    WHERE S.TotalTime > (SELECT SUM(TotalPlayingTime) FROM Player_Platform_Games_Play
+                         WHERE GameID = %s AND PlayerID = %s)
+"""
+
+
+def grouped(sql):
+    def run(cursor, *params):
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    return run
+
+
+def bench_leaderboards(args):
+    query_cache.enabled = False
+    monitor.enabled = False
+    for name, store in backends(args):
+        conn = store.connect(args.database)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT GameID, COUNT(*) FROM Game_Playtime_Board
+            GROUP BY GameID ORDER BY COUNT(*) DESC LIMIT %s
+        """, (args.games,))
+        games = cursor.fetchall()
+
+        print(f"{'game':>8} {'players':>8} {'query':<10} {'grouped ms':>11} {'board ms':>10} {'speedup':>8}")
+        for game_id, players in games:
+            # the leader, a player in the middle and the last of the game
+            cursor.execute("SELECT PlayerID FROM Game_Playtime_Board WHERE GameID = %s ORDER BY TotalTime DESC",
+                           (game_id,))
+            ranked = [row[0] for row in cursor.fetchall()]
+            sample = [ranked[0], ranked[len(ranked) // 2], ranked[-1]]
+
+            start = time.perf_counter()
+            leaderboards.rank(cursor, "playtime", game_id, sample[0])
+            load_ms = (time.perf_counter() - start) * 1000
+            rows = [
+                ("top-N", [(f"top {game_id}", grouped(GROUPED_TOP_PLAYTIME), (game_id, args.top_n))],
+                 [(f"top {game_id}", queries.q_user_top_playtime_by_game, (game_id, args.top_n))]),
+                ("rank", [(f"rank {p}", grouped(GROUPED_PLAYTIME_RANK), (game_id, game_id, p)) for p in sample],
+                 [(f"rank {p}", lambda c, g, p: leaderboards.rank(c, "playtime", g, p), (game_id, p))
+                  for p in sample]),
+            ]
+            for label, before_cases, after_cases in rows:
+                before = time_queries(cursor, before_cases, args.runs)
+                after = time_queries(cursor, after_cases, args.runs)
+                # medians per case, averaged over the sampled players
+                b = statistics.mean(ms for ms, _ in before.values())
+                a = statistics.mean(ms for ms, _ in after.values())
+                print(f"{game_id:>8} {players:>8} {label:<10} {b:>11.3f} {a:>10.3f} "
+                      f"{b / a if a else float('inf'):>7.1f}x")
+            print(f"{'':>8} {'':>8} {'load':<10} {'':>11} {load_ms:>10.3f}")
+        conn.close()
+
+
+# the exclusive games of a platform without Game_Platform_Count.SolePlatformID
+NOT_IN_EXCLUSIVE = """
+    SELECT G.Name
+    FROM Games G
+    JOIN Platform_Support_Games PSG ON G.GameID = PSG.GameID
+    JOIN Platform PF ON PF.PlatformID = PSG.PlatformID
+    WHERE PF.PlatformName = %s
+    AND G.GameID NOT IN (
+        SELECT PSG2.GameID
+        FROM Platform_Support_Games PSG2
+        JOIN Platform PF2 ON PSG2.PlatformID = PF2.PlatformID
+        WHERE PF2.PlatformName <> %s
+    )
+    ORDER BY G.GameID
+    LIMIT %s
+"""
+NOT_EXISTS_EXCLUSIVE = """
+    SELECT G.Name
+    FROM Platform PF
+    JOIN Platform_Support_Games PSG ON PSG.PlatformID = PF.PlatformID
+    JOIN Games G ON G.GameID = PSG.GameID
+    WHERE PF.PlatformName = %s
+    AND NOT EXISTS (
+        SELECT 1 FROM Platform_Support_Games PSG2
+        WHERE PSG2.GameID = PSG.GameID AND PSG2.PlatformID <> PSG.PlatformID
+    )
+    ORDER BY G.GameID
+    LIMIT %s
+"""
+
+
+def bench_exclusive(args):
+    query_cache.enabled = False
+    monitor.enabled = False
+    for name, store in backends(args):
+        conn = store.connect(args.database)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Games")
+        print(f"Catalog: {cursor.fetchone()[0]} games")
+        cursor.execute("""
+            SELECT PF.PlatformName, COUNT(*) FROM Platform PF
+            JOIN Platform_Support_Games PSG ON PSG.PlatformID = PF.PlatformID
+            GROUP BY PF.PlatformID, PF.PlatformName ORDER BY COUNT(*) DESC
+        """)
+        platforms = cursor.fetchall()[:args.platforms]
+
+        def not_in(cursor, platform, limit):
+            cursor.execute(NOT_IN_EXCLUSIVE, (platform, platform, limit))
+            return cursor.fetchall()
+
+        def not_exists(cursor, platform, limit):
+            cursor.execute(NOT_EXISTS_EXCLUSIVE, (platform, limit))
+            return cursor.fetchall()
+
+        def every_page(cursor, platform, limit):
+            # the whole list, read one --limit page at a time
+            rows, token = queries.q_platform_exclusive_games_page(cursor, platform, page_size=args.limit)
+            while token is not None:
+                page, token = queries.q_platform_exclusive_games_page(cursor, platform, page_size=args.limit,
+                                                                      token=token)
+                rows += page
+            return rows
+
+        print(f"{'platform':<24} {'games':>7} {'listed':>7} {'NOT IN ms':>10} {'NOT EXISTS ms':>14} "
+              f"{'sole ms':>8} {'speedup':>8}")
+        for platform, games in platforms:
+            for label, limit, sole in (("", args.limit, queries.q_platform_exclusive_games),
+                                       (" (all)", sys.maxsize, every_page)):
+                cases = [("not in", not_in, (platform, limit)), ("not exists", not_exists, (platform, limit)),
+                         ("sole", sole, (platform, limit))]
+                times = time_queries(cursor, cases, args.runs)
+                (b, rows), (e, _), (a, _) = times["not in"], times["not exists"], times["sole"]
+                print(f"{(platform + label)[:24]:<24} {games:>7} {rows:>7} {b:>10.2f} {e:>14.2f} {a:>8.2f} "
+                      f"{b / a if a else float('inf'):>7.1f}x")
+        conn.close()
+
+
+# q_game_year before it returned one row per game: one row per
+# platform x developer x publisher of every game
+FANOUT_GAME_YEAR = """
+    SELECT G.Name, G.ReleaseDate, PF.PlatformName, D.DeveloperName, P.PublisherName
+    FROM Games as G
+    INNER JOIN Platform_Support_Games as PSG on G.GameID = PSG.GameID
+    INNER JOIN Platform as PF on PSG.PlatformID = PF.PlatformID
+    INNER JOIN Developer_Games as DG on G.GameID = DG.GameID
+    INNER JOIN Developer as D on DG.DeveloperID = D.DeveloperID
+    INNER JOIN Publisher_Games as PG on G.GameID = PG.GameID
+    INNER JOIN Publisher as P on PG.PublisherID = P.PublisherID
+    WHERE G.ReleaseDate >= %s
+    ORDER BY G.ReleaseDate ASC
+"""
+
+
+def bench_year(args):
+    query_cache.enabled = False
+    monitor.enabled = False
+    for name, store in backends(args):
+        conn = store.connect(args.database)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT YEAR(ReleaseDate), COUNT(*) FROM Games WHERE ReleaseDate IS NOT NULL
+            GROUP BY YEAR(ReleaseDate) ORDER BY YEAR(ReleaseDate) DESC
+        """)
+        # the latest year from which at least 1/2^k of the games were released
+        years, total = [], 0
+        per_year = cursor.fetchall()
+        catalog = sum(count for _, count in per_year)
+        targets = [catalog / 2 ** k for k in reversed(range(args.points))]
+        for year, count in per_year:
+            total += count
+            while targets and total >= targets[0]:
+                targets.pop(0)
+                if not years or years[-1][0] != year:
+                    years.append((year, total))
+
+        def fanout(cursor, year):
+            cursor.execute(FANOUT_GAME_YEAR, (f"{year}-01-01",))
+            return cursor.fetchall()
+
+        def first_row_ms(cursor, year):
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                rows = queries.q_game_year_stream(cursor, year)
+                next(rows, None)
+                timings.append((time.perf_counter() - start) * 1000)
+                # read the rest, so the cursor is free for the next statement
+                for _ in rows:
+                    pass
+            return statistics.median(timings)
+
+        print(f"{'from':>6} {'games':>8} {'rows':>8} {'fan-out rows':>13} {'fan-out ms':>11} {'ms':>9} "
+              f"{'us/game':>8} {'first batch ms':>15}")
+        for year, games in years:
+            cases = [("fanout", fanout, (year,)), ("grouped", queries.q_game_year, (year,))]
+            times = time_queries(cursor, cases, args.runs)
+            (b, fan_rows), (a, rows) = times["fanout"], times["grouped"]
+            f = first_row_ms(cursor, year)
+            print(f"{year:>6} {games:>8} {rows:>8} {fan_rows:>13} {b:>11.2f} {a:>9.2f} "
+                  f"{a * 1000 / rows if rows else 0:>8.2f} {f:>15.2f}")
+        conn.close()
+
+
+def bench_pages(args):
+    query_cache.enabled = False
+    monitor.enabled = False
+    for name, store in backends(args):
+        conn = store.connect(args.database)
+        cursor = conn.cursor()
+        cases = page_cases(sample_params(cursor))
+
+        print(f"{'query':<40} {'pages':>6} {'first ms':>9} {'median ms':>10} {'last ms':>8}")
+        for label, fn, fn_args in cases:
+            timings = walk_pages(cursor, fn, fn_args, args.page_size)
+            print(f"{label:<40} {len(timings):>6} {timings[0]:>9.2f} "
+                  f"{statistics.median(timings):>10.2f} {timings[-1]:>8.2f}")
+        conn.close()
+
+
+GENRES = ["Action", "Adventure", "RPG", "Shooter", "Sports", "Strategy",
+          "Simulation", "Puzzle", "Racing", "Fighting", "Platformer", "Horror"]
+REGIONS = ["NA", "EU", "AS", "OC", "SA", "AF"]
+
+
+def zipf_weights(n, s=1.1):
+    """Cumulative Zipf weights over n items; item 0 is the most popular."""
+    total, cumulative = 0.0, []
+    for rank in range(1, n + 1):
+        total += 1 / rank ** s
+        cumulative.append(total)
+    return cumulative
+
+
+class Popularity:
+    """Draw ids with Zipf-skewed frequency, the popular ones spread over the id range."""
+
+    def __init__(self, ids, rng, s=1.1):
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.cumulative = zipf_weights(len(self.ids), s)
+        self.rng = rng
+
+    def draw(self, k=1):
+        return self.rng.choices(self.ids, cum_weights=self.cumulative, k=k)
+
+
+def random_date(rng, start, end):
+    return start + timedelta(days=rng.randrange((end - start).days + 1))
+
+
+def generate_data(folder, out, scale, seed=0):
+    """
+    Write a synthetic data set `scale` times the size of the bundled CSVs.
+
+    Games, players, developers and publishers grow with the scale; the
+    platforms are the bundled ones. Popularity is skewed: a few games get
+    most plays, a few studios make most games, and the number of games per
+    player is heavy-tailed. Every foreign key refers to a generated row.
+    Returns {table: rows written}.
+    """
+    rng = random.Random(seed)
+    first, last = date(1990, 1, 1), date(2025, 12, 31)
+    n_games, n_players = 200 * scale, 100 * scale
+    n_developers, n_publishers = 75 * scale, 29 * scale
+    counts = {}
+
+    with contextlib.ExitStack() as stack:
+        writers = {}
+
+        def write(table, row):
+            if table not in writers:
+                f = stack.enter_context(open(os.path.join(out, f"{table}.csv"), 'w', newline='', encoding='utf-8'))
+                writers[table] = (csv.writer(f), list(initialize.table_columns(table)))
+                writers[table][0].writerow(writers[table][1])
+                counts[table] = 0
+            writer, columns = writers[table]
+            writer.writerow(['' if row.get(c) is None else row[c] for c in columns])
+            counts[table] += 1
+
+        with open(os.path.join(folder, "Platform.csv"), newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                write("Platform", row)
+        platforms = list(range(1, counts["Platform"] + 1))
+
+        for i in range(1, n_developers + 1):
+            write("Developer", {"DeveloperID": i, "DeveloperName": f"Developer {i}", "Country": "United States",
+                                "FoundedYear": rng.randint(1970, 2020), "Website": f"https://dev{i}.example.com/"})
+        for i in range(1, n_publishers + 1):
+            write("Publisher", {"PublisherID": i, "PublisherName": f"Publisher {i}", "Country": "United States",
+                                "FoundedYear": rng.randint(1970, 2020), "Website": f"https://pub{i}.example.com/"})
+
+        developers = Popularity(range(1, n_developers + 1), rng)
+        publishers = Popularity(range(1, n_publishers + 1), rng)
+        genres = Popularity(GENRES, rng, s=0.8)
+        games = {}  # GameID -> (release date, platforms, achievements)
+        for game_id in range(1, n_games + 1):
+            released = random_date(rng, first, last)
+            on = rng.sample(platforms, min(len(platforms), int(rng.paretovariate(2.5))))
+            achievements = rng.randint(5, 55)
+            games[game_id] = (released, on, achievements)
+
+            write("Games", {"GameID": game_id, "Name": f"Game {game_id}", "Genre": genres.draw()[0],
+                            "ReleaseDate": released, "UnitsSold": int(rng.paretovariate(1.2) * 10000),
+                            "RequireAge": rng.choice([None, 3, 7, 12, 16, 18]), "LanguageSupport": "English"})
+            for platform_id in on:
+                issued = min(last, released + timedelta(days=rng.randrange(1000)))
+                write("Platform_Support_Games", {"GameID": game_id, "PlatformID": platform_id,
+                                                 "Price": f"{rng.uniform(5, 70):.2f}", "IssuedTime": issued,
+                                                 "Rating": f"{rng.uniform(1, 5):.1f}"})
+            write("Developer_Games", {"GameID": game_id, "DeveloperID": developers.draw()[0],
+                                      "DevelopeStartYear": released.year - rng.randint(1, 4),
+                                      "DevelopeFinishYear": released.year,
+                                      "DevelopeCost": f"{rng.uniform(1, 100):.2f}"})
+            write("Publisher_Games", {"GameID": game_id, "PublisherID": publishers.draw()[0],
+                                      "PublishYear": released.year, "PublishCost": f"{rng.uniform(1, 100):.2f}"})
+            for achievement_id in range(1, achievements + 1):
+                write("Achievement", {"GameID": game_id, "AchievementID": achievement_id,
+                                      "Name": f"Achievement {achievement_id}"})
+
+        popular_games = Popularity(games, rng, s=1.0)
+        popular_players = Popularity(range(1, n_players + 1), rng)
+        for player_id in range(1, n_players + 1):
+            joined = random_date(rng, date(2010, 1, 1), last)
+            # heavy-tailed: most players own a handful of games, a few own hundreds
+            owned = set(popular_games.draw(min(n_games, int(rng.paretovariate(1.5) * 5))))
+            used = {}
+            for game_id in owned:
+                released, on, achievements = games[game_id]
+                platform_id = rng.choice(on)
+                purchased = datetime.combine(random_date(rng, max(joined, released), last), datetime.min.time())
+                playing = int(rng.paretovariate(1.3) * 60)
+                used[platform_id] = used.get(platform_id, 0) + playing
+                write("Player_Platform_Games_Play", {
+                    "GameID": game_id, "PlatformID": platform_id, "PlayerID": player_id,
+                    "TotalPlayingTime": playing, "PurchaseTime": purchased,
+                    "LastPlayTime": purchased + timedelta(days=rng.randrange(365)),
+                    "PurchasePrice": f"{rng.uniform(5, 70):.2f}",
+                    "Rating": rng.randint(1, 10) if rng.random() < 0.8 else None,
+                })
+                for achievement_id in rng.sample(range(1, achievements + 1),
+                                                 min(achievements, int(rng.paretovariate(1.2)) - 1)):
+                    write("Player_Unlock_Achievement", {"PlayerID": player_id, "GameID": game_id,
+                                                        "AchievementID": achievement_id,
+                                                        "GainTime": random_date(rng, purchased.date(), last)})
+            for platform_id, spent in used.items():
+                write("Player_Use_Platform", {"PlayerID": player_id, "PlatformID": platform_id,
+                                              "RegistrationDate": joined, "TotalTimeSpent": spent})
+            for friend_id in set(popular_players.draw(int(rng.paretovariate(2.0)))) - {player_id}:
+                write("Player_Friends", {"Player1ID": player_id, "Player2ID": friend_id,
+                                         "StartDate": random_date(rng, joined, last),
+                                         "MutualTime": int(rng.paretovariate(1.5) * 100)})
+            write("Player", {"UserID": player_id, "UserName": f"player{player_id}",
+                             "Email": f"player{player_id}@example.com", "Region": rng.choice(REGIONS),
+                             "JoinDate": joined, "Level": rng.randint(1, 100),
+                             "TotalPlayTime": sum(used.values()), "GamesOwned": len(owned)})
+    return counts
+
+
+def percentiles(timings):
+    """p50/p95/p99 of a list of milliseconds."""
+    if len(timings) == 1:
+        return {"p50": timings[0], "p95": timings[0], "p99": timings[0]}
+    q = statistics.quantiles(timings, n=100, method="inclusive")
+    return {"p50": q[49], "p95": q[94], "p99": q[98]}
+
+
+def time_case(cursor, fn, fn_args, runs, warm):
+    """
+    Latency of one query over `runs` calls.
+
+    Cold calls start with an empty result cache, so each one runs on the
+    server; warm calls are answered by the primed result cache.
+    """
+    query_cache.enabled = True
+    query_cache.clear()
+    if warm:
+        fn(cursor, *fn_args)
+    timings = []
+    for _ in range(runs):
+        if not warm:
+            query_cache.clear()
+        start = time.perf_counter()
+        rows = fn(cursor, *fn_args)
+        timings.append((time.perf_counter() - start) * 1000)
+    count = len(rows) if isinstance(rows, list) else int(rows is not None)
+    stats = percentiles(timings)
+    stats["rows_per_sec"] = count / (stats["p50"] / 1000) if stats["p50"] else None
+    return count, stats
+
+
+def bench_scale(args):
+    # cold calls go to the database
+    column_store.enabled = False
+    monitor.enabled = False
+    results = []
+    for scale in args.scale:
+        with tempfile.TemporaryDirectory() as folder:
+            start = time.perf_counter()
+            generated = generate_data(args.folder, folder, scale, args.seed)
+            generate_seconds = time.perf_counter() - start
+
+            # the same data set is loaded into every backend
+            for name, store in backends(args):
+                # initialize() reports progress on stdout, which carries the JSON
+                with contextlib.redirect_stdout(sys.stderr):
+                    conn = store.connect()
+                    cursor = conn.cursor()
+                    initialize.drop(cursor, args.database)
+                    start = time.perf_counter()
+                    stats = initialize.initialize(cursor, args.database, folder_path=folder,
+                                                  connect=store.connect if store.parallel_load else None)
+                    load_seconds = time.perf_counter() - start
+
+                loaded = sum(r["rows"] for r in stats)
+                cases = query_cases(sample_params(cursor))
+                timings = {}
+                for label, fn, fn_args in cases:
+                    rows, cold = time_case(cursor, fn, fn_args, args.runs, warm=False)
+                    _, warm = time_case(cursor, fn, fn_args, args.runs, warm=True)
+                    timings[label] = {"rows": rows, "cold": cold, "warm": warm}
+                conn.close()
+
+                results.append({
+                    "backend": name,
+                    "scale": scale,
+                    "seed": args.seed,
+                    "runs": args.runs,
+                    "tables": generated,
+                    "generate_seconds": generate_seconds,
+                    "load": {"rows": loaded, "seconds": load_seconds, "rows_per_sec": loaded / load_seconds},
+                    "queries": timings,
+                })
+
+    report = json.dumps({"started": datetime.now().isoformat(timespec="seconds"),
+                         "database": args.database, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+    print(report)
+
+
+def add_connection_args(parser):
+    backend.add_arguments(parser, several=True)
+    parser.add_argument("--database", default="GameInfo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="peak RSS of CSV ingestion, list-of-dicts vs streaming")
+    ingest.add_argument("--folder", default=initialize.DATA_FOLDER)
+    ingest.add_argument("--scale", type=int, default=20, help="repeat every CSV's rows this many times")
+    ingest.add_argument("--batch-size", type=int, default=initialize.BATCH_SIZE)
+    ingest.set_defaults(func=bench_ingest)
+
+    worker = sub.add_parser("ingest-worker")
+    worker.add_argument("--mode", choices=INGEST_MODES, required=True)
+    worker.add_argument("--folder", required=True)
+    worker.add_argument("--batch-size", type=int, required=True)
+    worker.set_defaults(func=ingest_worker)
+
+    query = sub.add_parser("queries", help="time every q_* function without and with the secondary indexes")
+    add_connection_args(query)
+    query.add_argument("--runs", type=int, default=5)
+    query.add_argument("--prepared", action="store_true", help="run the queries as server-side prepared statements")
+    query.set_defaults(func=bench_queries)
+
+    pages = sub.add_parser("pages", help="walk every paginated query and time its first and last pages")
+    add_connection_args(pages)
+    pages.add_argument("--page-size", type=int, default=20)
+    pages.set_defaults(func=bench_pages)
+
+    columnar = sub.add_parser("columnar", help="time the aggregate queries in SQL and from the column store")
+    add_connection_args(columnar)
+    columnar.add_argument("--runs", type=int, default=20)
+    columnar.set_defaults(func=bench_columnar)
+
+    friends = sub.add_parser("friends", help="time the k-hop friend search as a recursive CTE and on the friend graph")
+    add_connection_args(friends)
+    friends.add_argument("--hops", type=int, nargs="+", default=[1, 2, 3, 4])
+    friends.add_argument("--users", type=int, default=10, help="start from this many of the best connected players")
+    friends.add_argument("--runs", type=int, default=5)
+    friends.set_defaults(func=bench_friends)
+
+    boards = sub.add_parser("leaderboards", help="time top-N and player ranks of the most played games, "
+                                                  "grouped and from the leaderboards")
+    add_connection_args(boards)
+    boards.add_argument("--games", type=int, default=3, help="the most played games to time")
+    boards.add_argument("--top-n", type=int, default=10)
+    boards.add_argument("--runs", type=int, default=20)
+    boards.set_defaults(func=bench_leaderboards)
+
+    exclusive = sub.add_parser("exclusive", help="time the exclusive games of the largest platforms as NOT IN, "
+                                                   "NOT EXISTS and from the precomputed sole platform")
+    add_connection_args(exclusive)
+    exclusive.add_argument("--platforms", type=int, default=3, help="the platforms with the most games to time")
+    exclusive.add_argument("--limit", type=int, default=20)
+    exclusive.add_argument("--runs", type=int, default=5)
+    exclusive.set_defaults(func=bench_exclusive)
+
+    year = sub.add_parser("year", help="time q_game_year over growing shares of the catalog")
+    add_connection_args(year)
+    year.add_argument("--points", type=int, default=5, help="catalog shares timed: 1/2^(points-1) up to all")
+    year.add_argument("--runs", type=int, default=3)
+    year.set_defaults(func=bench_year)
+
+    scale = sub.add_parser("scale", help="load synthetic data at several scales and time every q_* function")
+    add_connection_args(scale)
+    scale.set_defaults(database="GameInfo_bench")
+    scale.add_argument("--folder", default=initialize.DATA_FOLDER, help="bundled CSVs; their platforms are reused")
+    scale.add_argument("--scale", type=int, nargs="+", default=[10, 100])
+    scale.add_argument("--seed", type=int, default=0)
+    scale.add_argument("--runs", type=int, default=20)
+    scale.add_argument("--output", help="also write the JSON report to this file")
+    scale.set_defaults(func=bench_scale)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import sys, threading, time
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """Approximate the memory held by a query result (rows of scalars)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class QueryCache:
+    """
+    LRU cache for query results, bounded by entry count, total bytes and age.
+
+    Every entry records the tables its query reads, so a write to a table
+    can drop exactly the results that depend on it. Each table also has an
+    epoch, advanced by every invalidation: a result whose tables were
+    invalidated while it was computed is not stored. Safe to share between
+    the UI thread and query workers.
+
+    Parameters:
+    max_entries: Most results kept at once.
+    max_bytes: Upper bound on the estimated size of all kept results.
+    ttl: Seconds after which a result is recomputed, so writes made by
+        other clients show up eventually.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = True
+
+        self._entries = OrderedDict()  # key -> (value, size, expires at, tables)
+        self._bytes = 0
+        self._epochs = {}  # table -> invalidations so far
+        self._clears = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return (True, value) on a hit and (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key) if self.enabled else None
+            if entry is None or entry[2] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def epoch(self, tables):
+        """The current epoch of `tables`, taken before running a query and passed to put()."""
+        with self._lock:
+            return self._clears, tuple(self._epochs.get(table, 0) for table in tables)
+
+    def put(self, key, value, tables, epoch=None):
+        """
+        Store a result of a query reading `tables`.
+
+        Parameters:
+        epoch: epoch(tables) from before the query ran. If any of the
+            tables was written since, the result may predate the write and
+            is not stored.
+        """
+        size = estimate_size(value)
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            if epoch is not None and epoch != (self._clears, tuple(self._epochs.get(t, 0) for t in tables)):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl, frozenset(tables))
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        value, size, expires, tables = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, *tables):
+        """Drop every result that reads one of `tables`."""
+        tables = set(tables)
+        with self._lock:
+            for table in tables:
+                self._epochs[table] = self._epochs.get(table, 0) + 1
+            stale = [key for key, entry in self._entries.items() if entry[3] & tables]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._clears += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class DimensionCache:
+    """
+    The value lists behind the query windows' dropdowns.
+
+    All lists are fetched together in one round trip on first use and kept
+    until one of their tables is written, so switching queries costs no
+    database work.
+    """
+
+    SQL = """
+        SELECT DISTINCT 'platform', PlatformName FROM Platform
+        UNION ALL
+        SELECT DISTINCT 'genre', Genre FROM Games WHERE Genre IS NOT NULL
+        UNION ALL
+        SELECT DISTINCT 'year', CAST(YEAR(IssuedTime) AS CHAR) FROM Platform_Support_Games WHERE IssuedTime IS NOT NULL
+        UNION ALL
+        SELECT 'publisher', PublisherName FROM Publisher
+        UNION ALL
+        SELECT 'developer', DeveloperName FROM Developer
+    """
+
+    # list -> table it is read from
+    TABLES = {
+        "platform": "Platform",
+        "genre": "Games",
+        "year": "Platform_Support_Games",
+        "publisher": "Publisher",
+        "developer": "Developer",
+    }
+
+    def __init__(self):
+        self._values = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def values(self, pool, kind):
+        """Return the values of one list, e.g. values(pool, "platform")."""
+        with self._lock:
+            if self._values is None:
+                with pool.cursor() as cursor:
+                    cursor.execute(self.SQL)
+                    values = {k: [] for k in self.TABLES}
+                    for k, value in cursor.fetchall():
+                        if value is not None:
+                            values[k].append(value)
+                values["year"].sort(key=int, reverse=True)
+                self._values = values
+                self.loads += 1
+            return list(self._values[kind])
+
+    def invalidate(self, *tables):
+        if set(tables) & set(self.TABLES.values()):
+            self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._values = None
+
+
+# shared by queries.py, the loader and the windows
+query_cache = QueryCache()
+dimension_cache = DimensionCache()
+# further caches of table contents, e.g. the column store; each has
+# invalidate(*tables), append(table, columns, rows, since) and clear()
+subscribers = []
+
+
+def invalidate(*tables):
+    """Drop everything cached from `tables` after they were written."""
+    query_cache.invalidate(*tables)
+    dimension_cache.invalidate(*tables)
+    for subscriber in subscribers:
+        subscriber.invalidate(*tables)
+
+
+def inserted(table, columns, rows, since):
+    """
+    Report rows just committed to `table`, as tuples of `columns`.
+
+    Results read from the table are dropped as by invalidate(), while
+    subscribers holding a copy of the table add the rows to it in place.
+
+    Parameters:
+    since: time.monotonic() taken before the rows were inserted. A copy
+        read after it may already hold them, so subscribers drop it
+        instead of adding the rows twice.
+    """
+    query_cache.invalidate(table)
+    dimension_cache.invalidate(table)
+    for subscriber in subscribers:
+        subscriber.append(table, columns, rows, since)
+
+
+def clear():
+    query_cache.clear()
+    dimension_cache.clear()
+    for subscriber in subscribers:
+        subscriber.clear()
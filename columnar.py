@@ -0,0 +1,418 @@
+"""
+In-memory column store for the dashboard aggregates.
+
+q_genre_avg_rating, q_dev_pub_revenues, q_dev_pub_rating,
+q_dev_pub_compatibility and q_platform_revenue scan a few fact tables and
+group them. Once the store is switched on (column_store.enabled, which needs
+NumPy), the first of them copies those tables into one array per column
+(strings dictionary-encoded as int codes, money as integer cents) and all
+of them are then answered from the arrays with vectorized group-bys, without
+a round trip and without the summary tables. Rows inserted through the application are appended to the
+arrays as they are committed (see cache.inserted()); any other write to a
+snapshotted table drops the snapshot, and it is reloaded after max_age
+seconds so writes of other clients show up eventually. Switched off, the
+default, the queries run in SQL.
+"""
+import threading, time
+from datetime import date, datetime
+from decimal import Decimal
+
+import cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# table -> [(column, kind, select expression)]
+#   id: integer, -1 for NULL; num: float, NaN for NULL;
+#   year: the year of a DATE as a float, NaN for NULL; str: dictionary code, -1 for NULL;
+#   money: a DECIMAL(_, 2) in integer cents, NULL_CENTS for NULL
+SNAPSHOTS = {
+    "Games": [("GameID", "id", "GameID"), ("Genre", "str", "Genre"), ("UnitsSold", "num", "UnitsSold")],
+    "Platform_Support_Games": [("GameID", "id", "GameID"), ("PlatformID", "id", "PlatformID"),
+                               ("Price", "money", "Price"), ("IssuedTime", "year", "YEAR(IssuedTime)")],
+    "Player_Platform_Games_Play": [("GameID", "id", "GameID"), ("Rating", "num", "Rating")],
+    "Developer_Games": [("GameID", "id", "GameID"), ("DeveloperID", "id", "DeveloperID"),
+                        ("DevelopeFinishYear", "num", "DevelopeFinishYear")],
+    "Publisher_Games": [("GameID", "id", "GameID"), ("PublisherID", "id", "PublisherID"),
+                        ("PublishYear", "num", "PublishYear")],
+    "Developer": [("DeveloperID", "id", "DeveloperID"), ("DeveloperName", "str", "DeveloperName")],
+    "Publisher": [("PublisherID", "id", "PublisherID"), ("PublisherName", "str", "PublisherName")],
+    "Platform": [("PlatformID", "id", "PlatformID"), ("PlatformName", "str", "PlatformName")],
+}
+
+# role -> (link table, its owner column, its year column, owner table, name column)
+ROLES = {
+    "Developer": ("Developer_Games", "DeveloperID", "DevelopeFinishYear", "Developer", "DeveloperName"),
+    "Publisher": ("Publisher_Games", "PublisherID", "PublishYear", "Publisher", "PublisherName"),
+}
+
+
+class Dictionary:
+    """Dictionary encoding of a string column: every distinct value gets a small int code."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+NULL_CENTS = -2 ** 63
+
+
+def _cents(value):
+    # Decimal from MySQL, float from SQLite or the text typed into a form
+    try:
+        return int((Decimal(str(value)) * 100).to_integral_value())
+    except ArithmeticError:
+        raise ValueError(f"not an amount: {value!r}")
+
+
+def _year(value):
+    if isinstance(value, (date, datetime)):
+        return value.year
+    return int(str(value)[:4])
+
+
+def _coerce(kind, value, dictionary):
+    # rows reported by the UI hold the text typed into the form
+    if value is None or value == "":
+        if kind == "str":
+            return dictionary.encode(None)
+        return -1 if kind == "id" else NULL_CENTS if kind == "money" else np.nan
+    if kind == "id":
+        return int(value)
+    if kind == "money":
+        return _cents(value)
+    if kind == "num":
+        return float(value)
+    if kind == "year":
+        return float(_year(value))
+    return dictionary.encode(str(value))
+
+
+class Table:
+    """
+    The snapshotted columns of one table.
+
+    Appended rows wait in `pending` and are merged into the arrays with one
+    concatenate per column at the next read.
+    """
+
+    def __init__(self, spec, rows):
+        self.kinds = {column: kind for column, kind, _ in spec}
+        self.dictionaries = {column: Dictionary() for column, kind, _ in spec if kind == "str"}
+        self.columns = {}
+        values = list(zip(*rows)) or [()] * len(spec)
+        for (column, kind, _), column_values in zip(spec, values):
+            self.columns[column] = self._array(column, column_values)
+        self.pending = []
+
+    def _coerced(self, column, values):
+        kind = self.kinds[column]
+        dictionary = self.dictionaries.get(column)
+        return (_coerce(kind, v, dictionary) for v in values)
+
+    def _array(self, column, values):
+        dtype = {"id": np.int64, "num": np.float64, "year": np.float64, "str": np.int32,
+                 "money": np.int64}[self.kinds[column]]
+        return np.fromiter(self._coerced(column, values), dtype, count=len(values))
+
+    def append(self, columns, rows):
+        """Queue rows given as tuples of `columns`; raises ValueError for values of the wrong type."""
+        # columns the snapshot does not keep are ignored, missing ones are NULL
+        positions = [columns.index(c) if c in columns else None for c in self.kinds]
+        coerced = [list(self._coerced(column, [None if i is None else row[i] for row in rows]))
+                   for column, i in zip(self.kinds, positions)]
+        self.pending.extend(zip(*coerced))
+
+    def merge(self):
+        """Move the pending rows into the arrays; returns whether there were any."""
+        if not self.pending:
+            return False
+        dtypes = {column: array.dtype for column, array in self.columns.items()}
+        for column, values in zip(self.kinds, zip(*self.pending)):
+            self.columns[column] = np.concatenate([self.columns[column], np.array(values, dtypes[column])])
+        self.pending = []
+        return True
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) + len(self.pending)
+
+    def decode(self, column, codes):
+        values = self.dictionaries[column].values
+        return [values[code] if code >= 0 else None for code in codes]
+
+
+def _order(values, descending=True):
+    """Positions of `values` sorted like ORDER BY ... DESC in MySQL: NULLs (NaN) last."""
+    key = -values if descending else values
+    return np.argsort(np.where(np.isnan(values), np.inf, key), kind="stable")
+
+
+def _money(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def _revenue_terms(units, cents):
+    """UnitsSold * Price in cents, and where neither was NULL."""
+    valid = ~np.isnan(units) & (cents != NULL_CENTS)
+    return np.where(valid, np.nan_to_num(units).astype(np.int64) * cents, 0), valid
+
+
+class ColumnStore:
+    """
+    Snapshot of the SNAPSHOTS tables with the aggregate queries over it.
+
+    Each query method takes the cursor to load the snapshot through when
+    there is none yet, and returns the rows its q_* counterpart would.
+    Safe to share between the UI thread and query workers.
+
+    Parameters:
+    max_age: Seconds after which the snapshot is reloaded.
+    """
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        # off by default: the summary tables answer the same queries;
+        # needs NumPy, see available()
+        self.enabled = False
+        self._tables = None
+        # arrays computed from the tables, until they change
+        self._derived = {}
+        self._loaded_at = 0.0
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.appended = 0
+
+    @staticmethod
+    def available():
+        return np is not None
+
+    def _ready(self, cursorObject):
+        # called with the lock held
+        if self._tables is None or time.monotonic() - self._loaded_at > self.max_age:
+            self.load(cursorObject)
+
+    def load(self, cursorObject):
+        """Snapshot the SNAPSHOTS tables through `cursorObject`."""
+        with self._lock:
+            tables = {}
+            for table, spec in SNAPSHOTS.items():
+                cursorObject.execute(f"SELECT {', '.join(expr for _, _, expr in spec)} FROM {table}")
+                tables[table] = Table(spec, cursorObject.fetchall())
+            self._tables = tables
+            self._derived = {}
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+    def append(self, table, columns, rows, since):
+        with self._lock:
+            if self._tables is None or table not in self._tables:
+                return
+            if self._loaded_at >= since:
+                # loaded after the insert began, so it may already hold the rows
+                self._tables = None
+                return
+            try:
+                self._tables[table].append(list(columns), rows)
+                self.appended += len(rows)
+            except (ValueError, TypeError):
+                # the server took text NumPy cannot parse; read it back instead
+                self._tables = None
+
+    def invalidate(self, *tables):
+        if set(tables) & set(SNAPSHOTS):
+            self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._tables = None
+
+    def stats(self):
+        with self._lock:
+            tables = self._tables or {}
+            return {
+                "enabled": self.enabled,
+                "rows": sum(len(t) for t in tables.values()),
+                "bytes": sum(a.nbytes for t in tables.values() for a in t.columns.values()),
+                "loads": self.loads,
+                "appended": self.appended,
+            }
+
+    def _table(self, name):
+        table = self._tables[name]
+        if table.merge():
+            self._derived = {}
+        return table
+
+    def _cached(self, name, compute, *tables):
+        # merge first: it clears what was derived from the old rows
+        for table in tables:
+            self._table(table)
+        if name not in self._derived:
+            self._derived[name] = compute()
+        return self._derived[name]
+
+    def _game_rows(self, game_ids):
+        """Row in Games of every ID in `game_ids`, -1 where there is none."""
+        def index():
+            ids = self._table("Games")["GameID"]
+            rows = np.full(ids.max(initial=-1) + 1, -1, np.int64)
+            rows[ids] = np.arange(len(ids))
+            return rows
+
+        rows = self._cached("game_index", index, "Games")
+        known = (game_ids >= 0) & (game_ids < len(rows))
+        return np.where(known, rows[np.where(known, game_ids, 0)], -1) if len(rows) else np.full(len(game_ids), -1)
+
+    def _game_revenue(self):
+        """
+        Per Games row: the sum of UnitsSold * Price over its platforms in
+        cents, whether any term was not NULL, and its number of platforms.
+        """
+        def compute():
+            games, psg = self._table("Games"), self._table("Platform_Support_Games")
+            rows = self._game_rows(psg["GameID"])
+            joined = rows >= 0
+            term, valid = _revenue_terms(games["UnitsSold"][rows[joined]], psg["Price"][joined])
+            n = len(games["GameID"])
+            revenue = np.zeros(n, np.int64)
+            np.add.at(revenue, rows[joined], term)
+            counted = np.bincount(rows[joined][valid], minlength=n) > 0
+            platforms = np.bincount(rows[joined], minlength=n)
+            return revenue, counted, platforms
+
+        return self._cached("game_revenue", compute, "Games", "Platform_Support_Games")
+
+    def _names(self, owner_table, id_column, name_column, ids):
+        """Names of the `ids` of an owner table; None for IDs it does not hold."""
+        def names():
+            owners = self._table(owner_table)
+            return dict(zip(owners[id_column].tolist(), owners.decode(name_column, owners[name_column])))
+
+        names = self._cached(f"names:{owner_table}", names, owner_table)
+        return [names.get(i) for i in ids.tolist()]
+
+    def _count_by_owner(self, role, game_mask):
+        """(name, games) per owner of the games selected by a mask over Games rows, most first."""
+        link_table, owner, _, owner_table, name_column = ROLES[role]
+        link = self._table(link_table)
+        rows = self._game_rows(link["GameID"])
+        selected = rows >= 0
+        selected[selected] = game_mask[rows[selected]]
+        ids, counts = np.unique(link[owner][selected], return_counts=True)
+        names = self._names(owner_table, owner, name_column, ids)
+        order = _order(counts.astype(np.float64))
+        return [(names[i], int(counts[i])) for i in order if names[i] is not None]
+
+    def genre_avg_rating(self, cursorObject, type):
+        with self._lock:
+            self._ready(cursorObject)
+            games = self._table("Games")
+            genres = games["Genre"]
+            n = len(games.dictionaries["Genre"].values)
+            if type == "Rating":
+                plays = self._table("Player_Platform_Games_Play")
+                rows = self._game_rows(plays["GameID"])
+                joined = rows >= 0
+                genre = genres[rows[joined]]
+                rating = plays["Rating"][joined][genre >= 0]
+                genre = genre[genre >= 0]
+                rated = ~np.isnan(rating)
+                play_count = np.bincount(genre, minlength=n)
+                rating_sum = np.bincount(genre[rated], weights=rating[rated], minlength=n)
+                rating_count = np.bincount(genre[rated], minlength=n)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    average = np.where(rating_count > 0, rating_sum / rating_count, np.nan)
+                codes = np.flatnonzero(play_count > 0)
+                values = average[codes]
+                return [(games.dictionaries["Genre"].values[codes[i]],
+                         None if np.isnan(values[i]) else Decimal(f"{values[i]:.4f}"))
+                        for i in _order(values)]
+            if type == "UnitsSold":
+                named = genres >= 0
+                units = games["UnitsSold"][named]
+                genre = genres[named]
+                sold = ~np.isnan(units)
+                game_count = np.bincount(genre, minlength=n)
+                units_sum = np.bincount(genre[sold], weights=units[sold], minlength=n)
+                units_count = np.bincount(genre[sold], minlength=n)
+                codes = np.flatnonzero(game_count > 0)
+                values = np.where(units_count[codes] > 0, units_sum[codes], np.nan)
+                return [(games.dictionaries["Genre"].values[codes[i]],
+                         None if np.isnan(values[i]) else int(values[i]))
+                        for i in _order(values)]
+            return []
+
+    def dev_pub_revenues(self, cursorObject, role, start_year, end_year, top_n):
+        if role not in ROLES:
+            return []
+        link_table, owner, year_column, owner_table, name_column = ROLES[role]
+        with self._lock:
+            self._ready(cursorObject)
+            revenue, counted, platforms = self._game_revenue()
+            link = self._table(link_table)
+            rows = self._game_rows(link["GameID"])
+            year = link[year_column]
+            # the inner join with Platform_Support_Games keeps games sold somewhere
+            selected = (rows >= 0) & (year >= float(start_year)) & (year <= float(end_year))
+            selected[selected] = platforms[rows[selected]] > 0
+            ids, groups = np.unique(link[owner][selected], return_inverse=True)
+            game_rows = rows[selected]
+            total = np.zeros(len(ids), np.int64)
+            np.add.at(total, groups, revenue[game_rows])
+            any_counted = np.bincount(groups, weights=counted[game_rows], minlength=len(ids)) > 0
+            names = self._names(owner_table, owner, name_column, ids)
+            order = [i for i in _order(np.where(any_counted, total, np.nan)) if names[i] is not None][:int(top_n)]
+            return [(names[i], _money(total[i]) if any_counted[i] else None) for i in order]
+
+    def dev_pub_rating(self, cursorObject, role, rating_threshold):
+        if role not in ROLES:
+            return []
+        with self._lock:
+            self._ready(cursorObject)
+            plays = self._table("Player_Platform_Games_Play")
+            rows = self._game_rows(plays["GameID"])
+            high = np.zeros(len(self._table("Games")["GameID"]), bool)
+            # NaN > threshold is False, like NULL in WHERE
+            high[rows[(rows >= 0) & (plays["Rating"] > float(rating_threshold))]] = True
+            return self._count_by_owner(role, high)
+
+    def dev_pub_compatibility(self, cursorObject, role, platform_threshold):
+        if role not in ROLES:
+            return []
+        with self._lock:
+            self._ready(cursorObject)
+            revenue, counted, platforms = self._game_revenue()
+            return self._count_by_owner(role, platforms > float(platform_threshold))
+
+    def platform_revenue(self, cursorObject, platform_name, year):
+        with self._lock:
+            self._ready(cursorObject)
+            platforms = self._table("Platform")
+            code = platforms.dictionaries["PlatformName"].codes.get(platform_name, -2)
+            platform_ids = platforms["PlatformID"][platforms["PlatformName"] == code]
+            games, psg = self._table("Games"), self._table("Platform_Support_Games")
+            rows = self._game_rows(psg["GameID"])
+            selected = ((rows >= 0) & np.isin(psg["PlatformID"], platform_ids)
+                        & (psg["IssuedTime"] == float(int(year))))
+            term, valid = _revenue_terms(games["UnitsSold"][rows[selected]], psg["Price"][selected])
+            return (_money(term.sum()) if valid.any() else None,)
+
+
+# shared by queries.py and the Performance window
+column_store = ColumnStore()
+cache.subscribers.append(column_store)
@@ -0,0 +1,223 @@
+"""
+In-memory friend graph for the multi-hop social queries.
+
+Player_Friends stores each friendship once, in either direction. With NumPy
+installed, the first query that needs the graph reads the table into CSR
+arrays: the friendships of every player, in both directions, sit next to
+each other in one array and are found by two offsets, so following a hop
+is a slice instead of a join. Friendships inserted through the application
+go to a small overlay (see cache.inserted()) that is folded into the arrays
+once it reaches max_delta edges; any other write to the table drops the
+graph. Without NumPy the queries use recursive SQL instead.
+"""
+import threading, time
+
+import cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# overlay edges after which the CSR arrays are rebuilt
+MAX_DELTA = 1024
+
+
+def _edge_arrays(edges):
+    """(Player1ID, Player2ID, MutualTime) rows as three arrays, NULL MutualTime as NaN."""
+    edges = list(edges)
+    first = np.fromiter((int(a) for a, _, _ in edges), np.int64, count=len(edges))
+    second = np.fromiter((int(b) for _, b, _ in edges), np.int64, count=len(edges))
+    weight = np.fromiter((np.nan if w is None or w == "" else float(w) for _, _, w in edges),
+                         np.float64, count=len(edges))
+    return first, second, weight
+
+
+def _heavier(weight, other):
+    """Whether MutualTime `weight` is larger than `other`, NULL (NaN) being the smallest."""
+    return not np.isnan(weight) and (np.isnan(other) or weight > other)
+
+
+class FriendGraph:
+    """
+    Player_Friends as an undirected graph weighted by MutualTime, with the
+    player names. A friendship stored in both directions counts once, with
+    the larger MutualTime. Safe to share between the UI thread and query
+    workers.
+
+    Parameters:
+    max_age: Seconds after which the graph is read again from the database.
+    max_delta: Inserted friendships kept in the overlay before a rebuild.
+    """
+
+    def __init__(self, max_age=300, max_delta=MAX_DELTA):
+        self.max_age = max_age
+        self.max_delta = max_delta
+        self.enabled = np is not None
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._loaded_at = 0.0
+        self.loads = 0
+        self.rebuilds = 0
+
+    def _ready(self, cursorObject):
+        # called with the lock held
+        if not self._loaded or time.monotonic() - self._loaded_at > self.max_age:
+            self.load(cursorObject)
+
+    def load(self, cursorObject):
+        """Read Player_Friends and the player names through `cursorObject`."""
+        with self._lock:
+            cursorObject.execute("SELECT Player1ID, Player2ID, MutualTime FROM Player_Friends")
+            self._edges = _edge_arrays(cursorObject.fetchall())
+            cursorObject.execute("SELECT UserID, UserName, Region FROM Player")
+            self.players = {user_id: (name, region) for user_id, name, region in cursorObject.fetchall()}
+            self._build()
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+    def _build(self):
+        first, second, weight = self._edges
+        # both directions of every friendship, without self-loops
+        source = np.concatenate([first, second])
+        target = np.concatenate([second, first])
+        weight = np.concatenate([weight, weight])
+        keep = source != target
+        source, target, weight = source[keep], target[keep], weight[keep]
+
+        # one edge per (source, target), the largest MutualTime first
+        order = np.lexsort((-np.where(np.isnan(weight), -np.inf, weight), target, source))
+        source, target, weight = source[order], target[order], weight[order]
+        first_of_pair = np.ones(len(source), bool)
+        first_of_pair[1:] = (source[1:] != source[:-1]) | (target[1:] != target[:-1])
+        source, target, weight = source[first_of_pair], target[first_of_pair], weight[first_of_pair]
+
+        # CSR: the friends of ids[i] are targets[offsets[i]:offsets[i + 1]]
+        self.ids, counts = np.unique(source, return_counts=True)
+        self.offsets = np.zeros(len(self.ids) + 1, np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        self.targets = target
+        self.weights = weight
+        self._delta = {}
+        self._delta_edges = 0
+
+    def _weight(self, a, b):
+        """MutualTime of the friendship a-b as known so far (NaN for NULL), None if there is none."""
+        known = self._delta.get(a, {}).get(b)
+        at = np.searchsorted(self.ids, a)
+        if at < len(self.ids) and self.ids[at] == a:
+            start, end = self.offsets[at], self.offsets[at + 1]
+            # targets are sorted within each player's slice
+            i = start + np.searchsorted(self.targets[start:end], b)
+            if i < end and self.targets[i] == b:
+                weight = float(self.weights[i])
+                known = weight if known is None or _heavier(weight, known) else known
+        return known
+
+    def append(self, table, columns, rows, since):
+        with self._lock:
+            if not self._loaded or table not in ("Player_Friends", "Player"):
+                return
+            if self._loaded_at >= since:
+                # loaded after the insert began, so it may already hold the rows
+                self._loaded = False
+                return
+            try:
+                if table == "Player":
+                    for row in rows:
+                        values = dict(zip(columns, row))
+                        self.players[int(values["UserID"])] = (values.get("UserName"), values.get("Region"))
+                    return
+                positions = [columns.index(c) for c in ("Player1ID", "Player2ID")]
+                weight_at = columns.index("MutualTime") if "MutualTime" in columns else None
+                edges = _edge_arrays((row[positions[0]], row[positions[1]],
+                                      None if weight_at is None else row[weight_at]) for row in rows)
+            except (ValueError, TypeError, KeyError):
+                self._loaded = False
+                return
+            # only friendships the graph lacks, or with a larger MutualTime than it holds
+            fresh = []
+            for i, (a, b, w) in enumerate(zip(*(column.tolist() for column in edges))):
+                if a == b:
+                    continue
+                known = self._weight(a, b)
+                if known is None or _heavier(w, known):
+                    self._delta.setdefault(a, {})[b] = w
+                    self._delta.setdefault(b, {})[a] = w
+                    fresh.append(i)
+            if not fresh:
+                return
+            self._edges = tuple(np.concatenate([old, new[fresh]]) for old, new in zip(self._edges, edges))
+            self._delta_edges += len(fresh)
+            if self._delta_edges > self.max_delta:
+                self._build()
+                self.rebuilds += 1
+
+    def invalidate(self, *tables):
+        if {"Player_Friends", "Player"} & set(tables):
+            self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._loaded = False
+
+    def stats(self):
+        with self._lock:
+            if not self._loaded:
+                return {"enabled": self.enabled, "players": 0, "edges": 0, "overlay": 0,
+                        "loads": self.loads, "rebuilds": self.rebuilds}
+            return {"enabled": self.enabled, "players": len(self.ids), "edges": len(self.targets) // 2,
+                    "overlay": self._delta_edges, "loads": self.loads, "rebuilds": self.rebuilds}
+
+    def _friends(self, user_ids, min_time=None):
+        """UserIDs of the friends of every player in `user_ids`, repeats included."""
+        at = np.searchsorted(self.ids, user_ids)
+        known = at < len(self.ids)
+        known[known] = self.ids[at[known]] == user_ids[known]
+        at = at[known]
+        starts, ends = self.offsets[at], self.offsets[at + 1]
+        lengths = ends - starts
+        # positions of all the slices targets[start:end], concatenated
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        friends = self.targets[positions]
+        if min_time is not None:
+            # NaN >= anything is False, like NULL in WHERE
+            friends = friends[self.weights[positions] >= min_time]
+        if self._delta:
+            extra = [b for a in user_ids.tolist() for b, w in self._delta.get(a, {}).items()
+                     if min_time is None or w >= min_time]
+            friends = np.concatenate([friends, np.array(extra, np.int64)])
+        return friends
+
+    def within(self, cursorObject, user_id, hops, min_time=0):
+        """
+        Breadth-first search from user_id, following friendships of at least
+        min_time. Returns [(UserID, UserName, Region, Hops)] of every player
+        at most `hops` friendships away, nearest first.
+        """
+        with self._lock:
+            self._ready(cursorObject)
+            seen = np.array([int(user_id)], np.int64)
+            frontier = seen
+            found = []
+            for hop in range(1, int(hops) + 1):
+                frontier = np.setdiff1d(self._friends(frontier, float(min_time)), seen)
+                if not len(frontier):
+                    break
+                found += [(friend, hop) for friend in frontier.tolist()]
+                seen = np.union1d(seen, frontier)
+            return [(friend, *self.players.get(friend, (None, None)), hop) for friend, hop in found]
+
+    def mutual(self, cursorObject, user_id, other_id):
+        """[(UserID, UserName, Region)] of the friends both players have."""
+        with self._lock:
+            self._ready(cursorObject)
+            common = np.intersect1d(self._friends(np.array([int(user_id)], np.int64)),
+                                    self._friends(np.array([int(other_id)], np.int64)))
+            return [(friend, *self.players.get(friend, (None, None))) for friend in common.tolist()]
+
+
+# shared by queries.py and the Performance window
+friend_graph = FriendGraph()
+cache.subscribers.append(friend_graph)
@@ -1,5 +1,636 @@
 import mysql.connector
-import os, csv
+import argparse, os, csv, hashlib, time, re, queue, heapq, tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import backend, cache
+from leaderboard import BOARDS
+from instrument import monitor
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+# Bump whenever the DDL below changes; a database recorded with another
+# version is dropped and rebuilt from the CSVs on the next login.
+SCHEMA_VERSION = "7"
+
+# Bookkeeping table: one row per loaded CSV holding its content hash, plus
+# a SCHEMA_KEY row holding the schema version.
+FINGERPRINT_TABLE = "Data_Fingerprint"
+SCHEMA_KEY = "__schema__"
+
+# the bundled CSVs, wherever the program is started from
+DATA_FOLDER = Path(__file__).parent / "data"
+
+# rows per multi-row INSERT when LOAD DATA LOCAL INFILE is unavailable
+BATCH_SIZE = 1000
+
+# rows sorted in memory per run when a CSV has to be put in primary-key order
+SORT_RUN_SIZE = 100000
+
+# client refused (2068), local infile disabled (3948), command not allowed (1148)
+INFILE_REFUSED = (2068, 3948, 1148)
+
+# no such table (1146), unknown database (1049)
+NOT_CREATED = (1146, 1049)
+
+# create tables
+TABLES = []
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Games (
+    GameID INT PRIMARY KEY,
+    Name VARCHAR(255) NOT NULL,
+    Description TEXT,
+    ReleaseDate DATE NOT NULL,
+    LanguageSupport VARCHAR(255),
+    Genre VARCHAR(100),
+    RequireAge INT DEFAULT NULL,
+    Tags VARCHAR(255),
+    UnitsSold INT
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Achievement (
+    GameID INT,
+    AchievementID INT,
+    Name VARCHAR(255),
+    Description TEXT,
+    PRIMARY KEY (GameID, AchievementID),
+    FOREIGN KEY (GameID) REFERENCES Games(GameID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS DLC (
+    GameID INT,
+    DLCID INT,
+    Name VARCHAR(255),
+    ReleaseDate DATE,
+    Price DECIMAL(10, 2),
+    Description TEXT,
+    PRIMARY KEY (GameID, DLCID),
+    FOREIGN KEY (GameID) REFERENCES Games(GameID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Player (
+    UserID INT PRIMARY KEY,
+    UserName VARCHAR(255),
+    Email VARCHAR(255),
+    Region VARCHAR(100),
+    JoinDate DATE,
+    Level INT,
+    TotalPlayTime INT,
+    GamesOwned INT
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Platform (
+    PlatformID INT PRIMARY KEY,
+    PlatformName VARCHAR(255),
+    Manufacturer VARCHAR(255),
+    TotalGameNumber INT,
+    WebSite VARCHAR(255)
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Developer (
+    DeveloperID INT PRIMARY KEY,
+    DeveloperName VARCHAR(255),
+    Address VARCHAR(255),
+    FoundedYear INT,
+    Country VARCHAR(100),
+    Website VARCHAR(255)
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Publisher (
+    PublisherID INT PRIMARY KEY,
+    PublisherName VARCHAR(255),
+    Address VARCHAR(255),
+    FoundedYear INT,
+    Country VARCHAR(100),
+    Website VARCHAR(255),
+    Description TEXT
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Player_Platform_Games_Play (
+    GameID INT,
+    PlatformID INT,
+    PlayerID INT,
+    TotalPlayingTime INT,
+    LastPlayTime DATETIME,
+    PurchaseTime DATETIME,
+    PurchasePrice DECIMAL(10, 2),
+    Review TEXT,
+    Rating INT CHECK (Rating BETWEEN 1 AND 10),
+    PRIMARY KEY (GameID, PlatformID, PlayerID),
+    FOREIGN KEY (GameID) REFERENCES Games(GameID)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (PlatformID) REFERENCES Platform(PlatformID)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (PlayerID) REFERENCES Player(UserID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Player_Unlock_Achievement (
+    PlayerID INT,
+    GameID INT,
+    AchievementID INT,
+    GainTime DATE,
+    PRIMARY KEY (PlayerID, GameID, AchievementID),
+    FOREIGN KEY (GameID, AchievementID) REFERENCES Achievement(GameID, AchievementID)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (PlayerID) REFERENCES Player(UserID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Player_Use_Platform (
+    PlayerID INT,
+    PlatformID INT,
+    RegistrationDate DATETIME,
+    TotalTimeSpent INT,
+    PRIMARY KEY (PlayerID, PlatformID),
+    FOREIGN KEY (PlatformID) REFERENCES Platform(PlatformID)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (PlayerID) REFERENCES Player(UserID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Player_Friends (
+    Player1ID INT,
+    Player2ID INT,
+    StartDate DATETIME,
+    MutualTime INT,
+    PRIMARY KEY (Player1ID, Player2ID),
+    FOREIGN KEY (Player1ID) REFERENCES Player(UserID)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (Player2ID) REFERENCES Player(UserID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Platform_Support_Games (
+    GameID INT,
+    PlatformID INT,
+    Price DECIMAL(10, 2),
+    IssuedTime DATE,
+    Rating DECIMAL(3, 1),
+    PRIMARY KEY (GameID, PlatformID),
+    FOREIGN KEY (GameID) REFERENCES Games(GameID)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (PlatformID) REFERENCES Platform(PlatformID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Developer_Games (
+    GameID INT,
+    DeveloperID INT,
+    DevelopeStartYear YEAR,
+    DevelopeFinishYear YEAR,
+    DevelopeCost DECIMAL(12, 2),
+    PRIMARY KEY (GameID, DeveloperID),
+    FOREIGN KEY (GameID) REFERENCES Games(GameID)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (DeveloperID) REFERENCES Developer(DeveloperID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Publisher_Games (
+    GameID INT,
+    PublisherID INT,
+    PublishYear YEAR,
+    PublishCost DECIMAL(12, 2),
+    PRIMARY KEY (GameID, PublisherID),
+    FOREIGN KEY (GameID) REFERENCES Games(GameID)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (PublisherID) REFERENCES Publisher(PublisherID)
+        ON DELETE CASCADE ON UPDATE CASCADE
+);
+""")
+
+TABLES.append(f"""
+CREATE TABLE IF NOT EXISTS {FINGERPRINT_TABLE} (
+    TableName VARCHAR(64) PRIMARY KEY,
+    FileHash VARCHAR(64) NOT NULL,
+    LoadedAt DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+""")
+
+# Last ID handed out per numbered table (see ID_SEQUENCES); ScopeID is the
+# GameID for tables numbered per game and 0 otherwise.
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Id_Sequence (
+    TableName VARCHAR(64),
+    ScopeID INT,
+    LastID INT NOT NULL,
+    PRIMARY KEY (TableName, ScopeID)
+);
+""")
+
+# Summary tables behind the aggregate queries. They hold no CSV data: they
+# are rebuilt from the base tables after every load (SUMMARIES) and kept
+# current on insert by the SUMMARY_TRIGGERS.
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Developer_Revenue (
+    DeveloperID INT,
+    FinishYear YEAR,
+    Revenue DECIMAL(30, 2),
+    PRIMARY KEY (DeveloperID, FinishYear)
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Publisher_Revenue (
+    PublisherID INT,
+    PublishYear YEAR,
+    Revenue DECIMAL(30, 2),
+    PRIMARY KEY (PublisherID, PublishYear)
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Platform_Revenue (
+    PlatformID INT,
+    IssuedYear YEAR,
+    Revenue DECIMAL(30, 2),
+    PRIMARY KEY (PlatformID, IssuedYear)
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Genre_Stats (
+    Genre VARCHAR(100) PRIMARY KEY,
+    GameCount INT NOT NULL,
+    UnitsSold BIGINT,
+    PlayCount INT NOT NULL,
+    RatingSum BIGINT NOT NULL,
+    RatingCount INT NOT NULL
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Game_Platform_Count (
+    GameID INT PRIMARY KEY,
+    PlatformCount INT NOT NULL,
+    SolePlatformID INT
+);
+""")
+
+# one row per player: what the user-side queries would otherwise aggregate
+# from that player's play records and unlocked achievements
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Player_Profile (
+    PlayerID INT PRIMARY KEY,
+    TotalSpent DECIMAL(30, 2),
+    TotalPlayTime BIGINT,
+    GamesOwned INT NOT NULL,
+    AchievementsUnlocked INT NOT NULL,
+    LastActivity DATETIME
+);
+""")
+
+# per-game leaderboards: every player's score in a game, read in score
+# order through the idx_*_board_rank indexes
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Game_Playtime_Board (
+    GameID INT,
+    PlayerID INT,
+    TotalTime BIGINT,
+    PRIMARY KEY (GameID, PlayerID)
+);
+""")
+
+TABLES.append("""
+CREATE TABLE IF NOT EXISTS Game_Achievement_Board (
+    GameID INT,
+    PlayerID INT,
+    Unlocked INT NOT NULL,
+    PRIMARY KEY (GameID, PlayerID)
+);
+""")
+
+# the summary tables rebuilt by the rebuild-leaderboards command
+LEADERBOARDS = [table for table, _, _ in BOARDS.values()]
+
+# table -> (key column numbered by allocate_ids(), column the numbering
+# restarts for or None); achievements and DLCs are numbered per game
+ID_SEQUENCES = {
+    "Games": ("GameID", None),
+    "Player": ("UserID", None),
+    "Platform": ("PlatformID", None),
+    "Developer": ("DeveloperID", None),
+    "Publisher": ("PublisherID", None),
+    "Achievement": ("AchievementID", "GameID"),
+    "DLC": ("DLCID", "GameID"),
+}
+
+def later(first, second):
+    """SQL expression for the later of two times, ignoring a NULL one."""
+    # TIMESTAMP() gives dates and datetimes one form, which SQLite's text values lack
+    first, second = f"TIMESTAMP({first})", f"TIMESTAMP({second})"
+    return f"CASE WHEN {second} IS NULL OR {first} > {second} THEN {first} ELSE {second} END"
+
+
+# summary table -> SELECT computing its rows from the base tables
+SUMMARIES = {
+    # revenue is UnitsSold * Price over every platform a game is sold on
+    "Developer_Revenue": """
+        SELECT DG.DeveloperID, DG.DevelopeFinishYear, ROUND(SUM(G.UnitsSold * PSG.Price), 2)
+        FROM Developer_Games DG
+        JOIN Games G ON G.GameID = DG.GameID
+        JOIN Platform_Support_Games PSG ON PSG.GameID = G.GameID
+        WHERE DG.DevelopeFinishYear IS NOT NULL
+        GROUP BY DG.DeveloperID, DG.DevelopeFinishYear
+    """,
+    "Publisher_Revenue": """
+        SELECT PG.PublisherID, PG.PublishYear, ROUND(SUM(G.UnitsSold * PSG.Price), 2)
+        FROM Publisher_Games PG
+        JOIN Games G ON G.GameID = PG.GameID
+        JOIN Platform_Support_Games PSG ON PSG.GameID = G.GameID
+        WHERE PG.PublishYear IS NOT NULL
+        GROUP BY PG.PublisherID, PG.PublishYear
+    """,
+    "Platform_Revenue": """
+        SELECT PSG.PlatformID, YEAR(PSG.IssuedTime), ROUND(SUM(G.UnitsSold * PSG.Price), 2)
+        FROM Platform_Support_Games PSG
+        JOIN Games G ON G.GameID = PSG.GameID
+        WHERE PSG.IssuedTime IS NOT NULL
+        GROUP BY PSG.PlatformID, YEAR(PSG.IssuedTime)
+    """,
+    "Genre_Stats": """
+        SELECT GS.Genre, GS.GameCount, GS.UnitsSold,
+               IFNULL(PS.PlayCount, 0), IFNULL(PS.RatingSum, 0), IFNULL(PS.RatingCount, 0)
+        FROM (
+            SELECT Genre, COUNT(*) AS GameCount, SUM(UnitsSold) AS UnitsSold
+            FROM Games WHERE Genre IS NOT NULL GROUP BY Genre
+        ) GS
+        LEFT JOIN (
+            SELECT G.Genre, COUNT(*) AS PlayCount, SUM(PPGP.Rating) AS RatingSum, COUNT(PPGP.Rating) AS RatingCount
+            FROM Games G JOIN Player_Platform_Games_Play PPGP ON PPGP.GameID = G.GameID
+            WHERE G.Genre IS NOT NULL GROUP BY G.Genre
+        ) PS ON PS.Genre = GS.Genre
+    """,
+    "Game_Platform_Count": """
+        SELECT G.GameID, COUNT(DISTINCT PSG.PlatformID),
+               CASE WHEN COUNT(DISTINCT PSG.PlatformID) = 1 THEN MIN(PSG.PlatformID) END
+        FROM Games G JOIN Platform_Support_Games PSG ON PSG.GameID = G.GameID
+        GROUP BY G.GameID
+    """,
+    "Game_Playtime_Board": """
+        SELECT GameID, PlayerID, SUM(TotalPlayingTime)
+        FROM Player_Platform_Games_Play GROUP BY GameID, PlayerID
+    """,
+    "Game_Achievement_Board": """
+        SELECT GameID, PlayerID, COUNT(*)
+        FROM Player_Unlock_Achievement GROUP BY GameID, PlayerID
+    """,
+    # every player has a row, zero for those without activity
+    "Player_Profile": f"""
+        SELECT P.UserID, PS.TotalSpent, PS.TotalPlayTime, IFNULL(PS.GamesOwned, 0), IFNULL(PA.Unlocked, 0),
+               {later("PS.LastActivity", "PA.LastGain")}
+        FROM Player P
+        LEFT JOIN (
+            SELECT PlayerID, ROUND(SUM(PurchasePrice), 2) AS TotalSpent, SUM(TotalPlayingTime) AS TotalPlayTime,
+                   COUNT(DISTINCT GameID) AS GamesOwned,
+                   {later("MAX(LastPlayTime)", "MAX(PurchaseTime)")} AS LastActivity
+            FROM Player_Platform_Games_Play GROUP BY PlayerID
+        ) PS ON PS.PlayerID = P.UserID
+        LEFT JOIN (
+            SELECT PlayerID, COUNT(*) AS Unlocked, MAX(GainTime) AS LastGain
+            FROM Player_Unlock_Achievement GROUP BY PlayerID
+        ) PA ON PA.PlayerID = P.UserID
+    """,
+}
+
+
+def accumulate(table, column, scale=None):
+    """
+    ON DUPLICATE KEY UPDATE expression adding a value to a column with SUM()'s NULL handling.
+
+    Parameters:
+    scale: Decimal places of a DECIMAL column. The sum is rounded to them,
+        as SQLite adds DECIMAL values as floating point.
+    """
+    col = f"{table}.{column}"
+    total = f"{col} + IFNULL(VALUES({column}), 0)"
+    if scale is not None:
+        total = f"ROUND({total}, {scale})"
+    return f"{col} = IF({col} IS NULL, VALUES({column}), {total})"
+
+
+# AFTER INSERT triggers applying each new base row to the summaries
+SUMMARY_TRIGGERS = {
+    "trg_games_summary": f"""
+        CREATE TRIGGER trg_games_summary AFTER INSERT ON Games FOR EACH ROW
+        BEGIN
+            IF NEW.Genre IS NOT NULL THEN
+                INSERT INTO Genre_Stats (Genre, GameCount, UnitsSold, PlayCount, RatingSum, RatingCount)
+                VALUES (NEW.Genre, 1, NEW.UnitsSold, 0, 0, 0)
+                ON DUPLICATE KEY UPDATE Genre_Stats.GameCount = Genre_Stats.GameCount + 1,
+                    {accumulate("Genre_Stats", "UnitsSold")};
+            END IF;
+        END
+    """,
+    "trg_ppgp_summary": f"""
+        CREATE TRIGGER trg_ppgp_summary AFTER INSERT ON Player_Platform_Games_Play FOR EACH ROW
+        BEGIN
+            INSERT INTO Genre_Stats (Genre, GameCount, UnitsSold, PlayCount, RatingSum, RatingCount)
+            SELECT G.Genre, 0, NULL, 1, IFNULL(NEW.Rating, 0), NEW.Rating IS NOT NULL
+            FROM Games G WHERE G.GameID = NEW.GameID AND G.Genre IS NOT NULL
+            ON DUPLICATE KEY UPDATE Genre_Stats.PlayCount = Genre_Stats.PlayCount + 1,
+                Genre_Stats.RatingSum = Genre_Stats.RatingSum + VALUES(RatingSum),
+                Genre_Stats.RatingCount = Genre_Stats.RatingCount + VALUES(RatingCount);
+
+            -- the game counts as newly owned unless it was bought on another platform before
+            INSERT INTO Player_Profile (PlayerID, TotalSpent, TotalPlayTime, GamesOwned, AchievementsUnlocked, LastActivity)
+            VALUES (NEW.PlayerID, NEW.PurchasePrice, NEW.TotalPlayingTime,
+                    NOT EXISTS (SELECT 1 FROM Player_Platform_Games_Play PPGP
+                                WHERE PPGP.GameID = NEW.GameID AND PPGP.PlayerID = NEW.PlayerID
+                                  AND PPGP.PlatformID <> NEW.PlatformID),
+                    0, {later("NEW.LastPlayTime", "NEW.PurchaseTime")})
+            ON DUPLICATE KEY UPDATE {accumulate("Player_Profile", "TotalSpent", 2)},
+                {accumulate("Player_Profile", "TotalPlayTime")},
+                Player_Profile.GamesOwned = Player_Profile.GamesOwned + VALUES(GamesOwned),
+                Player_Profile.LastActivity = {later("VALUES(LastActivity)", "Player_Profile.LastActivity")};
+
+            INSERT INTO Game_Playtime_Board (GameID, PlayerID, TotalTime)
+            VALUES (NEW.GameID, NEW.PlayerID, NEW.TotalPlayingTime)
+            ON DUPLICATE KEY UPDATE {accumulate("Game_Playtime_Board", "TotalTime")};
+        END
+    """,
+    "trg_pua_summary": f"""
+        CREATE TRIGGER trg_pua_summary AFTER INSERT ON Player_Unlock_Achievement FOR EACH ROW
+        BEGIN
+            INSERT INTO Player_Profile (PlayerID, TotalSpent, TotalPlayTime, GamesOwned, AchievementsUnlocked, LastActivity)
+            VALUES (NEW.PlayerID, NULL, NULL, 0, 1, NEW.GainTime)
+            ON DUPLICATE KEY UPDATE Player_Profile.AchievementsUnlocked = Player_Profile.AchievementsUnlocked + 1,
+                Player_Profile.LastActivity = {later("VALUES(LastActivity)", "Player_Profile.LastActivity")};
+
+            INSERT INTO Game_Achievement_Board (GameID, PlayerID, Unlocked) VALUES (NEW.GameID, NEW.PlayerID, 1)
+            ON DUPLICATE KEY UPDATE Game_Achievement_Board.Unlocked = Game_Achievement_Board.Unlocked + 1;
+        END
+    """,
+    "trg_player_summary": """
+        CREATE TRIGGER trg_player_summary AFTER INSERT ON Player FOR EACH ROW
+        BEGIN
+            INSERT INTO Player_Profile (PlayerID, TotalSpent, TotalPlayTime, GamesOwned, AchievementsUnlocked, LastActivity)
+            VALUES (NEW.UserID, NULL, NULL, 0, 0, NULL)
+            ON DUPLICATE KEY UPDATE Player_Profile.PlayerID = Player_Profile.PlayerID;
+        END
+    """,
+    "trg_psg_summary": f"""
+        CREATE TRIGGER trg_psg_summary AFTER INSERT ON Platform_Support_Games FOR EACH ROW
+        BEGIN
+            INSERT INTO Game_Platform_Count (GameID, PlatformCount, SolePlatformID) VALUES (NEW.GameID, 1, NEW.PlatformID)
+            ON DUPLICATE KEY UPDATE Game_Platform_Count.PlatformCount = Game_Platform_Count.PlatformCount + 1,
+                Game_Platform_Count.SolePlatformID = NULL;
+
+            INSERT INTO Platform_Revenue (PlatformID, IssuedYear, Revenue)
+            SELECT NEW.PlatformID, YEAR(NEW.IssuedTime), ROUND(G.UnitsSold * NEW.Price, 2)
+            FROM Games G WHERE G.GameID = NEW.GameID AND NEW.IssuedTime IS NOT NULL
+            ON DUPLICATE KEY UPDATE {accumulate("Platform_Revenue", "Revenue", 2)};
+
+            INSERT INTO Developer_Revenue (DeveloperID, FinishYear, Revenue)
+            SELECT DG.DeveloperID, DG.DevelopeFinishYear, ROUND(G.UnitsSold * NEW.Price, 2)
+            FROM Developer_Games DG JOIN Games G ON G.GameID = DG.GameID
+            WHERE DG.GameID = NEW.GameID AND DG.DevelopeFinishYear IS NOT NULL
+            ON DUPLICATE KEY UPDATE {accumulate("Developer_Revenue", "Revenue", 2)};
+
+            INSERT INTO Publisher_Revenue (PublisherID, PublishYear, Revenue)
+            SELECT PG.PublisherID, PG.PublishYear, ROUND(G.UnitsSold * NEW.Price, 2)
+            FROM Publisher_Games PG JOIN Games G ON G.GameID = PG.GameID
+            WHERE PG.GameID = NEW.GameID AND PG.PublishYear IS NOT NULL
+            ON DUPLICATE KEY UPDATE {accumulate("Publisher_Revenue", "Revenue", 2)};
+        END
+    """,
+    "trg_dg_summary": f"""
+        CREATE TRIGGER trg_dg_summary AFTER INSERT ON Developer_Games FOR EACH ROW
+        BEGIN
+            IF NEW.DevelopeFinishYear IS NOT NULL THEN
+                INSERT INTO Developer_Revenue (DeveloperID, FinishYear, Revenue)
+                SELECT NEW.DeveloperID, NEW.DevelopeFinishYear, ROUND(SUM(G.UnitsSold * PSG.Price), 2)
+                FROM Games G JOIN Platform_Support_Games PSG ON PSG.GameID = G.GameID
+                WHERE G.GameID = NEW.GameID
+                HAVING COUNT(*) > 0
+                ON DUPLICATE KEY UPDATE {accumulate("Developer_Revenue", "Revenue", 2)};
+            END IF;
+        END
+    """,
+    "trg_pg_summary": f"""
+        CREATE TRIGGER trg_pg_summary AFTER INSERT ON Publisher_Games FOR EACH ROW
+        BEGIN
+            IF NEW.PublishYear IS NOT NULL THEN
+                INSERT INTO Publisher_Revenue (PublisherID, PublishYear, Revenue)
+                SELECT NEW.PublisherID, NEW.PublishYear, ROUND(SUM(G.UnitsSold * PSG.Price), 2)
+                FROM Games G JOIN Platform_Support_Games PSG ON PSG.GameID = G.GameID
+                WHERE G.GameID = NEW.GameID
+                HAVING COUNT(*) > 0
+                ON DUPLICATE KEY UPDATE {accumulate("Publisher_Revenue", "Revenue", 2)};
+            END IF;
+        END
+    """,
+}
+
+# Secondary indexes for the predefined queries in queries.py, as
+# (table, index name, columns). They are built after loading, which is
+# cheaper than maintaining them row by row.
+INDEXES = [
+    # name lookups behind every platform / publisher / developer filter
+    ("Platform", "idx_platform_name", "PlatformName"),
+    ("Publisher", "idx_publisher_name", "PublisherName"),
+    ("Developer", "idx_developer_name", "DeveloperName"),
+    # q_game_genre orders by ReleaseDate or UnitsSold within a genre;
+    # (Genre, UnitsSold) also covers q_genre_avg_rating by units sold
+    ("Games", "idx_games_genre_release", "Genre, ReleaseDate"),
+    ("Games", "idx_games_genre_units", "Genre, UnitsSold"),
+    # q_game_year, q_game_pub_dev
+    ("Games", "idx_games_release", "ReleaseDate"),
+    # q_user_friends_by_mutualtime
+    ("Player_Friends", "idx_friends_mutual", "Player1ID, MutualTime"),
+    # friendships stored with the user as Player2ID (q_user_friends_by_mutualtime)
+    ("Player_Friends", "idx_friends_reverse_mutual", "Player2ID, MutualTime"),
+    # games of one platform (q_platform_exclusive_games); covers the Platform_Revenue rebuild
+    ("Platform_Support_Games", "idx_psg_platform_issued", "PlatformID, IssuedTime, Price"),
+    # PlayerID is not a primary key prefix: q_user_total_spent, q_user_purchases
+    ("Player_Platform_Games_Play", "idx_ppgp_player_purchase", "PlayerID, PurchaseTime, PurchasePrice"),
+    # covering indexes for the GROUP BY queries over play records
+    ("Player_Platform_Games_Play", "idx_ppgp_platform_game_rating", "PlatformID, GameID, Rating"),
+    ("Player_Platform_Games_Play", "idx_ppgp_game_rating", "GameID, Rating"),
+    ("Player_Platform_Games_Play", "idx_ppgp_game_player_time", "GameID, PlayerID, TotalPlayingTime"),
+    # q_user_achievements_by_game: GameID is not a primary key prefix
+    ("Player_Unlock_Achievement", "idx_pua_game_player", "GameID, PlayerID"),
+    # q_platform_user
+    ("Player_Use_Platform", "idx_pup_platform_time", "PlatformID, TotalTimeSpent"),
+    # q_dev_pub_revenues: a year range over the summaries, covering Revenue
+    ("Developer_Revenue", "idx_devrev_year", "FinishYear, DeveloperID, Revenue"),
+    ("Publisher_Revenue", "idx_pubrev_year", "PublishYear, PublisherID, Revenue"),
+    # q_dev_pub_compatibility: games on more than N platforms
+    ("Game_Platform_Count", "idx_gpc_count", "PlatformCount"),
+    # q_platform_exclusive_games: games sold on one platform only, by GameID
+    ("Game_Platform_Count", "idx_gpc_sole", "SolePlatformID, GameID"),
+    # top-N of a leaderboard is a backward range scan; ranks count the scores above
+    ("Game_Playtime_Board", "idx_playtime_board_rank", "GameID, TotalTime"),
+    ("Game_Achievement_Board", "idx_achievement_board_rank", "GameID, Unlocked"),
+]
+
+
+def table_dependencies():
+    """Map every table in TABLES to the set of tables its foreign keys reference."""
+    deps = {}
+    for ddl in TABLES:
+        table = re.search(r"CREATE TABLE IF NOT EXISTS (\w+)", ddl).group(1)
+        deps[table] = set(re.findall(r"REFERENCES (\w+)", ddl)) - {table}
+    return deps
+
+
+def load_levels(tables=None):
+    """
+    Group tables into levels of the foreign-key DAG.
+
+    Every table only references tables of earlier levels, so the tables of
+    one level can be loaded concurrently. References to tables outside
+    `tables` are ignored, as those are not being loaded.
+    """
+    deps = table_dependencies()
+    pending = [t for t in deps if tables is None or t in tables]
+    remaining = {t: deps[t] & set(pending) for t in pending}
+    levels = []
+    while remaining:
+        level = [t for t in pending if t in remaining and not remaining[t]]
+        if not level:
+            raise ValueError(f"Foreign key cycle between tables: {sorted(remaining)}")
+        levels.append(level)
+        for t in level:
+            del remaining[t]
+        for t in remaining:
+            remaining[t] -= set(level)
+    return levels
+
+
+# parents before children, so foreign keys resolve during loading
+INSERTION_ORDER = [table for level in load_levels() for table in level]
+
 
 def create(cursorObject, database):
     try:
@@ -7,202 +638,6 @@ def create(cursorObject, database):
         cursorObject.execute(f"CREATE DATABASE IF NOT EXISTS {database};")
         cursorObject.execute(f"USE {database};")
 
-        # create tabels
-        TABLES = []
-
-        TABLES.append("""
-        CREATE TABLE Games (
-            GameID INT PRIMARY KEY,
-            Name VARCHAR(255) NOT NULL,
-            Description TEXT,
-            ReleaseDate DATE NOT NULL,
-            LanguageSupport VARCHAR(255),
-            Genre VARCHAR(100),
-            RequireAge INT DEFAULT NULL,
-            Tags VARCHAR(255),
-            UnitsSold INT
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Achievement (
-            GameID INT,
-            AchievementID INT,
-            Name VARCHAR(255),
-            Description TEXT,
-            PRIMARY KEY (GameID, AchievementID),
-            FOREIGN KEY (GameID) REFERENCES Games(GameID)
-                ON DELETE CASCADE ON UPDATE CASCADE
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE DLC (
-            GameID INT,
-            DLCID INT,
-            Name VARCHAR(255),
-            ReleaseDate DATE,
-            Price DECIMAL(10, 2),
-            Description TEXT,
-            PRIMARY KEY (GameID, DLCID),
-            FOREIGN KEY (GameID) REFERENCES Games(GameID)
-                ON DELETE CASCADE ON UPDATE CASCADE
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Player (
-            UserID INT PRIMARY KEY,
-            UserName VARCHAR(255),
-            Email VARCHAR(255),
-            Region VARCHAR(100),
-            JoinDate DATE,
-            Level INT,
-            TotalPlayTime INT,
-            GamesOwned INT
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Platform (
-            PlatformID INT PRIMARY KEY,
-            PlatformName VARCHAR(255),
-            Manufacturer VARCHAR(255),
-            TotalGameNumber INT,
-            WebSite VARCHAR(255)
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Developer (
-            DeveloperID INT PRIMARY KEY,
-            DeveloperName VARCHAR(255),
-            Address VARCHAR(255),
-            FoundedYear INT,
-            Country VARCHAR(100),
-            Website VARCHAR(255)
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Publisher (
-            PublisherID INT PRIMARY KEY,
-            PublisherName VARCHAR(255),
-            Address VARCHAR(255),
-            FoundedYear INT,
-            Country VARCHAR(100),
-            Website VARCHAR(255),
-            Description TEXT
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Player_Platform_Games_Play (
-            GameID INT,
-            PlatformID INT,
-            PlayerID INT,
-            TotalPlayingTime INT,
-            LastPlayTime DATETIME,
-            PurchaseTime DATETIME,
-            PurchasePrice DECIMAL(10, 2),
-            Review TEXT,
-            Rating INT CHECK (Rating BETWEEN 1 AND 10),
-            PRIMARY KEY (GameID, PlatformID, PlayerID),
-            FOREIGN KEY (GameID) REFERENCES Games(GameID)
-                ON DELETE CASCADE ON UPDATE CASCADE,
-            FOREIGN KEY (PlatformID) REFERENCES Platform(PlatformID)
-                ON DELETE CASCADE ON UPDATE CASCADE,
-            FOREIGN KEY (PlayerID) REFERENCES Player(UserID)
-                ON DELETE CASCADE ON UPDATE CASCADE
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Player_Unlock_Achievement (
-            PlayerID INT,
-            GameID INT,
-            AchievementID INT,
-            GainTime DATE,
-            PRIMARY KEY (PlayerID, GameID, AchievementID),
-            FOREIGN KEY (GameID, AchievementID) REFERENCES Achievement(GameID, AchievementID)
-                ON DELETE CASCADE ON UPDATE CASCADE,
-            FOREIGN KEY (PlayerID) REFERENCES Player(UserID)
-                ON DELETE CASCADE ON UPDATE CASCADE
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Player_Use_Platform (
-            PlayerID INT,
-            PlatformID INT,
-            RegistrationDate DATETIME,
-            TotalTimeSpent INT,       
-            PRIMARY KEY (PlayerID, PlatformID),
-            FOREIGN KEY (PlatformID) REFERENCES Platform(PlatformID)
-                ON DELETE CASCADE ON UPDATE CASCADE,
-            FOREIGN KEY (PlayerID) REFERENCES Player(UserID)
-                ON DELETE CASCADE ON UPDATE CASCADE
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Player_Friends (
-            Player1ID INT,
-            Player2ID INT,
-            StartDate DATETIME,
-            MutualTime INT,
-            PRIMARY KEY (Player1ID, Player2ID),
-            FOREIGN KEY (Player1ID) REFERENCES Player(UserID)
-                ON DELETE CASCADE ON UPDATE CASCADE,
-            FOREIGN KEY (Player2ID) REFERENCES Player(UserID)
-                ON DELETE CASCADE ON UPDATE CASCADE
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Platform_Support_Games (
-            GameID INT,
-            PlatformID INT,
-            Price DECIMAL(10, 2),
-            IssuedTime DATE,
-            Rating DECIMAL(3, 1),
-            PRIMARY KEY (GameID, PlatformID),
-            FOREIGN KEY (GameID) REFERENCES Games(GameID)
-                ON DELETE CASCADE ON UPDATE CASCADE,
-            FOREIGN KEY (PlatformID) REFERENCES Platform(PlatformID)
-                ON DELETE CASCADE ON UPDATE CASCADE
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Developer_Games (
-            GameID INT,
-            DeveloperID INT,
-            DevelopeStartYear YEAR,
-            DevelopeFinishYear YEAR,
-            DevelopeCost DECIMAL(12, 2),
-            PRIMARY KEY (GameID, DeveloperID),
-            FOREIGN KEY (GameID) REFERENCES Games(GameID)
-                ON DELETE CASCADE ON UPDATE CASCADE,
-            FOREIGN KEY (DeveloperID) REFERENCES Developer(DeveloperID)
-                ON DELETE CASCADE ON UPDATE CASCADE
-        );
-        """)
-
-        TABLES.append("""
-        CREATE TABLE Publisher_Games (
-            GameID INT,
-            PublisherID INT,
-            PublishYear YEAR,
-            PublishCost DECIMAL(12, 2),
-            PRIMARY KEY (GameID, PublisherID),
-            FOREIGN KEY (GameID) REFERENCES Games(GameID)
-                ON DELETE CASCADE ON UPDATE CASCADE,
-            FOREIGN KEY (PublisherID) REFERENCES Publisher(PublisherID)
-                ON DELETE CASCADE ON UPDATE CASCADE
-        );
-        """)
-
         for sql in TABLES:
             cursorObject.execute(sql)
 
@@ -212,73 +647,846 @@ def create(cursorObject, database):
         print("Error:", err)
 
 
-def insert(cursorObject, dataset, table):
+def drop(cursorObject, database):
+    """Drop every table of the schema so create() can rebuild it."""
+    cursorObject.execute(f"CREATE DATABASE IF NOT EXISTS {database};")
+    cursorObject.execute(f"USE {database};")
+    cursorObject.execute("SET FOREIGN_KEY_CHECKS = 0")
+    try:
+        for table in reversed(INSERTION_ORDER):
+            cursorObject.execute(f"DROP TABLE IF EXISTS {table}")
+    finally:
+        cursorObject.execute("SET FOREIGN_KEY_CHECKS = 1")
+    cache.clear()
+    print(f"Dropped tables of '{database}' for schema version {SCHEMA_VERSION}.")
+
+
+def table_columns(table):
+    """Map each column of a table to its SQL type name, parsed from TABLES."""
+    return dict(re.findall(r"^\s*(\w+) (INT|BIGINT|VARCHAR|TEXT|DATETIME|DATE|DECIMAL|YEAR)\b", table_ddl(table), re.M))
+
+
+def decimal_scales(table):
+    """Map each DECIMAL column of a table to its number of decimal places."""
+    return {col: int(scale) for col, scale in
+            re.findall(r"^\s*(\w+) DECIMAL\(\d+,\s*(\d+)\)", table_ddl(table), re.M)}
+
+
+def table_ddl(table):
+    for ddl in TABLES:
+        if re.search(rf"CREATE TABLE IF NOT EXISTS {table} \(", ddl):
+            return ddl
+    return ""
+
+
+def primary_key(table):
+    """Return the primary key columns of a table, parsed from TABLES."""
+    ddl = table_ddl(table)
+    match = re.search(r"PRIMARY KEY \(([^)]*)\)", ddl)
+    if match:
+        return [col.strip() for col in match.group(1).split(",")]
+    return re.findall(r"^\s*(\w+) \S+ PRIMARY KEY", ddl, re.M)
+
+
+def foreign_keys(table):
+    """Return (columns, parent table, parent columns) for each foreign key of a table."""
+    keys = []
+    for cols, parent, parent_cols in re.findall(r"FOREIGN KEY \(([^)]*)\) REFERENCES (\w+)\(([^)]*)\)", table_ddl(table)):
+        keys.append(([c.strip() for c in cols.split(",")], parent, [c.strip() for c in parent_cols.split(",")]))
+    return keys
+
+
+def to_date(val):
+    # the CSVs mix 2019/10/7, 2018-6-3 and 2024-08-03
+    year, month, day = re.split(r"[-/]", val)
+    return date(int(year), int(month), int(day))
+
+
+def to_datetime(val):
+    day, _, clock = val.partition(" ")
+    day = to_date(day)
+    if not clock:
+        return datetime(day.year, day.month, day.day)
+    parts = [int(float(p)) for p in clock.split(":")] + [0, 0]
+    return datetime(day.year, day.month, day.day, parts[0], parts[1], parts[2])
+
+
+CONVERTERS = {
+    "INT": int,
+    "BIGINT": int,
+    "YEAR": int,
+    "DECIMAL": Decimal,
+    "DATE": to_date,
+    "DATETIME": to_datetime,
+}
+
+
+def csv_rows(file_path):
+    """Return the header of a CSV file and a generator over its raw rows."""
+    f = open(file_path, newline='', encoding='utf-8')
+    reader = csv.reader(f)
+    header = next(reader)
+
+    def rows():
+        with f:
+            yield from reader
+
+    return header, rows()
+
+
+def typed_rows(table, header, rows):
     """
-    Insert multiple records into a database table.
+    Convert raw CSV rows into tuples typed after the table's columns.
+
+    Empty fields become None. A value that does not parse is passed through
+    unchanged so the server reports it, as it did for the string rows.
+    """
+    types = table_columns(table)
+    converters = [CONVERTERS.get(types.get(col)) for col in header]
+
+    def convert(fn, val):
+        if val == '':
+            return None
+        if fn is None:
+            return val
+        try:
+            return fn(val)
+        except (ValueError, ArithmeticError):
+            return val
+
+    for row in rows:
+        yield tuple([convert(fn, val) for fn, val in zip(converters, row)])
+
+
+def batched(rows, batch_size):
+    """Group an iterable of rows into lists of at most batch_size rows."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert(cursorObject, table, columns, batches):
+    """
+    Insert batches of rows into a database table.
 
     Parameters:
     cursorObject: A database cursor object.
-    dataset: A list of dictionaries, each representing a row to insert.
     table: The name of the table to insert data into.
-    """
-    if not dataset:
-        print("No data provided.")
-        return
+    columns: The column names, in the order of each row.
+    batches: An iterable of lists of tuples, e.g. from batched().
 
-    # Extract columns from the first record
-    columns = dataset[0].keys()
+    Returns the number of inserted rows.
+    """
     column_names = ", ".join(f"`{col}`" for col in columns)
     placeholders = ", ".join(["%s"] * len(columns))
 
-    # Construct the SQL query
+    # executemany rewrites this into a single multi-row INSERT per batch
     sql = f"INSERT INTO {table} ({column_names}) VALUES ({placeholders})"
 
-    # Prepare values as a list of tuples
-    values = [tuple(record[col] for col in columns) for record in dataset]
+    inserted = 0
+    for batch in batches:
+        cursorObject.executemany(sql, batch)
+        inserted += len(batch)
+    return inserted
+
+
+def checked_rows(table, header, rows, first_line=2):
+    """
+    Convert raw CSV rows like typed_rows(), but reject rows that do not parse.
+
+    Yields (line, row, error) per non-blank row: the typed tuple and None,
+    or None and a message naming the offending field.
+    """
+    types = table_columns(table)
+    converters = [CONVERTERS.get(types.get(col)) for col in header]
+
+    for line, raw in enumerate(rows, first_line):
+        if not any(raw):
+            continue
+        if len(raw) != len(header):
+            yield line, None, f"expected {len(header)} fields, got {len(raw)}"
+            continue
+        values, error = [], None
+        for col, fn, val in zip(header, converters, raw):
+            if val == '' or fn is None:
+                values.append(val or None)
+                continue
+            try:
+                values.append(fn(val))
+            except (ValueError, ArithmeticError):
+                error = f"{col}: cannot read {val!r} as {types[col]}"
+                break
+        yield line, (tuple(values) if error is None else None), error
+
+
+def allocate_ids(cursorObject, table, count=1, scope=0):
+    """
+    Reserve `count` consecutive IDs for new rows of a table and return the first.
+
+    The Id_Sequence row is advanced with LAST_INSERT_ID(expr), so the block
+    comes back in the statement's OK packet without another query, and the
+    row lock makes concurrent clients take turns (on SQLite, RETURNING and
+    the database write lock do the same). The block is committed at
+    once rather than held until the rows are inserted; rows never inserted
+    leave a gap. The counter never falls behind the table's own maximum,
+    so IDs inserted by other means, or a missing sequence row, are no problem.
+
+    Parameters:
+    cursorObject: A database cursor object with no uncommitted work.
+    table: A table of ID_SEQUENCES.
+    count: Number of IDs to reserve.
+    scope: The GameID for tables numbered per game.
+    """
+    column, scope_column = ID_SEQUENCES[table]
+    where = f"{scope_column} = %s" if scope_column else "TRUE"
+    params = (table, scope or 0, count) + ((scope,) if scope_column else ()) + (count,)
+    start = f"IFNULL(MAX({column}), 0) + %s"
+    advance = "GREATEST(Id_Sequence.LastID + %s, VALUES(LastID))"
+    sqlite = backend.dialect_of(cursorObject) == "sqlite"
+    if not sqlite:
+        start, advance = f"LAST_INSERT_ID({start})", f"LAST_INSERT_ID({advance})"
+    # the table's maximum is a single index dive: the key column is the
+    # primary key, or follows the scope column in it
+    cursorObject.execute(f"""
+        INSERT INTO Id_Sequence (TableName, ScopeID, LastID)
+        SELECT %s, %s, {start} FROM {table} WHERE {where}
+        ON DUPLICATE KEY UPDATE LastID = {advance}
+        {"RETURNING LastID" if sqlite else ""}
+    """, params)
+    if sqlite:
+        # one writer at a time; the new value comes back as a result row
+        last = cursorObject.fetchone()[0]
+    else:
+        last = cursorObject.lastrowid
+        if not last:
+            cursorObject.execute("SELECT LAST_INSERT_ID()")
+            last = cursorObject.fetchone()[0]
+    cursorObject.execute("COMMIT")
+    return last - count + 1
+
+
+def import_rows(cursorObject, table, header, rows, allowed, number_ids=True, batch_size=BATCH_SIZE):
+    """
+    Append CSV rows to a table, e.g. rows pasted into the update window.
+
+    Parameters:
+    cursorObject: A database cursor object.
+    table: The name of the table to insert into.
+    header: Column names of the rows; each must be in `allowed`.
+    rows: An iterable of raw CSV rows (lists of strings).
+    allowed: The columns a user may supply for this table.
+    number_ids: Give the rows of an ID_SEQUENCES table new IDs, one
+        allocate_ids() block per batch (and game).
+    batch_size: Rows per transaction.
+
+    A batch the server rejects is rolled back and retried row by row, so
+    one bad row only costs itself. Returns {"inserted", "first_id",
+    "last_id", "errors"}, where errors lists (line, message) for every row
+    that was not inserted.
+    """
+    unknown = [col for col in header if col not in allowed]
+    if unknown or len(set(header)) != len(header) or not header:
+        raise ValueError(f"The header must name distinct columns of {table} out of: {', '.join(allowed)}"
+                         + (f" (unknown: {', '.join(unknown)})" if unknown else ""))
+
+    columns = list(header)
+    id_field, scope_field = ID_SEQUENCES.get(table, (None, None)) if number_ids else (None, None)
+    if id_field:
+        columns.append(id_field)
+    if scope_field and scope_field not in header:
+        raise ValueError(f"{table} rows are numbered per {scope_field}, so the header must include it")
+    scope_index = header.index(scope_field) if scope_field else None
+    errors = []
+    first_id = last_id = None
+
+    def valid():
+        for line, row, error in checked_rows(table, header, rows):
+            if error:
+                errors.append((line, error))
+            elif scope_index is not None and row[scope_index] is None:
+                errors.append((line, f"{scope_field} is required"))
+            else:
+                yield line, row
+
+    def numbered(batch):
+        scopes = Counter(0 if scope_index is None else row[scope_index] for _, row in batch)
+        next_ids = {scope: allocate_ids(cursorObject, table, n, scope) for scope, n in scopes.items()}
+        for line, row in batch:
+            scope = 0 if scope_index is None else row[scope_index]
+            yield line, row + (next_ids[scope],)
+            next_ids[scope] += 1
+
+    inserted = 0
+    for batch in batched(valid(), batch_size):
+        if id_field:
+            batch = list(numbered(batch))
+        started = time.monotonic()
+        try:
+            insert(cursorObject, table, columns, [[row for _, row in batch]])
+            cursorObject.execute("COMMIT")
+            done = [row for _, row in batch]
+        except mysql.connector.Error:
+            cursorObject.execute("ROLLBACK")
+            done = []
+            for line, row in batch:
+                try:
+                    insert(cursorObject, table, columns, [[row]])
+                    done.append(row)
+                except mysql.connector.Error as err:
+                    errors.append((line, err.msg))
+            cursorObject.execute("COMMIT")
+        inserted += len(done)
+        if done:
+            cache.inserted(table, columns, done, started)
+        if id_field and done:
+            ids = [row[-1] for row in done]
+            first_id = min(ids + [first_id or ids[0]])
+            last_id = max(ids + [last_id or ids[0]])
+
+    return {"inserted": inserted, "first_id": first_id, "last_id": last_id, "errors": sorted(errors)}
+
+
+def load_stream(cursorObject, table, file_path, batch_size=BATCH_SIZE, name=None):
+    """
+    Read, type, batch and insert one CSV file holding one batch in memory.
+
+    A batch the server rejects is rolled back to a savepoint and its rows
+    are inserted one by one, so the error names the offending line and row.
+    Raises ValueError for that row.
+
+    Parameters:
+    name: How to call the file in that error, by default its file name.
+    """
+    name = name or os.path.basename(file_path)
+    header, rows = csv_rows(file_path)
+    inserted = 0
+    for batch in batched(enumerate(typed_rows(table, header, rows), 2), batch_size):
+        cursorObject.execute("SAVEPOINT load_batch")
+        try:
+            inserted += insert(cursorObject, table, header, [[row for _, row in batch]])
+        except mysql.connector.Error:
+            cursorObject.execute("ROLLBACK TO SAVEPOINT load_batch")
+            for line, row in batch:
+                try:
+                    inserted += insert(cursorObject, table, header, [[row]])
+                except mysql.connector.Error as err:
+                    values = ", ".join(f"{col}={'' if val is None else str(val)[:40]}"
+                                       for col, val in zip(header, row))
+                    raise ValueError(f"line {line} of {name} was rejected: {err.msg}\n  ({values})") from err
+        cursorObject.execute("RELEASE SAVEPOINT load_batch")
+    return inserted
 
+
+def sort_csv(table, file_path, run_size=SORT_RUN_SIZE):
+    """
+    Put a CSV file in primary-key order, so InnoDB appends to its clustered index.
+
+    Returns None if the file is already sorted. Otherwise sorts runs of
+    run_size rows into temporary files, merges them into a new temporary
+    CSV and returns its path; the caller removes it.
+    """
+    header, rows = csv_rows(file_path)
+    types = table_columns(table)
+    positions = [header.index(col) for col in primary_key(table)]
+    converters = [CONVERTERS.get(types.get(header[i]), str) for i in positions]
+
+    def key(row):
+        return tuple(fn(row[i]) for fn, i in zip(converters, positions))
+
+    previous = None
+    for row in rows:
+        current = key(row)
+        if previous is not None and current < previous:
+            break
+        previous = current
+    else:
+        return None
+    rows.close()
+
+    header, rows = csv_rows(file_path)
+    runs = []
     try:
-        cursorObject.executemany(sql, values)
-        print(f"{cursorObject.rowcount} records inserted into '{table}'.")
-    except Exception as e:
-        print("Error during insertion:", e)
+        for batch in batched(rows, run_size):
+            batch.sort(key=key)
+            run = tempfile.TemporaryFile('w+', newline='', encoding='utf-8')
+            csv.writer(run).writerows(batch)
+            run.seek(0)
+            runs.append(run)
+
+        fd, sorted_path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as out:
+            writer = csv.writer(out)
+            writer.writerow(header)
+            writer.writerows(heapq.merge(*(csv.reader(run) for run in runs), key=key))
+    finally:
+        for run in runs:
+            run.close()
+    return sorted_path
+
+
+def line_terminator(file_path):
+    with open(file_path, 'rb') as f:
+        head = f.read(1 << 16)
+    if b'\r\n' in head:
+        return '\r\n'
+    if b'\r' in head and b'\n' not in head:
+        return '\r'
+    return '\n'
+
+
+def load_local_infile(cursorObject, table, file_path):
+    """
+    Stream a CSV file to the server with LOAD DATA LOCAL INFILE.
+
+    Empty fields become NULL, matching the executemany path. Returns the
+    number of loaded rows.
+    """
+    with open(file_path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    variables = [f"@c{i}" for i in range(len(header))]
+    assignments = ", ".join(f"`{col}` = NULLIF({var}, '')" for col, var in zip(header, variables))
+
+    sql = f"""
+        LOAD DATA LOCAL INFILE %s
+        INTO TABLE {table}
+        CHARACTER SET utf8mb4
+        FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+        LINES TERMINATED BY %s
+        IGNORE 1 LINES
+        ({", ".join(variables)})
+        SET {assignments}
+    """
+    cursorObject.execute(sql, (os.path.abspath(file_path), line_terminator(file_path)))
+    if cursorObject.warning_count:
+        print(f"{cursorObject.warning_count} warnings while loading '{table}'.")
+    return cursorObject.rowcount
 
 
-def load_csv_data(folder_path):
-    data_batches = []
+def bulk_load(cursorObject, table, file_path, batch_size=BATCH_SIZE, use_infile=True, name=None):
+    """
+    Load one CSV file into its table, preferring LOAD DATA LOCAL INFILE.
 
-    def clean(val):
-        return None if val == '' else val
+    Falls back to chunked multi-row inserts when the client or the server
+    does not permit local infile. Returns a dict with the table, row count,
+    method and elapsed seconds, or None if loading failed; the error and
+    the CSV line the server rejected are printed, calling the file `name`.
+    """
+    start = time.perf_counter()
+    method = None
+    try:
+        if use_infile:
+            try:
+                count = load_local_infile(cursorObject, table, file_path)
+                method = "infile"
+            except mysql.connector.Error as err:
+                if err.errno not in INFILE_REFUSED:
+                    # LOAD DATA does not say which row it rejected: find it with
+                    # batched inserts, rolled back whether or not they succeed
+                    cursorObject.execute("SAVEPOINT find_row")
+                    try:
+                        load_stream(cursorObject, table, file_path, batch_size, name)
+                    finally:
+                        cursorObject.execute("ROLLBACK TO SAVEPOINT find_row")
+                    raise
+                print(f"LOAD DATA LOCAL INFILE not permitted ({err.msg}), using batched inserts.")
+        if method is None:
+            count = load_stream(cursorObject, table, file_path, batch_size, name)
+            method = "executemany"
+    except Exception as e:
+        print(f"Error during insertion into '{table}':", e)
+        return None
 
+    seconds = time.perf_counter() - start
+    rate = count / seconds if seconds > 0 else float('inf')
+    print(f"{count} records loaded into '{table}' via {method} in {seconds:.3f}s ({rate:,.0f} rows/s).")
+    return {"table": table, "rows": count, "method": method, "seconds": seconds}
+
+
+def file_fingerprints(folder_path):
+    """Map each table with a CSV in folder_path to the SHA-256 of that file."""
+    hashes = {}
     for filename in os.listdir(folder_path):
         if filename.endswith('.csv'):
-            table_name = filename[:-4]
-            file_path = os.path.join(folder_path, filename)
-            with open(file_path, newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                dataset = []
-                for row in reader:
-                    cleaned_row = {key: clean(value) for key, value in row.items()}
-                    dataset.append(cleaned_row)
-                data_batches.append((table_name, dataset))
-    return data_batches
-
-
-def initialize(cursorObject, database):
-    create(cursorObject, database)
-    folder_path = './data'
-    data_batches = load_csv_data(folder_path)
-
-    insertion_order = [
-        "Games", "Player", "Platform", "Developer", "Publisher",
-        "Achievement", "DLC",
-        "Developer_Games", "Publisher_Games", "Platform_Support_Games",
-        "Player_Platform_Games_Play", "Player_Unlock_Achievement",
-        "Player_Use_Platform", "Player_Friends"
-    ]
-
-    data_batches.sort(key=lambda x: insertion_order.index(x[0]) if x[0] in insertion_order else float('inf'))
-
-    for table_name, dataset in data_batches:
-        print(f"Inserting into table: {table_name}")
-        insert(cursorObject, dataset, table_name)
+            digest = hashlib.sha256()
+            with open(os.path.join(folder_path, filename), 'rb') as f:
+                for block in iter(lambda: f.read(1 << 16), b''):
+                    digest.update(block)
+            hashes[filename[:-4]] = digest.hexdigest()
+    return hashes
+
+
+def read_fingerprints(cursorObject, database):
+    """
+    Fetch the recorded schema version and file hashes in one lookup.
+
+    Returns an empty dict when the database or the bookkeeping table does
+    not exist yet. Any other error is raised: initialize() rebuilds a
+    database without fingerprints from scratch.
+    """
+    try:
+        cursorObject.execute(f"SELECT TableName, FileHash FROM {database}.{FINGERPRINT_TABLE}")
+        return dict(cursorObject.fetchall())
+    except mysql.connector.Error as err:
+        if err.errno in NOT_CREATED:
+            return {}
+        raise
+
+
+def record_fingerprint(cursorObject, table, file_hash):
+    cursorObject.execute(
+        f"INSERT INTO {FINGERPRINT_TABLE} (TableName, FileHash) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE FileHash = VALUES(FileHash), LoadedAt = CURRENT_TIMESTAMP",
+        (table, file_hash)
+    )
+
+
+def existing_indexes(cursorObject, database):
+    """Return the (table, index name) pairs present in the database."""
+    if backend.dialect_of(cursorObject) == "sqlite":
+        cursorObject.execute("SELECT tbl_name, name FROM sqlite_master WHERE type = 'index'")
+    else:
+        cursorObject.execute(
+            "SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s",
+            (database,)
+        )
+    return set(cursorObject.fetchall())
+
+
+def create_indexes(cursorObject, database):
+    """Add the INDEXES that do not exist yet, one ALTER TABLE per table."""
+    existing = existing_indexes(cursorObject, database)
+
+    missing = {}
+    for table, name, columns in INDEXES:
+        if (table, name) not in existing:
+            missing.setdefault(table, []).append(f"ADD INDEX {name} ({columns})")
+
+    for table, clauses in missing.items():
+        start = time.perf_counter()
+        cursorObject.execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+        print(f"Built {len(clauses)} indexes on '{table}' in {time.perf_counter() - start:.3f}s.")
+
+
+def drop_indexes(cursorObject, database):
+    """Drop the INDEXES again, e.g. to benchmark the queries without them."""
+    existing = existing_indexes(cursorObject, database)
+    for table, name, columns in INDEXES:
+        if (table, name) in existing:
+            cursorObject.execute(f"ALTER TABLE {table} DROP INDEX {name}")
+
+
+def verify_integrity(cursorObject, tables=None):
+    """
+    Check every foreign key after a load with FOREIGN_KEY_CHECKS disabled.
+
+    Rows whose parent is missing are deleted, parents first so that rows
+    orphaned by an earlier rejection are caught too. Returns one dict per
+    violated constraint with the table, parent, rejected row count and a
+    few sample keys.
+    """
+    rejected = []
+    for table in INSERTION_ORDER:
+        if tables is not None and table not in tables:
+            continue
+        for cols, parent, parent_cols in foreign_keys(table):
+            join = " AND ".join(f"c.{c} = p.{pc}" for c, pc in zip(cols, parent_cols))
+            orphan = f"p.{parent_cols[0]} IS NULL AND " + " AND ".join(f"c.{c} IS NOT NULL" for c in cols)
+            key = ", ".join(f"c.{col}" for col in primary_key(table))
+
+            cursorObject.execute(f"""
+                SELECT {key} FROM {table} c LEFT JOIN {parent} p ON {join}
+                WHERE {orphan} LIMIT 5
+            """)
+            sample = cursorObject.fetchall()
+            if not sample:
+                continue
+            cursorObject.execute(f"DELETE c FROM {table} c LEFT JOIN {parent} p ON {join} WHERE {orphan}")
+            rejected.append({"table": table, "parent": parent, "columns": cols,
+                             "rejected": cursorObject.rowcount, "sample": sample})
+    cursorObject.execute("COMMIT")
+    cache.invalidate(*(r["table"] for r in rejected))
+
+    for r in rejected:
+        print(f"Rejected {r['rejected']} rows of '{r['table']}' without a matching {r['parent']} "
+              f"({', '.join(r['columns'])}), e.g. keys {r['sample']}.")
+    return rejected
+
+
+def drop_triggers(cursorObject):
+    for name in SUMMARY_TRIGGERS:
+        cursorObject.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def create_triggers(cursorObject):
+    """(Re)create the SUMMARY_TRIGGERS; returns False if the server refused them."""
+    try:
+        drop_triggers(cursorObject)
+        for sql in SUMMARY_TRIGGERS.values():
+            cursorObject.execute(sql)
+    except mysql.connector.Error as err:
+        # e.g. no TRIGGER privilege, or binary logging without log_bin_trust_function_creators
+        print(f"Cannot create the summary triggers ({err}); run 'python initialize.py rebuild-summaries' after inserting data.")
+        return False
+    return True
+
+
+def rebuild_summaries(cursorObject, tables=None):
+    """Recompute the summary tables (all of SUMMARIES by default) from the base tables in one transaction."""
+    start = time.perf_counter()
+    tables = list(tables or SUMMARIES)
+    for table in tables:
+        cursorObject.execute(f"DELETE FROM {table}")
+        cursorObject.execute(f"INSERT INTO {table} {SUMMARIES[table]}")
+    cursorObject.execute("COMMIT")
+    cache.invalidate(*tables)
+    print(f"Rebuilt {', '.join(tables) if len(tables) < len(SUMMARIES) else 'summary tables'} "
+          f"in {time.perf_counter() - start:.3f}s.")
+
+
+def check_summaries(cursorObject, repair=False):
+    """
+    Compare every summary table with a fresh recompute of it.
+
+    The recompute goes into a temporary copy of the table, which is then
+    diffed against the maintained rows. Returns one dict per inconsistent
+    table with the rows the summary lacks ("missing") and the rows it should
+    not have or holds with other values ("stale"). With repair, inconsistent
+    summaries are rebuilt afterwards.
+    """
+    report = []
+    for table, sql in SUMMARIES.items():
+        fresh = f"Fresh_{table}"
+        cursorObject.execute(f"DROP TEMPORARY TABLE IF EXISTS {fresh}")
+        cursorObject.execute(f"CREATE TEMPORARY TABLE {fresh} LIKE {table}")
+        cursorObject.execute(f"INSERT INTO {fresh} {sql}")
+
+        # DECIMAL columns are compared at their declared scale: SQLite stores them as floating point
+        scales = decimal_scales(table)
+        same = " AND ".join(f"ROUND(a.{col}, {scales[col]}) <=> ROUND(b.{col}, {scales[col]})" if col in scales
+                            else f"a.{col} <=> b.{col}" for col in table_columns(table))
+        first = primary_key(table)[0]
+        diff = {}
+        for kind, left, right in (("missing", fresh, table), ("stale", table, fresh)):
+            cursorObject.execute(f"SELECT a.* FROM {left} a LEFT JOIN {right} b ON {same} WHERE b.{first} IS NULL")
+            diff[kind] = cursorObject.fetchall()
+        cursorObject.execute(f"DROP TEMPORARY TABLE {fresh}")
+
+        if diff["missing"] or diff["stale"]:
+            report.append({"table": table, **diff})
+            print(f"'{table}' is inconsistent: {len(diff['missing'])} rows missing, {len(diff['stale'])} stale, "
+                  f"e.g. {(diff['missing'] + diff['stale'])[:3]}.")
+        else:
+            print(f"'{table}' is consistent.")
+
+    if report and repair:
+        rebuild_summaries(cursorObject)
+    return report
+
+
+def load_table(cursorObject, table, file_path, file_hash, batch_size=BATCH_SIZE, use_infile=True, fast=False):
+    """
+    Replace the contents of one table with its CSV in a single transaction.
+
+    The old rows are deleted without foreign key checks, so reloading a
+    parent does not cascade into its children; reloaded parents keep their
+    keys. In fast mode the rows are loaded in primary-key order and the
+    checks stay off (see initialize()); otherwise they are re-enabled for
+    the insert. Returns the bulk_load() stats, or None if the table was left
+    unchanged.
+    """
+    print(f"Inserting into table: {table}")
+    cursorObject.execute("SET FOREIGN_KEY_CHECKS = 0")
+    cursorObject.execute(f"DELETE FROM {table}")
+    if not fast:
+        cursorObject.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+    sorted_path = None
+    if fast:
+        try:
+            sorted_path = sort_csv(table, file_path)
+        except (ValueError, TypeError) as e:
+            print(f"Cannot sort '{table}' by primary key ({e}), loading it in file order.")
+    try:
+        # lines of a sorted copy are reported as such
+        name = f"{os.path.basename(file_path)} in primary-key order" if sorted_path else None
+        result = bulk_load(cursorObject, table, sorted_path or file_path, batch_size, use_infile, name)
+    finally:
+        if sorted_path:
+            os.remove(sorted_path)
+    if result is None:
+        cursorObject.execute("ROLLBACK")
+        return None
+    result["table"] = table
+    record_fingerprint(cursorObject, table, file_hash)
+    cursorObject.execute("COMMIT")
+    cache.invalidate(table)
+    return result
+
+
+def load_parallel(connect, database, levels, folder_path, hashes, batch_size=BATCH_SIZE,
+                  use_infile=True, workers=4, fast=False):
+    """
+    Load each level of the foreign-key DAG concurrently.
+
+    connect is a callable returning a new connection; at most `workers`
+    connections are opened and shared by all levels. A level starts once
+    every table of the previous one is committed.
+    """
+    connections = queue.Queue()
+    opened = []
+    infile = {"allowed": use_infile}
+
+    def borrow():
+        try:
+            return connections.get_nowait()
+        except queue.Empty:
+            conn = connect()
+            opened.append(conn)
+            cursor = conn.cursor()
+            cursor.execute(f"USE {database};")
+            if fast:
+                cursor.execute("SET UNIQUE_CHECKS = 0")
+            cursor.close()
+            return conn
+
+    def run(table):
+        conn = borrow()
+        try:
+            cursor = monitor.cursor(conn.cursor())
+            result = load_table(cursor, table, os.path.join(folder_path, f"{table}.csv"),
+                                hashes[table], batch_size, infile["allowed"], fast)
+            cursor.close()
+            if result is not None and result["method"] != "infile":
+                # do not retry a refused LOAD DATA for every remaining table
+                infile["allowed"] = False
+            return result
+        finally:
+            connections.put(conn)
+
+    stats = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for n, level in enumerate(levels):
+                start = time.perf_counter()
+                results = list(executor.map(run, level))
+                print(f"Level {n} ({', '.join(level)}) loaded in {time.perf_counter() - start:.3f}s.")
+                stats.extend(r for r in results if r is not None)
+    finally:
+        for conn in opened:
+            conn.close()
+    return stats
+
+
+def initialize(cursorObject, database, folder_path=DATA_FOLDER, batch_size=BATCH_SIZE, use_infile=True,
+               connect=None, workers=4, fast=None):
+    """
+    Create the schema if needed and load every CSV whose hash changed.
+
+    With connect (a callable returning a new connection) the tables of each
+    foreign-key level are loaded concurrently on up to `workers`
+    connections; otherwise they are loaded one by one on cursorObject.
+
+    fast selects the fast initial load: foreign key and unique checks stay
+    off for the whole load, rows go in primary-key order, and a single
+    verify_integrity() pass at the end removes and reports rows without a
+    parent. It defaults to on when the schema was just created.
+
+    A SQLite database always loads sequentially in fast mode, without
+    LOAD DATA: it has one writer at a time and cannot switch foreign key
+    checks inside a transaction.
+
+    Returns the per-table bulk_load() stats.
+    """
+    if backend.dialect_of(cursorObject) == "sqlite":
+        use_infile, connect, fast = False, None, True
+    cursorObject = monitor.cursor(cursorObject)
+    hashes = file_fingerprints(folder_path)
+    stored = read_fingerprints(cursorObject, database)
+
+    if stored.get(SCHEMA_KEY) != SCHEMA_VERSION:
+        # unknown or outdated schema: rebuild everything from the CSVs
+        drop(cursorObject, database)
+        create(cursorObject, database)
+        record_fingerprint(cursorObject, SCHEMA_KEY, SCHEMA_VERSION)
+        cursorObject.execute("COMMIT")
+        stored = {}
+    else:
+        cursorObject.execute(f"USE {database};")
+    if fast is None:
+        fast = not stored
+
+    changed = [table for table in hashes if stored.get(table) != hashes[table]]
+    if not changed:
+        print(f"Database '{database}' is up to date, nothing to load.")
+        return []
+
+    levels = load_levels(changed)
+    # bulk loads would fire the triggers row by row; the summaries are
+    # rebuilt once at the end instead
+    drop_triggers(cursorObject)
+    try:
+        if connect is not None:
+            stats = load_parallel(connect, database, levels, folder_path, hashes, batch_size, use_infile,
+                                  workers, fast)
+        else:
+            stats = []
+            if fast:
+                cursorObject.execute("SET UNIQUE_CHECKS = 0")
+            try:
+                for table_name in (table for level in levels for table in level):
+                    result = load_table(cursorObject, table_name, os.path.join(folder_path, f"{table_name}.csv"),
+                                        hashes[table_name], batch_size, use_infile, fast)
+                    if result is None:
+                        continue
+                    # do not retry a refused LOAD DATA for every remaining table
+                    use_infile = use_infile and result["method"] == "infile"
+                    stats.append(result)
+            finally:
+                cursorObject.execute("SET FOREIGN_KEY_CHECKS = 1")
+                cursorObject.execute("SET UNIQUE_CHECKS = 1")
+
+        if fast:
+            rejected = verify_integrity(cursorObject)
+            for result in stats:
+                result["rejected"] = sum(r["rejected"] for r in rejected if r["table"] == result["table"])
+        create_indexes(cursorObject, database)
+    except BaseException:
+        # keep a half-loaded table out of the rebuild below
+        cursorObject.execute("ROLLBACK")
+        raise
+    finally:
+        # even after a failed load: summaries that match the tables, kept
+        # current by their triggers from now on
+        rebuild_summaries(cursorObject)
+        create_triggers(cursorObject)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance commands for a loaded database.")
+    parser.add_argument("command", choices=["check-summaries", "rebuild-summaries", "rebuild-leaderboards"])
+    parser.add_argument("--repair", action="store_true", help="rebuild the summaries if the check finds differences")
+    backend.add_arguments(parser)
+    parser.add_argument("--database", default="GameInfo")
+    args = parser.parse_args()
+
+    conn = backend.from_args(args).connect(args.database)
+    cursorObject = conn.cursor()
+    try:
+        if args.command == "check-summaries":
+            report = check_summaries(cursorObject, args.repair)
+            raise SystemExit(1 if report and not args.repair else 0)
+        rebuild_summaries(cursorObject, LEADERBOARDS if args.command == "rebuild-leaderboards" else None)
+        create_triggers(cursorObject)
+    finally:
+        cursorObject.close()
+        conn.close()
+
 
+if __name__ == "__main__":
+    main()
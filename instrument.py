@@ -0,0 +1,249 @@
+import json, re, statistics, threading, time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import mysql.connector
+import backend
+from cache import estimate_size
+
+# calls at least this slow get an EXPLAIN and a line in the slow query log
+SLOW_QUERY_MS = 200
+# next to the scripts, wherever the program is started from
+SLOW_LOG = Path(__file__).parent / "slow_queries.jsonl"
+
+# server time of the last n top-level statements of this connection, in ms
+SERVER_TIME_SQL = """
+    SELECT SUM(TIMER_WAIT) / 1000000000 FROM (
+        SELECT TIMER_WAIT FROM performance_schema.events_statements_history
+        WHERE THREAD_ID = (SELECT THREAD_ID FROM performance_schema.threads WHERE PROCESSLIST_ID = CONNECTION_ID())
+          AND NESTING_EVENT_ID IS NULL
+        ORDER BY EVENT_ID DESC LIMIT %s
+    ) AS recent
+"""
+
+
+def statement_name(sql):
+    """Short label of a loader statement, e.g. 'DELETE FROM Games'."""
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= 60 else sql[:57] + "..."
+
+
+class TimedCursor:
+    """
+    Cursor proxy that times every execute() and executemany().
+
+    Each statement is described as (sql, params, milliseconds, rowcount),
+    where params of an executemany() is its number of rows. With
+    on_statement, each one is reported as soon as it finishes and nothing
+    is kept; otherwise they are collected in `statements`. Everything else
+    is passed to the wrapped cursor.
+    """
+
+    def __init__(self, cursor, on_statement=None):
+        self._cursor = cursor
+        self._on_statement = on_statement
+        self.statements = []
+
+    def _timed(self, method, sql, params, kept, args, kwargs):
+        start = time.perf_counter()
+        try:
+            if params is None:
+                return method(sql, *args, **kwargs)
+            return method(sql, params, *args, **kwargs)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            statement = (sql, kept, ms, getattr(self._cursor, "rowcount", None))
+            if self._on_statement is not None:
+                # a long-lived loader cursor: report it and let it go
+                self._on_statement(self._cursor, statement)
+            else:
+                self.statements.append(statement)
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        return self._timed(self._cursor.execute, sql, params, params, args, kwargs)
+
+    def executemany(self, sql, params, *args, **kwargs):
+        # the batch is not kept, only its size
+        return self._timed(self._cursor.executemany, sql, params, len(params), args, kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class Monitor:
+    """
+    Timings of the q_* calls and loader statements.
+
+    Every call records wall time, rows returned and bytes fetched. Calls
+    slower than threshold_ms also get their server time (from
+    performance_schema, when the account may read it) and EXPLAIN
+    FORMAT=JSON of their statements, and are appended to the JSON-lines
+    file at log_path.
+    Safe to share between the UI thread and query workers.
+
+    Parameters:
+    threshold_ms: Wall time from which a call counts as slow.
+    log_path: Slow query log, one JSON object per line; None disables it.
+    history: Timings kept per query for the percentiles.
+    """
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, log_path=SLOW_LOG, history=200):
+        self.threshold_ms = threshold_ms
+        self.log_path = log_path
+        self.history = history
+        self.enabled = True
+        # set to False to skip the server time of slow calls
+        self.server_time = True
+        # backend dialect -> whether its performance_schema can be read;
+        # SQLite has none, a MySQL server is found out on the first slow call
+        self._server_time = {"sqlite": False}
+
+        self._stats = {}  # (source, name) -> running totals
+        self.slow_calls = deque(maxlen=100)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def call(self, name, cursorObject, args=()):
+        """
+        Time one q_* call. The body runs the query on `call.cursor` and
+        reports its result with `call.done(result, cached)`.
+        """
+        if not self.enabled:
+            yield _Call(cursorObject)
+            return
+        call = _Call(TimedCursor(cursorObject))
+        start = time.perf_counter()
+        try:
+            yield call
+        except Exception as e:
+            self.record({"source": "query", "name": name, "args": args, "error": str(e),
+                         "wall_ms": (time.perf_counter() - start) * 1000})
+            raise
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        result = call.result
+        entry = {
+            "source": "query",
+            "name": name,
+            "args": args,
+            "wall_ms": wall_ms,
+            "server_ms": None,
+            "rows": len(result) if isinstance(result, list) else int(result is not None),
+            "bytes": estimate_size(result),
+            "cached": call.cached,
+            "statements": [sql for sql, _, _, _ in call.cursor.statements],
+        }
+        # the extra round trips are only spent on slow calls
+        if call.cursor.statements and wall_ms >= self.threshold_ms:
+            entry["server_ms"] = self.fetch_server_time(cursorObject, len(call.cursor.statements))
+            entry["explain"] = [self.explain(cursorObject, sql, params)
+                                for sql, params, _, _ in call.cursor.statements]
+        self.record(entry)
+
+    def cursor(self, cursorObject, source="loader"):
+        """Wrap a cursor so that each of its statements is recorded on its own."""
+        if not self.enabled:
+            return cursorObject
+        return TimedCursor(cursorObject, lambda cur, statement: self._record_statement(source, cur, statement))
+
+    def _record_statement(self, source, cursorObject, statement):
+        sql, params, ms, rowcount = statement
+        entry = {"source": source, "name": statement_name(sql), "wall_ms": ms, "server_ms": None,
+                 "rows": rowcount, "bytes": None, "cached": False, "statements": [sql]}
+        # statements without a result set can be explained right away
+        if ms >= self.threshold_ms and re.match(r"\s*(DELETE|UPDATE|INSERT\b.*\bSELECT)\b", sql, re.I | re.S):
+            # an executemany() is explained without its rows, whose number is all that is kept
+            entry["explain"] = [self.explain(cursorObject, sql, None if isinstance(params, int) else params)]
+        self.record(entry)
+
+    def fetch_server_time(self, cursorObject, statements):
+        dialect = backend.dialect_of(cursorObject)
+        if not self.server_time or not self._server_time.get(dialect, True):
+            return None
+        try:
+            cursorObject.execute(SERVER_TIME_SQL, (statements,))
+            row = cursorObject.fetchone()
+        except mysql.connector.ProgrammingError:
+            # performance_schema disabled or not readable by this account
+            self._server_time[dialect] = False
+            return None
+        except mysql.connector.Error:
+            # e.g. a lost connection: says nothing about the next call
+            return None
+        return float(row[0]) if row and row[0] is not None else None
+
+    def explain(self, cursorObject, sql, params):
+        try:
+            cursorObject.execute(f"EXPLAIN FORMAT=JSON {sql}", params)
+            return json.loads(cursorObject.fetchone()[0])
+        except (mysql.connector.Error, TypeError, ValueError) as e:
+            return {"error": str(e)}
+
+    def record(self, entry):
+        entry["time"] = datetime.now().isoformat(timespec="milliseconds")
+        slow = entry["wall_ms"] >= self.threshold_ms and not entry.get("cached")
+        with self._lock:
+            stats = self._stats.setdefault((entry["source"], entry["name"]), {
+                "calls": 0, "cached": 0, "errors": 0, "slow": 0, "max_ms": 0.0,
+                "timings": deque(maxlen=self.history), "last": None, "server_ms": None,
+            })
+            stats["calls"] += 1
+            stats["cached"] += bool(entry.get("cached"))
+            stats["errors"] += "error" in entry
+            stats["slow"] += slow
+            stats["max_ms"] = max(stats["max_ms"], entry["wall_ms"])
+            stats["timings"].append(entry["wall_ms"])
+            stats["last"] = entry
+            if entry.get("server_ms") is not None:
+                # cache hits never reach the server; keep the last real measurement
+                stats["server_ms"] = entry["server_ms"]
+            if slow:
+                self.slow_calls.append(entry)
+                if self.log_path:
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry, default=str) + "\n")
+
+    def summary(self):
+        """One dict per query or statement, slowest p95 first."""
+        with self._lock:
+            rows = []
+            for (source, name), s in self._stats.items():
+                timings = sorted(s["timings"])
+                last = s["last"]
+                rows.append({
+                    "source": source,
+                    "name": name,
+                    "calls": s["calls"],
+                    "cached": s["cached"],
+                    "errors": s["errors"],
+                    "slow": s["slow"],
+                    "p50_ms": statistics.median(timings),
+                    "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+                    "max_ms": s["max_ms"],
+                    "server_ms": s["server_ms"],
+                    "rows": last.get("rows"),
+                    "bytes": last.get("bytes"),
+                })
+        return sorted(rows, key=lambda r: r["p95_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.slow_calls.clear()
+
+
+class _Call:
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.result = None
+        self.cached = False
+
+    def done(self, result, cached=False):
+        self.result = result
+        self.cached = cached
+
+
+# shared by queries.py, the loader and the Performance window
+monitor = Monitor()
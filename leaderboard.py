@@ -0,0 +1,139 @@
+"""
+Ranks of players in the per-game leaderboards.
+
+Game_Playtime_Board and Game_Achievement_Board keep every player's score
+per game under a (GameID, score) index, so the top N of a game is a short
+index read. The rank of one player is not: it counts everybody ahead of
+them. The first rank asked for in a game reads that game's scores once
+into a sorted list, after which any rank is a binary search. Rows inserted
+through the application (see cache.inserted()) move the affected scores
+in place; any other write to a board or its source table drops the lists.
+"""
+import bisect, threading, time
+from collections import OrderedDict
+
+import cache
+
+# leaderboard -> (table, score column, table the scores are counted from)
+BOARDS = {
+    "playtime": ("Game_Playtime_Board", "TotalTime", "Player_Platform_Games_Play"),
+    "achievements": ("Game_Achievement_Board", "Unlocked", "Player_Unlock_Achievement"),
+}
+
+
+class Standing:
+    """The scores of one leaderboard game: by player, and ascending without NULLs."""
+
+    def __init__(self, rows):
+        self.by_player = dict(rows)
+        self.ordered = sorted(score for score in self.by_player.values() if score is not None)
+        self.loaded_at = time.monotonic()
+
+    def add(self, player_id, points):
+        # SUM() semantics: NULL + NULL stays NULL, NULL + x is x
+        old = self.by_player.get(player_id)
+        new = points if old is None else old if points is None else old + points
+        if old is not None:
+            del self.ordered[bisect.bisect_left(self.ordered, old)]
+        if new is not None:
+            bisect.insort(self.ordered, new)
+        self.by_player[player_id] = new
+
+    def rank(self, player_id):
+        """(score, rank, players with a score); rank 1 is the highest score, ties share a rank."""
+        score = self.by_player.get(player_id)
+        if score is None:
+            return score, None, len(self.ordered)
+        return score, len(self.ordered) - bisect.bisect_right(self.ordered, score) + 1, len(self.ordered)
+
+
+class Leaderboards:
+    """
+    Sorted scores of the most recently ranked games, least recently used
+    dropped first. Safe to share between the UI thread and query workers.
+
+    Parameters:
+    max_games: Games kept per leaderboard.
+    max_age: Seconds after which a game's scores are read again.
+    """
+
+    def __init__(self, max_games=64, max_age=300):
+        self.max_games = max_games
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._games = {board: OrderedDict() for board in BOARDS}
+        self.loads = 0
+        self.updates = 0
+
+    def _standing(self, cursorObject, board, game_id):
+        # called with the lock held
+        games = self._games[board]
+        standing = games.get(game_id)
+        if standing is None or time.monotonic() - standing.loaded_at > self.max_age:
+            table, column, _ = BOARDS[board]
+            cursorObject.execute(f"SELECT PlayerID, {column} FROM {table} WHERE GameID = %s", (game_id,))
+            standing = games[game_id] = Standing(cursorObject.fetchall())
+            self.loads += 1
+            while len(games) > self.max_games:
+                games.popitem(last=False)
+        games.move_to_end(game_id)
+        return standing
+
+    def rank(self, cursorObject, board, game_id, player_id):
+        """
+        Where player_id stands in game_id on one of BOARDS. Returns
+        (score, rank, players ranked); score and rank are None for a player
+        without a score in the game.
+        """
+        with self._lock:
+            return self._standing(cursorObject, board, int(game_id)).rank(int(player_id))
+
+    def append(self, table, columns, rows, since):
+        with self._lock:
+            for board, (_, _, source) in BOARDS.items():
+                if source != table or not self._games[board]:
+                    continue
+                games = self._games[board]
+                try:
+                    at = [columns.index(c) for c in ("GameID", "PlayerID")]
+                    points_at = columns.index("TotalPlayingTime") if "TotalPlayingTime" in columns else None
+                    for row in rows:
+                        standing = games.get(int(row[at[0]]))
+                        if standing is None:
+                            continue
+                        if standing.loaded_at >= since:
+                            # read after the insert began, so it may already hold the row
+                            del games[int(row[at[0]])]
+                            continue
+                        if board == "achievements":
+                            points = 1
+                        else:
+                            points = None if points_at is None else row[points_at]
+                            points = None if points is None or points == "" else int(points)
+                        standing.add(int(row[at[1]]), points)
+                        self.updates += 1
+                except (ValueError, TypeError):
+                    # not what the database stored; read the scores again
+                    games.clear()
+
+    def invalidate(self, *tables):
+        with self._lock:
+            for board, (table, _, source) in BOARDS.items():
+                if {table, source} & set(tables):
+                    self._games[board].clear()
+
+    def clear(self):
+        with self._lock:
+            for games in self._games.values():
+                games.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"games": sum(len(games) for games in self._games.values()),
+                    "players": sum(len(s.by_player) for games in self._games.values() for s in games.values()),
+                    "loads": self.loads, "updates": self.updates}
+
+
+# shared by queries.py and the Performance window
+leaderboards = Leaderboards()
+cache.subscribers.append(leaderboards)
@@ -0,0 +1,142 @@
+import queue, threading, time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+
+
+class ConnectionPool:
+    """
+    A bounded pool of MySQL connections shared by all windows and workers.
+
+    Connections are opened lazily up to max_size. A borrower waits up to
+    `timeout` seconds for a free one, then gets a PoolError. Connections idle
+    for longer than health_check_interval seconds are pinged before being
+    handed out and reconnected if the server dropped them.
+
+    Parameters:
+    min_size: Connections opened up front.
+    max_size: Upper bound on open connections.
+    timeout: Seconds to wait for a free connection.
+    health_check_interval: Idle seconds after which a connection is pinged.
+    connect: Callable opening a new connection, e.g. a backend's connect;
+        defaults to mysql.connector.connect(**connect_args).
+    connect_args: Passed to mysql.connector.connect(); include `database`
+        so reconnected sessions land in the right schema.
+    """
+
+    def __init__(self, min_size=1, max_size=5, timeout=10, health_check_interval=30, connect=None, **connect_args):
+        if not 0 <= min_size <= max_size:
+            raise ValueError("Pool size limits must satisfy 0 <= min_size <= max_size")
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.connect_args = connect_args
+        self.connect = connect or (lambda: mysql.connector.connect(**self.connect_args))
+
+        self._idle = queue.LifoQueue()  # (connection, returned at)
+        self._lock = threading.Lock()
+        self._size = 0
+        self._closed = False
+
+        for _ in range(min_size):
+            self._idle.put((self._open(), time.monotonic()))
+
+    def _open(self):
+        with self._lock:
+            if self._size >= self.max_size:
+                return None
+            self._size += 1
+        try:
+            return self.connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+            raise
+
+    def _discard(self, conn):
+        with self._lock:
+            self._size -= 1
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def _healthy(self, conn, idle_since):
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return conn.is_connected()
+        try:
+            conn.ping(reconnect=True, attempts=2, delay=0)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def get_connection(self, timeout=None):
+        """Borrow a connection; give it back with release()."""
+        if self._closed:
+            raise PoolError("Connection pool is closed")
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+
+        while True:
+            try:
+                conn, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+                if conn is not None:
+                    return conn
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"No connection available within the pool limit of {self.max_size}")
+                try:
+                    conn, idle_since = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+
+            if self._healthy(conn, idle_since):
+                return conn
+            # dropped and could not reconnect: replace it on the next round
+            self._discard(conn)
+
+    def release(self, conn):
+        """Return a borrowed connection, rolling back anything left uncommitted."""
+        if self._closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except mysql.connector.Error:
+            self._discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @contextmanager
+    def cursor(self, **kwargs):
+        """Borrow a connection for the duration of one cursor."""
+        with self.connection() as conn:
+            cursor = conn.cursor(**kwargs)
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def stats(self):
+        idle = self._idle.qsize()
+        return {"size": self._size, "idle": idle, "in_use": self._size - idle, "max_size": self.max_size}
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
@@ -1,6 +1,252 @@
+import base64, functools, json, re, threading, weakref
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
 import mysql.connector
+import backend
+from cache import query_cache
+from columnar import column_store
+from graph import friend_graph
+from leaderboard import BOARDS, leaderboards
+from instrument import monitor
+
+
+def cached(*tables):
+    """
+    Memoize a q_* function in query_cache, keyed on its name and arguments.
+
+    `tables` are the tables the query reads; a write to any of them drops
+    the cached result, or keeps it from being stored if the write happens
+    while the query runs. Cached rows are shared between callers and must not
+    be modified. Every call, cached or not, is timed by the monitor.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(cursorObject, *args, **kwargs):
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            with monitor.call(fn.__name__, cursorObject, args) as call:
+                found, result = query_cache.get(key)
+                if not found:
+                    # a write to the tables while the query runs makes its result stale
+                    epoch = query_cache.epoch(tables)
+                    result = fn(call.cursor, *args, **kwargs)
+                    query_cache.put(key, result, tables, epoch)
+                call.done(result, found)
+            return result
+        wrapper.tables = tables
+        return wrapper
+    return decorate
+
+
+########################## Pagination ###########################
+# The *_page variants return (rows, next_token). next_token is None on the
+# last page; otherwise pass it back to get the rows after the current page.
+# It carries the ORDER BY key of the last row, so a page is found with an
+# index range instead of skipping OFFSET rows and deep pages cost the same
+# as the first one.
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"date": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"decimal": str(value)}
+    return value
+
+
+def _load(value):
+    if isinstance(value, dict):
+        (kind, text), = value.items()
+        if kind == "datetime":
+            return datetime.fromisoformat(text)
+        if kind == "date":
+            return date.fromisoformat(text)
+        return Decimal(text)
+    return value
+
+
+def encode_token(scope, key):
+    """Pack the key of the last row into an opaque token bound to `scope`."""
+    data = json.dumps([list(scope), [_dump(v) for v in key]])
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_token(scope, token):
+    """Return the key stored in `token`; raise ValueError if it belongs to another query."""
+    try:
+        stored, key = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Malformed page token")
+    if stored != json.loads(json.dumps(list(scope))):
+        raise ValueError("Page token belongs to a different query")
+    return [_load(v) for v in key]
+
+
+def keyset_after(order, last, nullable=()):
+    """
+    Build the condition selecting the rows that sort after `last`.
+
+    Parameters:
+    order: (column, "ASC" | "DESC") pairs of the ORDER BY clause; the
+        columns together must identify a row.
+    last: Values of those columns in the last row already returned.
+    nullable: Columns that may hold NULL. MySQL sorts NULL first in
+        ascending and last in descending order.
+
+    Returns (sql, params) for use in a WHERE or HAVING clause.
+    """
+    clauses, params = [], []
+    equal, equal_params = [], []
+    for (column, direction), value in zip(order, last):
+        if value is None:
+            after = f"{column} IS NOT NULL" if direction == "ASC" else None
+            after_params = []
+            same = f"{column} IS NULL"
+        else:
+            op = ">" if direction == "ASC" else "<"
+            after = f"{column} {op} %s"
+            if direction == "DESC" and column in nullable:
+                after = f"({after} OR {column} IS NULL)"
+            after_params = [value]
+            same = f"{column} = %s"
+        if after is not None:
+            clauses.append("(" + " AND ".join(equal + [after]) + ")")
+            params += equal_params + after_params
+        equal.append(same)
+        equal_params += after_params
+    return "(" + (" OR ".join(clauses) or "FALSE") + ")", params
+
+
+def after_token(scope, token, order, nullable=()):
+    """keyset_after() for the key in `token`, or an always-true condition for the first page."""
+    if token is None:
+        return "TRUE", []
+    return keyset_after(order, decode_token(scope, token), nullable)
+
+
+def fetch_page(cursorObject, sql, params, page_size, scope, key_of):
+    """
+    Run `sql` (ending in LIMIT %s) for one page and build the next token.
+
+    `key_of` maps a row to its ORDER BY key.
+    """
+    if page_size < 1:
+        raise ValueError("Page size must be positive")
+    cursorObject.execute(sql, (*params, page_size + 1))
+    rows = cursorObject.fetchall()
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_token(scope, key_of(rows[-1]))
+
+
+###################### Prepared statements ######################
+# prepared statements kept per connection; the least recently used beyond
+# this are deallocated
+MAX_PREPARED = 64
+
+# server lost the statement, e.g. after a reconnect
+UNKNOWN_STATEMENT = 1243
+
+# connection -> (connection id, OrderedDict of sql -> (prepared cursor, sql))
+_registries = weakref.WeakKeyDictionary()
+_registries_lock = threading.Lock()
+
+
+class PreparedCursor:
+    """
+    Cursor for the q_* functions that prepares each SELECT once per connection.
+
+    The first execute() of a statement text on a connection prepares it on
+    the server; later ones only send the parameters and get the rows back
+    over the binary protocol. The statements live in a per-connection
+    registry, so they outlive this cursor and are reused by every worker
+    that borrows the same pooled connection. Other statements run on a
+    plain cursor.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        with _registries_lock:
+            entry = _registries.get(connection)
+            if entry is None or entry[0] != connection.connection_id:
+                # new connection, or reconnected: its old statements are gone
+                entry = (connection.connection_id, OrderedDict())
+                _registries[connection] = entry
+        self.statements = entry[1]
+        self._plain = None
+        self._current = None
+
+    def _prepared(self, sql):
+        found = self.statements.pop(sql, None)
+        if found is None:
+            while len(self.statements) >= MAX_PREPARED:
+                cursor, _ = self.statements.popitem(last=False)[1]
+                cursor.close()
+            # the connector re-prepares unless it gets the very same string again
+            found = (self.connection.cursor(prepared=True), sql)
+        self.statements[sql] = found
+        return found
+
+    def _finish(self):
+        # a result read with fetchone() must be drained before the next statement
+        if self._current is not None:
+            try:
+                self._current.fetchall()
+            except mysql.connector.Error:
+                pass
+            self._current = None
+
+    def execute(self, sql, params=()):
+        self._finish()
+        if not re.match(r"\s*SELECT\b", sql, re.I):
+            if self._plain is None:
+                self._plain = self.connection.cursor()
+            self._current = self._plain
+            return self._plain.execute(sql, params)
+
+        cursor, sql = self._prepared(sql)
+        try:
+            cursor.execute(sql, tuple(params))
+        except mysql.connector.Error as err:
+            if err.errno != UNKNOWN_STATEMENT:
+                raise
+            # close them all before forgetting them: those the server still
+            # holds would otherwise stay there until the connection closes
+            while self.statements:
+                stale, _ = self.statements.popitem()[1]
+                try:
+                    stale.close()
+                except mysql.connector.Error:
+                    pass
+            cursor, sql = self._prepared(sql)
+            cursor.execute(sql, tuple(params))
+        self._current = cursor
+
+    def fetchall(self):
+        return self._current.fetchall()
+
+    def fetchone(self):
+        return self._current.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._current.fetchmany(size)
+
+    def __getattr__(self, name):
+        return getattr(self._current, name)
+
+    def close(self):
+        """Close the plain cursor; the prepared statements stay with the connection."""
+        self._finish()
+        if self._plain is not None:
+            self._plain.close()
+            self._plain = None
+
 
 ############################ Games ##############################
+@cached("Games", "Player_Platform_Games_Play", "Platform")
 def q_game_rating(cursorObject, platform, top_n):
     query = """
         SELECT G.Name, AVG(PPGP.Rating) as Rating
@@ -16,6 +262,7 @@ def q_game_rating(cursorObject, platform, top_n):
     return cursorObject.fetchall()
 
 
+@cached("Games")
 def q_game_genre(cursorObject, genre, order_attri, order="DESC"):
     if order.upper() not in ["ASC", "DESC"]:
         raise ValueError("Invalid sort order")
@@ -29,6 +276,32 @@ def q_game_genre(cursorObject, genre, order_attri, order="DESC"):
     return cursorObject.fetchall()
 
 
+GENRE_ORDER_COLUMNS = ("ReleaseDate", "UnitsSold")
+
+
+@cached("Games")
+def q_game_genre_page(cursorObject, genre, order_attri, order="DESC", page_size=100, token=None):
+    """q_game_genre one page at a time; ties on order_attri are broken by GameID."""
+    order = order.upper()
+    if order not in ["ASC", "DESC"]:
+        raise ValueError("Invalid sort order")
+    if order_attri not in GENRE_ORDER_COLUMNS:
+        raise ValueError("Invalid sort attribute")
+    scope = ("q_game_genre", genre, order_attri, order)
+    # (Genre, ReleaseDate) and (Genre, UnitsSold) end in the primary key, so
+    # this order is read straight from the index
+    cond, params = after_token(scope, token, [(order_attri, order), ("GameID", order)], nullable=("UnitsSold",))
+    query = f"""
+        SELECT GameID, Name, {order_attri}
+        FROM Games
+        WHERE Genre = %s AND {cond}
+        ORDER BY {order_attri} {order}, GameID {order}
+        LIMIT %s
+    """
+    return fetch_page(cursorObject, query, [genre, *params], page_size, scope, lambda row: (row[2], row[0]))
+
+
+@cached("Games", "Publisher_Games", "Publisher", "Developer_Games", "Developer")
 def q_game_pub_dev(cursorObject, publisher=None, developer=None):
     if publisher:
         query = """
@@ -55,39 +328,124 @@ def q_game_pub_dev(cursorObject, publisher=None, developer=None):
     return cursorObject.fetchall()
 
 
+@cached("Games", "Publisher_Games", "Publisher", "Developer_Games", "Developer")
+def q_game_pub_dev_page(cursorObject, publisher=None, developer=None, page_size=100, token=None):
+    """q_game_pub_dev one page at a time, ordered by ReleaseDate then GameID."""
+    scope = ("q_game_pub_dev", publisher, developer)
+    cond, params = after_token(scope, token, [("G.ReleaseDate", "ASC"), ("G.GameID", "ASC")])
+    if publisher:
+        query = f"""
+            SELECT G.GameID, G.ReleaseDate
+            FROM Games as G
+            INNER JOIN Publisher_Games as PG on G.GameID = PG.GameID
+            INNER JOIN Publisher as P on PG.PublisherID = P.PublisherID
+            WHERE P.PublisherName = %s AND {cond}
+            ORDER BY G.ReleaseDate ASC, G.GameID ASC
+            LIMIT %s
+        """
+        params = [publisher, *params]
+    elif developer:
+        query = f"""
+            SELECT G.GameID, G.ReleaseDate
+            FROM Games as G
+            INNER JOIN Developer_Games as DG on G.GameID = DG.GameID
+            INNER JOIN Developer as D on DG.DeveloperID = D.DeveloperID
+            WHERE D.DeveloperName = %s AND {cond}
+            ORDER BY G.ReleaseDate ASC, G.GameID ASC
+            LIMIT %s
+        """
+        params = [developer, *params]
+    else:
+        return [], None
+    return fetch_page(cursorObject, query, params, page_size, scope, lambda row: (row[1], row[0]))
+
+
+# One row per game released in or after a year, walked in idx_games_release
+# order. Platforms, developers and publishers are each folded into one list
+# by a subquery on the primary key of their link table, so a game with
+# several of each yields one row instead of their cross product, and rows
+# leave in index order without a sort.
+GAME_YEAR_QUERY = """
+    SELECT G.GameID, G.Name, G.ReleaseDate,
+        (SELECT GROUP_CONCAT(PF.PlatformName ORDER BY PF.PlatformName SEPARATOR ', ')
+         FROM Platform_Support_Games PSG JOIN Platform PF ON PF.PlatformID = PSG.PlatformID
+         WHERE PSG.GameID = G.GameID) AS Platforms,
+        (SELECT GROUP_CONCAT(D.DeveloperName ORDER BY D.DeveloperName SEPARATOR ', ')
+         FROM Developer_Games DG JOIN Developer D ON D.DeveloperID = DG.DeveloperID
+         WHERE DG.GameID = G.GameID) AS Developers,
+        (SELECT GROUP_CONCAT(P.PublisherName ORDER BY P.PublisherName SEPARATOR ', ')
+         FROM Publisher_Games PG JOIN Publisher P ON P.PublisherID = PG.PublisherID
+         WHERE PG.GameID = G.GameID) AS Publishers
+    FROM Games G
+    WHERE G.ReleaseDate >= %s AND {cond}
+    ORDER BY G.ReleaseDate ASC, G.GameID ASC
+"""
+# rows q_game_year_stream() reads from the server at a time
+STREAM_BATCH = 1000
+# bytes a GROUP_CONCAT list may take on MySQL before it is cut off
+# (the server's default is 1024); SQLite has no such limit
+GROUP_CONCAT_MAX_LEN = 1024 * 1024
+
+
+def long_lists(cursorObject):
+    """Let GAME_YEAR_QUERY's lists grow to GROUP_CONCAT_MAX_LEN on this connection."""
+    if backend.dialect_of(cursorObject) == "mysql":
+        cursorObject.execute("SET SESSION group_concat_max_len = %s", (GROUP_CONCAT_MAX_LEN,))
+
+
+@cached("Games", "Platform_Support_Games", "Platform", "Developer_Games", "Developer", "Publisher_Games", "Publisher")
 def q_game_year(cursorObject, year):
-    query = """
-        SELECT G.Name, G.ReleaseDate, PF.PlatformName, D.DeveloperName, P.PublisherName
-        FROM Games as G
-        INNER JOIN Platform_Support_Games as PSG on G.GameID = PSG.GameID
-        INNER JOIN Platform as PF on PSG.PlatformID = PF.PlatformID
-        INNER JOIN Developer_Games as DG on G.GameID = DG.GameID
-        INNER JOIN Developer as D on DG.DeveloperID = D.DeveloperID
-        INNER JOIN Publisher_Games as PG on G.GameID = PG.GameID
-        INNER JOIN Publisher as P on PG.PublisherID = P.PublisherID
-        WHERE G.ReleaseDate >= %s
-        ORDER BY G.ReleaseDate ASC
-    """
-    cursorObject.execute(query, (f"{year}-01-01",))
-    return cursorObject.fetchall()
+    """
+    Games released in or after `year`, oldest first. Returns [(Name,
+    ReleaseDate, Platforms, Developers, Publishers)], the last three as
+    comma-separated names (None where a game has none).
+    """
+    return list(q_game_year_stream(cursorObject, year))
 
 
+def q_game_year_stream(cursorObject, year, batch_size=STREAM_BATCH):
+    """
+    q_game_year as a generator, uncached: rows are read batch_size at a
+    time while the caller consumes them, so the first arrive before the
+    last are computed. The cursor is busy until the generator is exhausted.
+    """
+    long_lists(cursorObject)
+    cursorObject.execute(GAME_YEAR_QUERY.format(cond="TRUE"), (f"{year}-01-01",))
+    while True:
+        rows = cursorObject.fetchmany(batch_size)
+        if not rows:
+            return
+        for row in rows:
+            yield row[1:]
+
+
+@cached("Games", "Platform_Support_Games", "Platform", "Developer_Games", "Developer", "Publisher_Games", "Publisher")
+def q_game_year_page(cursorObject, year, page_size=100, token=None):
+    """q_game_year one page of games at a time."""
+    scope = ("q_game_year", year)
+    cond, params = after_token(scope, token, [("G.ReleaseDate", "ASC"), ("G.GameID", "ASC")])
+    long_lists(cursorObject)
+    rows, next_token = fetch_page(cursorObject, GAME_YEAR_QUERY.format(cond=cond) + " LIMIT %s",
+                                  [f"{year}-01-01", *params], page_size, scope, lambda row: (row[2], row[0]))
+    return [row[1:] for row in rows], next_token
+
+
+@cached("Genre_Stats", "Games", "Player_Platform_Games_Play")
 def q_genre_avg_rating(cursorObject, type=None):
+    if column_store.enabled:
+        return column_store.genre_avg_rating(cursorObject, type)
     if type == "Rating":
         query = """
-            SELECT G.Genre, AVG(PPGP.Rating) AS AverageRating
-            FROM Games AS G
-            INNER JOIN Player_Platform_Games_Play AS PPGP ON G.GameID = PPGP.GameID
-            WHERE G.Genre IS NOT NULL
-            GROUP BY G.Genre
+            SELECT Genre, RatingSum / NULLIF(RatingCount, 0) AS AverageRating
+            FROM Genre_Stats
+            WHERE PlayCount > 0
             ORDER BY AverageRating DESC
         """
     elif type == "UnitsSold":
         query = """
-            SELECT Genre, SUM(UnitsSold) AS TotalUnitsSold
-            FROM Games
-            WHERE Genre IS NOT NULL
-            GROUP BY Genre
+            SELECT Genre, UnitsSold AS TotalUnitsSold
+            FROM Genre_Stats
+            WHERE GameCount > 0
             ORDER BY TotalUnitsSold DESC
         """
     else:
@@ -98,43 +456,76 @@ def q_genre_avg_rating(cursorObject, type=None):
 
 
 ############################ Users ##############################
+@cached("Game_Achievement_Board", "Player_Unlock_Achievement")
 def q_user_achievements_by_game(cursorObject, game_id, top_n):
+    # the first top_n entries of the game in idx_achievement_board_rank
     query = '''
-        SELECT PlayerID, COUNT(*) AS AchievementsUnlocked
-        FROM Player_Unlock_Achievement
+        SELECT PlayerID, Unlocked AS AchievementsUnlocked
+        FROM Game_Achievement_Board
         WHERE GameID = %s
-        GROUP BY PlayerID
-        ORDER BY AchievementsUnlocked DESC
+        ORDER BY Unlocked DESC
         LIMIT %s;
     '''
     cursorObject.execute(query, (game_id, top_n))
     return cursorObject.fetchall()
 
 
+@cached("Game_Playtime_Board", "Player_Platform_Games_Play", "Player")
 def q_user_top_playtime_by_game(cursorObject, game_id, top_n):
+    # the first top_n entries of the game in idx_playtime_board_rank
     query = '''
-        SELECT P.UserName, SUM(PPGP.TotalPlayingTime) AS TotalTime
-        FROM Player_Platform_Games_Play PPGP
-        JOIN Player P ON PPGP.PlayerID = P.UserID
-        WHERE PPGP.GameID = %s
-        GROUP BY P.UserID, P.UserName
-        ORDER BY TotalTime DESC
+        SELECT P.UserName, B.TotalTime
+        FROM Game_Playtime_Board B
+        JOIN Player P ON B.PlayerID = P.UserID
+        WHERE B.GameID = %s
+        ORDER BY B.TotalTime DESC
         LIMIT %s;
     '''
     cursorObject.execute(query, (game_id, top_n))
     return cursorObject.fetchall()
 
 
+@cached("Game_Playtime_Board", "Game_Achievement_Board", "Player_Platform_Games_Play", "Player_Unlock_Achievement")
+def q_user_game_rank(cursorObject, game_id, user_id):
+    """
+    Where one player stands in a game, on every leaderboard. Returns
+    [(Leaderboard, Score, Rank, Players)]; Rank 1 is the highest score,
+    and Score and Rank are None where the player has none.
+    """
+    return [(board.capitalize(), *leaderboards.rank(cursorObject, board, game_id, user_id)) for board in BOARDS]
+
+
+@cached("Player_Profile", "Player_Platform_Games_Play")
 def q_user_total_spent(cursorObject, user_id):
     query = '''
-        SELECT SUM(PurchasePrice) AS TotalSpent
-        FROM Player_Platform_Games_Play
+        SELECT TotalSpent
+        FROM Player_Profile
         WHERE PlayerID = %s;
     '''
     cursorObject.execute(query, (user_id,))
+    # SUM() over no rows still returned one row
+    return cursorObject.fetchall() or [(None,)]
+
+
+@cached("Player_Profile", "Player", "Player_Platform_Games_Play", "Player_Unlock_Achievement")
+def q_user_profile(cursorObject, user_id):
+    """
+    One player's rollup, read by primary key from Player_Profile.
+    Returns [(UserID, UserName, TotalSpent, TotalPlayTime, GamesOwned,
+    AchievementsUnlocked, LastActivity)], empty for an unknown player.
+    """
+    query = '''
+        SELECT P.UserID, P.UserName, PP.TotalSpent, PP.TotalPlayTime, PP.GamesOwned,
+               PP.AchievementsUnlocked, PP.LastActivity
+        FROM Player P
+        JOIN Player_Profile PP ON PP.PlayerID = P.UserID
+        WHERE P.UserID = %s;
+    '''
+    cursorObject.execute(query, (user_id,))
     return cursorObject.fetchall()
 
 
+@cached("Player_Platform_Games_Play", "Games", "Platform")
 def q_user_purchases(cursorObject, user_id):
     query = '''
         SELECT G.Name AS GameName, PF.PlatformName, PPGP.PurchasePrice, PPGP.PurchaseTime
@@ -148,39 +539,155 @@ def q_user_purchases(cursorObject, user_id):
     return cursorObject.fetchall()
 
 
+@cached("Player_Platform_Games_Play", "Games", "Platform")
+def q_user_purchases_page(cursorObject, user_id, page_size=100, token=None):
+    """q_user_purchases one page at a time; ties on PurchaseTime are broken by game and platform."""
+    scope = ("q_user_purchases", user_id)
+    order = [("PPGP.PurchaseTime", "DESC"), ("PPGP.GameID", "DESC"), ("PPGP.PlatformID", "DESC")]
+    cond, params = after_token(scope, token, order, nullable=("PPGP.PurchaseTime",))
+    query = f'''
+        SELECT G.Name AS GameName, PF.PlatformName, PPGP.PurchasePrice, PPGP.PurchaseTime,
+               PPGP.GameID, PPGP.PlatformID
+        FROM Player_Platform_Games_Play AS PPGP
+        JOIN Games G ON G.GameID = PPGP.GameID
+        JOIN Platform PF ON PF.PlatformID = PPGP.PlatformID
+        WHERE PPGP.PlayerID = %s AND {cond}
+        ORDER BY PPGP.PurchaseTime DESC, PPGP.GameID DESC, PPGP.PlatformID DESC
+        LIMIT %s
+    '''
+    rows, next_token = fetch_page(cursorObject, query, [user_id, *params], page_size, scope, lambda row: row[3:])
+    # the key columns are not part of q_user_purchases' rows
+    return [row[:4] for row in rows], next_token
+
+
+@cached("Player_Friends", "Player")
 def q_user_friends_by_mutualtime(cursorObject, user_id, min_time):
+    # a friendship is stored once, with the user on either side
     query = '''
-        SELECT p2.UserID, p2.UserName, p2.Email, p2.Region, pf.MutualTime
-        FROM Player_Friends pf
-        JOIN Player p2 ON pf.Player2ID = p2.UserID
-        WHERE pf.Player1ID = %s AND pf.MutualTime >= %s;
+        SELECT p2.UserID, p2.UserName, p2.Email, p2.Region, MAX(pf.MutualTime) AS MutualTime
+        FROM (
+            SELECT Player2ID AS FriendID, MutualTime FROM Player_Friends
+            WHERE Player1ID = %s AND MutualTime >= %s
+            UNION ALL
+            SELECT Player1ID, MutualTime FROM Player_Friends
+            WHERE Player2ID = %s AND MutualTime >= %s
+        ) pf
+        JOIN Player p2 ON pf.FriendID = p2.UserID
+        GROUP BY p2.UserID, p2.UserName, p2.Email, p2.Region;
     '''
-    cursorObject.execute(query, (user_id, min_time))
+    cursorObject.execute(query, (user_id, min_time, user_id, min_time))
+    return cursorObject.fetchall()
+
+
+# players reachable from a user in at most n hops over friendships of at
+# least a minimum MutualTime, with the length of their shortest path
+# (parameters: min_time, min_time, user_id, hops)
+REACHABLE_CTE = """
+    WITH RECURSIVE Edges AS (
+        SELECT Player1ID AS Src, Player2ID AS Dst FROM Player_Friends WHERE MutualTime >= %s
+        UNION ALL
+        SELECT Player2ID, Player1ID FROM Player_Friends WHERE MutualTime >= %s
+    ), Reach (UserID, Hops) AS (
+        SELECT CAST(%s AS SIGNED), 0
+        UNION
+        SELECT E.Dst, R.Hops + 1 FROM Reach R JOIN Edges E ON E.Src = R.UserID WHERE R.Hops < %s
+    )
+"""
+
+
+@cached("Player_Friends", "Player")
+def q_user_friends_within(cursorObject, user_id, hops, min_time=0):
+    """
+    Players at most `hops` friendships away from user_id, following
+    friendships of at least min_time in either direction; nearest first.
+    Returns [(UserID, UserName, Region, Hops)].
+    """
+    if friend_graph.enabled:
+        return friend_graph.within(cursorObject, user_id, hops, min_time)
+    query = REACHABLE_CTE + """
+        SELECT P.UserID, P.UserName, P.Region, MIN(R.Hops) AS Hops
+        FROM Reach R
+        JOIN Player P ON P.UserID = R.UserID
+        WHERE R.UserID <> %s
+        GROUP BY P.UserID, P.UserName, P.Region
+        ORDER BY Hops, P.UserID
+    """
+    cursorObject.execute(query, (min_time, min_time, user_id, hops, user_id))
+    return cursorObject.fetchall()
+
+
+@cached("Player_Friends", "Player", "Player_Platform_Games_Play")
+def q_user_friends_playing(cursorObject, user_id, game_id, hops=1):
+    """
+    Players at most `hops` friendships away from user_id who play game_id,
+    nearest first, then by play time. Returns [(UserID, UserName, Hops,
+    TotalPlayingTime)].
+    """
+    if friend_graph.enabled:
+        reachable = friend_graph.within(cursorObject, user_id, hops)
+        cursorObject.execute("""
+            SELECT PlayerID, SUM(TotalPlayingTime) FROM Player_Platform_Games_Play
+            WHERE GameID = %s GROUP BY PlayerID
+        """, (game_id,))
+        playing = dict(cursorObject.fetchall())
+        rows = [(friend, name, hop, playing[friend]) for friend, name, _, hop in reachable if friend in playing]
+        return sorted(rows, key=lambda row: (row[2], -(row[3] or 0), row[0]))
+    query = REACHABLE_CTE + """
+        SELECT P.UserID, P.UserName, F.Hops, SUM(PPGP.TotalPlayingTime) AS TotalPlayingTime
+        FROM (SELECT UserID, MIN(Hops) AS Hops FROM Reach WHERE UserID <> %s GROUP BY UserID) F
+        JOIN Player P ON P.UserID = F.UserID
+        JOIN Player_Platform_Games_Play PPGP ON PPGP.PlayerID = F.UserID AND PPGP.GameID = %s
+        GROUP BY P.UserID, P.UserName, F.Hops
+        ORDER BY F.Hops, TotalPlayingTime DESC, P.UserID
+    """
+    cursorObject.execute(query, (0, 0, user_id, hops, user_id, game_id))
+    return cursorObject.fetchall()
+
+
+@cached("Player_Friends", "Player")
+def q_user_mutual_friends(cursorObject, user_id, other_id):
+    """Friends that two players have in common. Returns [(UserID, UserName, Region)]."""
+    if friend_graph.enabled:
+        return friend_graph.mutual(cursorObject, user_id, other_id)
+    query = """
+        WITH Edges AS (
+            SELECT Player1ID AS Src, Player2ID AS Dst FROM Player_Friends
+            UNION
+            SELECT Player2ID, Player1ID FROM Player_Friends
+        )
+        SELECT P.UserID, P.UserName, P.Region
+        FROM Edges A
+        JOIN Edges B ON B.Dst = A.Dst AND B.Src = %s
+        JOIN Player P ON P.UserID = A.Dst
+        WHERE A.Src = %s
+        ORDER BY P.UserID
+    """
+    cursorObject.execute(query, (other_id, user_id))
     return cursorObject.fetchall()
 
 
 ###################### Developer/ Publisher #####################
+@cached("Developer_Revenue", "Publisher_Revenue", "Games", "Developer_Games", "Developer",
+        "Publisher_Games", "Publisher", "Platform_Support_Games")
 def q_dev_pub_revenues(cursorObject, role, start_year, end_year, top_n):
+    if column_store.enabled:
+        return column_store.dev_pub_revenues(cursorObject, role, start_year, end_year, top_n)
     if role == "Developer":
         query = """
-            SELECT D.DeveloperName, SUM(G.UnitsSold * PSG.Price) AS TotalRevenue
-            FROM Games G
-            INNER JOIN Developer_Games DG ON G.GameID = DG.GameID
-            INNER JOIN Developer D ON DG.DeveloperID = D.DeveloperID
-            INNER JOIN Platform_Support_Games PSG ON G.GameID = PSG.GameID
-            WHERE DG.DevelopeFinishYear BETWEEN %s AND %s
+            SELECT D.DeveloperName, SUM(DR.Revenue) AS TotalRevenue
+            FROM Developer_Revenue DR
+            INNER JOIN Developer D ON DR.DeveloperID = D.DeveloperID
+            WHERE DR.FinishYear BETWEEN %s AND %s
             GROUP BY D.DeveloperID
             ORDER BY TotalRevenue DESC
             LIMIT %s
         """
     elif role == "Publisher":
         query = """
-            SELECT P.PublisherName, SUM(G.UnitsSold * PSG.Price) AS TotalRevenue
-            FROM Games G
-            INNER JOIN Publisher_Games PG ON G.GameID = PG.GameID
-            INNER JOIN Publisher P ON PG.PublisherID = P.PublisherID
-            INNER JOIN Platform_Support_Games PSG ON G.GameID = PSG.GameID
-            WHERE PG.PublishYear BETWEEN %s AND %s
+            SELECT P.PublisherName, SUM(PR.Revenue) AS TotalRevenue
+            FROM Publisher_Revenue PR
+            INNER JOIN Publisher P ON PR.PublisherID = P.PublisherID
+            WHERE PR.PublishYear BETWEEN %s AND %s
             GROUP BY P.PublisherID
             ORDER BY TotalRevenue DESC
             LIMIT %s
@@ -192,7 +699,10 @@ def q_dev_pub_revenues(cursorObject, role, start_year, end_year, top_n):
     return cursorObject.fetchall()
 
 
+@cached("Games", "Developer_Games", "Developer", "Publisher_Games", "Publisher", "Player_Platform_Games_Play")
 def q_dev_pub_rating(cursorObject, role, rating_threshold):
+    if column_store.enabled:
+        return column_store.dev_pub_rating(cursorObject, role, rating_threshold)
     if role == "Developer":
         query = """
             SELECT D.DeveloperName, COUNT(DISTINCT G.GameID) AS HighRatedGames
@@ -222,34 +732,73 @@ def q_dev_pub_rating(cursorObject, role, rating_threshold):
     return cursorObject.fetchall()
 
 
+@cached("Games", "Developer_Games", "Developer", "Publisher_Games", "Publisher", "Player_Platform_Games_Play")
+def q_dev_pub_rating_page(cursorObject, role, rating_threshold, page_size=50, token=None):
+    """
+    q_dev_pub_rating one page at a time; ties on HighRatedGames are broken by ID.
+
+    The key is an aggregate, so it is applied in HAVING: every page still
+    groups the matching play records, but no page materializes the rows
+    before it.
+    """
+    scope = ("q_dev_pub_rating", role, rating_threshold)
+    if role == "Developer":
+        cond, params = after_token(scope, token, [("HighRatedGames", "DESC"), ("D.DeveloperID", "ASC")])
+        query = f"""
+            SELECT D.DeveloperID, D.DeveloperName, COUNT(DISTINCT G.GameID) AS HighRatedGames
+            FROM Games G
+            INNER JOIN Developer_Games DG ON G.GameID = DG.GameID
+            INNER JOIN Developer D ON DG.DeveloperID = D.DeveloperID
+            INNER JOIN Player_Platform_Games_Play PPGP ON G.GameID = PPGP.GameID
+            WHERE PPGP.Rating > %s
+            GROUP BY D.DeveloperID
+            HAVING {cond}
+            ORDER BY HighRatedGames DESC, D.DeveloperID ASC
+            LIMIT %s
+        """
+    elif role == "Publisher":
+        cond, params = after_token(scope, token, [("HighRatedGames", "DESC"), ("P.PublisherID", "ASC")])
+        query = f"""
+            SELECT P.PublisherID, P.PublisherName, COUNT(DISTINCT G.GameID) AS HighRatedGames
+            FROM Games G
+            INNER JOIN Publisher_Games PG ON G.GameID = PG.GameID
+            INNER JOIN Publisher P ON PG.PublisherID = P.PublisherID
+            INNER JOIN Player_Platform_Games_Play PPGP ON G.GameID = PPGP.GameID
+            WHERE PPGP.Rating > %s
+            GROUP BY P.PublisherID
+            HAVING {cond}
+            ORDER BY HighRatedGames DESC, P.PublisherID ASC
+            LIMIT %s
+        """
+    else:
+        return [], None
+
+    rows, next_token = fetch_page(cursorObject, query, [rating_threshold, *params], page_size, scope,
+                                  lambda row: (row[2], row[0]))
+    return [row[1:] for row in rows], next_token
+
+
+@cached("Game_Platform_Count", "Platform_Support_Games", "Developer_Games", "Developer", "Publisher_Games", "Publisher")
 def q_dev_pub_compatibility(cursorObject, role, platform_threshold):
+    if column_store.enabled:
+        return column_store.dev_pub_compatibility(cursorObject, role, platform_threshold)
     if role == "Developer":
         query = """
             SELECT D.DeveloperName, COUNT(*) AS GameCount
-            FROM (
-                SELECT G.GameID, COUNT(DISTINCT PSG.PlatformID) AS PlatformCount
-                FROM Games G
-                INNER JOIN Platform_Support_Games PSG ON G.GameID = PSG.GameID
-                GROUP BY G.GameID
-                HAVING PlatformCount > %s
-            ) AS CompatibleGames
-            INNER JOIN Developer_Games DG ON CompatibleGames.GameID = DG.GameID
+            FROM Game_Platform_Count GPC
+            INNER JOIN Developer_Games DG ON GPC.GameID = DG.GameID
             INNER JOIN Developer D ON DG.DeveloperID = D.DeveloperID
+            WHERE GPC.PlatformCount > %s
             GROUP BY D.DeveloperID
             ORDER BY GameCount DESC
         """
     elif role == "Publisher":
         query = """
             SELECT P.PublisherName, COUNT(*) AS GameCount
-            FROM (
-                SELECT G.GameID, COUNT(DISTINCT PSG.PlatformID) AS PlatformCount
-                FROM Games G
-                INNER JOIN Platform_Support_Games PSG ON G.GameID = PSG.GameID
-                GROUP BY G.GameID
-                HAVING PlatformCount > %s
-            ) AS CompatibleGames
-            INNER JOIN Publisher_Games PG ON CompatibleGames.GameID = PG.GameID
+            FROM Game_Platform_Count GPC
+            INNER JOIN Publisher_Games PG ON GPC.GameID = PG.GameID
             INNER JOIN Publisher P ON PG.PublisherID = P.PublisherID
+            WHERE GPC.PlatformCount > %s
             GROUP BY P.PublisherID
             ORDER BY GameCount DESC
         """
@@ -260,38 +809,99 @@ def q_dev_pub_compatibility(cursorObject, role, platform_threshold):
     return cursorObject.fetchall()
 
 
+@cached("Game_Platform_Count", "Platform_Support_Games", "Developer_Games", "Developer", "Publisher_Games", "Publisher")
+def q_dev_pub_compatibility_page(cursorObject, role, platform_threshold, page_size=50, token=None):
+    """q_dev_pub_compatibility one page at a time; ties on GameCount are broken by ID."""
+    scope = ("q_dev_pub_compatibility", role, platform_threshold)
+    if role == "Developer":
+        cond, params = after_token(scope, token, [("GameCount", "DESC"), ("D.DeveloperID", "ASC")])
+        query = f"""
+            SELECT D.DeveloperID, D.DeveloperName, COUNT(*) AS GameCount
+            FROM Game_Platform_Count GPC
+            INNER JOIN Developer_Games DG ON GPC.GameID = DG.GameID
+            INNER JOIN Developer D ON DG.DeveloperID = D.DeveloperID
+            WHERE GPC.PlatformCount > %s
+            GROUP BY D.DeveloperID
+            HAVING {cond}
+            ORDER BY GameCount DESC, D.DeveloperID ASC
+            LIMIT %s
+        """
+    elif role == "Publisher":
+        cond, params = after_token(scope, token, [("GameCount", "DESC"), ("P.PublisherID", "ASC")])
+        query = f"""
+            SELECT P.PublisherID, P.PublisherName, COUNT(*) AS GameCount
+            FROM Game_Platform_Count GPC
+            INNER JOIN Publisher_Games PG ON GPC.GameID = PG.GameID
+            INNER JOIN Publisher P ON PG.PublisherID = P.PublisherID
+            WHERE GPC.PlatformCount > %s
+            GROUP BY P.PublisherID
+            HAVING {cond}
+            ORDER BY GameCount DESC, P.PublisherID ASC
+            LIMIT %s
+        """
+    else:
+        return [], None
+
+    rows, next_token = fetch_page(cursorObject, query, [platform_threshold, *params], page_size, scope,
+                                  lambda row: (row[2], row[0]))
+    return [row[1:] for row in rows], next_token
+
+
 ########################### Platform ############################
-def q_platform_exclusive_games(cursorObject, platform_name): #### Add queries attributes
+@cached("Game_Platform_Count", "Games", "Platform_Support_Games", "Platform")
+def q_platform_exclusive_games(cursorObject, platform_name, limit=20):
+    """
+    The first `limit` games, by GameID, sold on platform_name and no other
+    platform. Returns [(Name,)].
+    """
+    # an equality probe on idx_gpc_sole instead of excluding every game on
+    # another platform; a constant PlatformID lets the index order serve
+    # the ORDER BY (the lowest ID wins should two platforms share a name)
     sql = """
-        SELECT g.Name
-        FROM Games g
-        JOIN Platform_Support_Games p ON g.GameID = p.GameID
-        JOIN Platform pf ON pf.PlatformID = p.PlatformID
-        WHERE pf.PlatformName = %s
-        AND g.GameID NOT IN (
-            SELECT p2.GameID
-            FROM Platform_Support_Games p2
-            JOIN Platform pf2 ON p2.PlatformID = pf2.PlatformID
-            WHERE pf2.PlatformName != %s
-        )
-        LIMIT 20;
+        SELECT G.Name
+        FROM Game_Platform_Count GPC
+        JOIN Games G ON G.GameID = GPC.GameID
+        WHERE GPC.SolePlatformID = (SELECT MIN(PlatformID) FROM Platform WHERE PlatformName = %s)
+        ORDER BY GPC.GameID
+        LIMIT %s;
     """
-    cursorObject.execute(sql, (platform_name, platform_name))
+    cursorObject.execute(sql, (platform_name, limit))
     return cursorObject.fetchall()
 
 
+@cached("Game_Platform_Count", "Games", "Platform_Support_Games", "Platform")
+def q_platform_exclusive_games_page(cursorObject, platform_name, page_size=100, token=None):
+    """q_platform_exclusive_games one page at a time, ordered by GameID."""
+    scope = ("q_platform_exclusive_games", platform_name)
+    cond, params = after_token(scope, token, [("GPC.GameID", "ASC")])
+    sql = f"""
+        SELECT GPC.GameID, G.Name
+        FROM Game_Platform_Count GPC
+        JOIN Games G ON G.GameID = GPC.GameID
+        WHERE GPC.SolePlatformID = (SELECT MIN(PlatformID) FROM Platform WHERE PlatformName = %s) AND {cond}
+        ORDER BY GPC.GameID
+        LIMIT %s
+    """
+    rows, next_token = fetch_page(cursorObject, sql, [platform_name, *params], page_size, scope,
+                                  lambda row: (row[0],))
+    return [row[1:] for row in rows], next_token
+
+
+@cached("Platform_Revenue", "Platform_Support_Games", "Platform", "Games")
 def q_platform_revenue(cursorObject, platform_name, year): #### Add queries attributes
+    if column_store.enabled:
+        return column_store.platform_revenue(cursorObject, platform_name, year)
     sql = """
-        SELECT SUM(g.UnitsSold * psg.Price) AS EstimatedRevenue
-        FROM Platform_Support_Games psg
-        JOIN Platform pf ON pf.PlatformID = psg.PlatformID
-        JOIN Games g ON psg.GameID = g.GameID
-        WHERE pf.PlatformName = %s AND YEAR(psg.IssuedTime) = %s;
+        SELECT SUM(pr.Revenue) AS EstimatedRevenue
+        FROM Platform_Revenue pr
+        JOIN Platform pf ON pf.PlatformID = pr.PlatformID
+        WHERE pf.PlatformName = %s AND pr.IssuedYear = %s;
     """
-    cursorObject.execute(sql, (platform_name, year))
+    cursorObject.execute(sql, (platform_name, int(year)))
     return cursorObject.fetchone()  # returns (revenue,)
 
 
+@cached("Player_Use_Platform", "Platform")
 def q_platform_user(cursorObject, platform_name, min_hours): #### Add queries attributes
     sql = """
         SELECT COUNT(*) 
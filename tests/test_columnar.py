@@ -0,0 +1,104 @@
+"""
+Every query column_store answers returns the rows of its SQL counterpart,
+on a fresh snapshot and after rows are appended to it. Runs on the SQLite
+backend and needs NumPy:
+
+    python -m unittest discover tests
+"""
+import contextlib, io, os, sys, tempfile, unittest
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import backend, benchmark, initialize, queries
+from cache import query_cache
+from columnar import column_store
+
+
+def normalized(rows):
+    """
+    Rows in a comparable form: SQLite sums DECIMAL columns as floats, the
+    column store in cents, so both are rounded to two places, and rows
+    tied in the sort key may come in either order.
+    """
+    out = []
+    for row in rows:
+        row = row if isinstance(row, tuple) else (row,)
+        out.append(tuple(round(Decimal(str(v)), 2) if isinstance(v, (float, Decimal)) else v for v in row))
+    return sorted(out, key=repr)
+
+
+@unittest.skipUnless(column_store.available(), "the column store needs NumPy")
+class ColumnarTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_enabled, self.store_enabled = query_cache.enabled, column_store.enabled
+        query_cache.enabled = False
+        column_store.clear()
+        self.folder = tempfile.TemporaryDirectory()
+        self.connection = backend.SQLiteBackend(os.path.join(self.folder.name, "GameInfo.sqlite3")).connect()
+        self.cursorObject = self.connection.cursor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            initialize.initialize(self.cursorObject, "GameInfo")
+
+    def tearDown(self):
+        query_cache.enabled, column_store.enabled = self.cache_enabled, self.store_enabled
+        column_store.clear()
+        self.connection.close()
+        self.folder.cleanup()
+
+    def cases(self):
+        """The benchmark's columnar cases plus every platform and year that has sales."""
+        cases = [(label, fn, params) for label, fn, params in
+                 benchmark.query_cases(benchmark.sample_params(self.cursorObject))
+                 if fn.__name__ in benchmark.COLUMNAR_QUERIES]
+        self.cursorObject.execute("""
+            SELECT DISTINCT PF.PlatformName, YEAR(PSG.IssuedTime) FROM Platform PF
+            JOIN Platform_Support_Games PSG ON PSG.PlatformID = PF.PlatformID
+            WHERE PSG.IssuedTime IS NOT NULL
+        """)
+        cases += [(f"q_platform_revenue[{name}, {year}]", queries.q_platform_revenue, (name, year))
+                  for name, year in self.cursorObject.fetchall()]
+        for role in ("Developer", "Publisher"):
+            cases.append((f"q_dev_pub_revenues[{role}, all]", queries.q_dev_pub_revenues, (role, 1900, 2100, 10000)))
+        return cases
+
+    def assertSameRows(self):
+        cases = self.cases()
+        self.assertTrue(cases)
+        for label, fn, params in cases:
+            with self.subTest(label):
+                column_store.enabled = False
+                expected = fn(self.cursorObject, *params)
+                column_store.enabled = True
+                self.assertEqual(normalized(fn(self.cursorObject, *params)), normalized(expected))
+
+    def test_snapshot(self):
+        self.assertSameRows()
+        self.assertGreater(column_store.stats()["loads"], 0)
+
+    def test_after_import(self):
+        column_store.load(self.cursorObject)
+        self.cursorObject.execute("SELECT GameID FROM Games ORDER BY GameID LIMIT 1")
+        game = self.cursorObject.fetchone()[0]
+        self.cursorObject.execute("SELECT DeveloperID FROM Developer WHERE DeveloperID NOT IN "
+                                  "(SELECT DeveloperID FROM Developer_Games WHERE GameID = %s) LIMIT 1", (game,))
+        developer = self.cursorObject.fetchone()[0]
+        self.cursorObject.execute("SELECT PlatformID FROM Platform WHERE PlatformID NOT IN "
+                                  "(SELECT PlatformID FROM Platform_Support_Games WHERE GameID = %s) LIMIT 1", (game,))
+        platform = self.cursorObject.fetchone()[0]
+        appended = column_store.appended
+        with contextlib.redirect_stdout(io.StringIO()):
+            header = ["GameID", "DeveloperID", "DevelopeFinishYear"]
+            initialize.import_rows(self.cursorObject, "Developer_Games", header,
+                                   [[str(game), str(developer), "2015"]], header)
+            header = ["GameID", "PlatformID", "Price", "IssuedTime"]
+            initialize.import_rows(self.cursorObject, "Platform_Support_Games", header,
+                                   [[str(game), str(platform), "19.99", "2015-06-01"]], header)
+        self.assertEqual(column_store.appended, appended + 2)
+        self.assertSameRows()
+
+
+if __name__ == "__main__":
+    unittest.main()
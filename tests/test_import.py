@@ -0,0 +1,133 @@
+"""
+ID blocks from allocate_ids() and row-level rejection in import_rows(),
+on the SQLite backend:
+
+    python -m unittest discover tests
+"""
+import contextlib, csv, io, os, sys, tempfile, threading, unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import backend, initialize
+
+
+class ImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.store = backend.SQLiteBackend(os.path.join(self.folder.name, "GameInfo.sqlite3"))
+        self.connection = self.store.connect()
+        self.cursorObject = self.connection.cursor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            initialize.initialize(self.cursorObject, "GameInfo")
+
+    def tearDown(self):
+        self.connection.close()
+        self.folder.cleanup()
+
+    def value(self, query, params=()):
+        """The single value a query returns."""
+        self.cursorObject.execute(query, params)
+        return self.cursorObject.fetchone()[0]
+
+    def test_blocks_do_not_overlap(self):
+        top = self.value("SELECT MAX(GameID) FROM Games")
+        other = self.store.connect()
+        try:
+            first = initialize.allocate_ids(self.cursorObject, "Games", 10)
+            second = initialize.allocate_ids(other.cursor(), "Games", 5)
+        finally:
+            other.close()
+        self.assertEqual(first, top + 1)
+        # the second block starts where the first ends, on another connection
+        self.assertEqual(second, first + 10)
+
+    def test_concurrent_blocks_are_disjoint(self):
+        blocks, errors = [], []
+
+        def allocate():
+            connection = self.store.connect()
+            try:
+                cursor = connection.cursor()
+                for count in (1, 7, 3, 12):
+                    start = initialize.allocate_ids(cursor, "Player", count)
+                    blocks.append(range(start, start + count))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=allocate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        ids = [i for block in blocks for i in block]
+        self.assertEqual(len(ids), 4 * (1 + 7 + 3 + 12))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertGreater(min(ids), self.value("SELECT MAX(UserID) FROM Player"))
+
+    def test_counter_follows_rows_inserted_directly(self):
+        start = initialize.allocate_ids(self.cursorObject, "Games", 2)
+        self.cursorObject.execute("INSERT INTO Games (GameID, Name, ReleaseDate) VALUES (%s, 'Direct', '2020-01-01')",
+                                  (start + 100,))
+        self.cursorObject.execute("COMMIT")
+        self.assertEqual(initialize.allocate_ids(self.cursorObject, "Games"), start + 101)
+
+    def test_blocks_per_game(self):
+        self.cursorObject.execute("SELECT GameID FROM Games ORDER BY GameID LIMIT 2")
+        game, other_game = [row[0] for row in self.cursorObject.fetchall()]
+        top = self.value("SELECT IFNULL(MAX(AchievementID), 0) FROM Achievement WHERE GameID = %s", (game,))
+        other_top = self.value("SELECT IFNULL(MAX(AchievementID), 0) FROM Achievement WHERE GameID = %s",
+                               (other_game,))
+        self.assertEqual(initialize.allocate_ids(self.cursorObject, "Achievement", 3, game), top + 1)
+        self.assertEqual(initialize.allocate_ids(self.cursorObject, "Achievement", 2, other_game), other_top + 1)
+        self.assertEqual(initialize.allocate_ids(self.cursorObject, "Achievement", 1, game), top + 4)
+
+    def test_bad_rows_rejected_others_committed(self):
+        text = """Name,Genre,UnitsSold,ReleaseDate
+Import One,Action,10,2020-01-01
+Import Two,Action,many,2020-01-02
+Import Three,Action,30,2020-02-30
+
+Import Four,Action,40,2020-01-04
+Import Five,Action
+"""
+        header, *rows = csv.reader(io.StringIO(text))
+        games = self.value("SELECT COUNT(*) FROM Games")
+        report = initialize.import_rows(self.cursorObject, "Games", header, rows, header)
+
+        self.assertEqual([line for line, _ in report["errors"]], [3, 4, 7])
+        self.assertIn("UnitsSold", report["errors"][0][1])
+        self.assertIn("ReleaseDate", report["errors"][1][1])
+        self.assertEqual(report["inserted"], 2)
+        self.cursorObject.execute("SELECT GameID, Name FROM Games WHERE Name LIKE 'Import %' ORDER BY GameID")
+        committed = self.cursorObject.fetchall()
+        self.assertEqual([name for _, name in committed], ["Import One", "Import Four"])
+        self.assertEqual((report["first_id"], report["last_id"]), (committed[0][0], committed[-1][0]))
+        self.assertEqual(self.value("SELECT COUNT(*) FROM Games"), games + 2)
+
+    def test_rows_the_database_refuses(self):
+        self.cursorObject.execute("SELECT GameID, DeveloperID FROM Developer_Games LIMIT 1")
+        game, developer = self.cursorObject.fetchone()
+        self.cursorObject.execute("SELECT GameID FROM Games WHERE GameID NOT IN "
+                                  "(SELECT GameID FROM Developer_Games WHERE DeveloperID = %s) LIMIT 2", (developer,))
+        free = [row[0] for row in self.cursorObject.fetchall()]
+        header = ["GameID", "DeveloperID", "DevelopeFinishYear"]
+        rows = [[str(free[0]), str(developer), "2020"],
+                [str(game), str(developer), "2021"],  # already there
+                [str(free[1]), str(developer), "2022"]]
+        # one batch: the rejected one is retried row by row
+        report = initialize.import_rows(self.cursorObject, "Developer_Games", header, rows, header, batch_size=10)
+
+        self.assertEqual([line for line, _ in report["errors"]], [3])
+        self.assertEqual(report["inserted"], 2)
+        for game_id in free:
+            self.assertEqual(self.value("SELECT COUNT(*) FROM Developer_Games WHERE GameID = %s AND DeveloperID = %s",
+                                        (game_id, developer)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
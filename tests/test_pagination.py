@@ -0,0 +1,115 @@
+"""
+Walking a *_page query to its end returns the rows of the unpaginated
+query exactly once, also across ties and NULLs in the sort key. Runs on
+the SQLite backend:
+
+    python -m unittest discover tests
+"""
+import contextlib, io, os, sys, tempfile, unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import backend, initialize, queries
+from cache import query_cache
+
+GENRE = "Pagination Test"
+# UnitsSold with runs of ties and NULLs, ReleaseDate with ties
+UNITS = [5, None, 5, 10, None, 5, 10, 1, None, 5, 10, 10, 1, None, 5, 7, 7, None, 3, 5, 10, None, 2]
+DATES = ["2020-01-01", "2019-05-05", "2020-01-01", "2021-12-31"]
+
+
+class PaginationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.connection = backend.SQLiteBackend(os.path.join(self.folder.name, "GameInfo.sqlite3")).connect()
+        self.cursorObject = self.connection.cursor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            initialize.initialize(self.cursorObject, "GameInfo")
+        # every page is read from the database, not from a previous test's results
+        self.cache_enabled = query_cache.enabled
+        query_cache.enabled = False
+
+    def tearDown(self):
+        query_cache.enabled = self.cache_enabled
+        self.connection.close()
+        self.folder.cleanup()
+
+    def walk(self, page, *args, page_size):
+        """Every row of a *_page query, page by page."""
+        rows, token = page(self.cursorObject, *args, page_size=page_size)
+        pages = 1
+        while token is not None:
+            self.assertLessEqual(pages, 1000, "the tokens do not advance")
+            more, token = page(self.cursorObject, *args, page_size=page_size, token=token)
+            self.assertTrue(more, "a page before the last one is empty")
+            rows += more
+            pages += 1
+        return rows
+
+    def all_rows(self, query, params=()):
+        self.cursorObject.execute(query, params)
+        return [tuple(row) for row in self.cursorObject.fetchall()]
+
+    def test_game_genre_pages(self):
+        report = initialize.import_rows(
+            self.cursorObject, "Games", ["Name", "Genre", "UnitsSold", "ReleaseDate"],
+            [[f"Paged {i}", GENRE, "" if units is None else str(units), DATES[i % len(DATES)]]
+             for i, units in enumerate(UNITS)],
+            ["Name", "Genre", "UnitsSold", "ReleaseDate"])
+        self.assertEqual(report["errors"], [])
+
+        for column in queries.GENRE_ORDER_COLUMNS:
+            for order in ("ASC", "DESC"):
+                expected = self.all_rows(f"""
+                    SELECT GameID, Name, {column} FROM Games WHERE Genre = %s
+                    ORDER BY {column} {order}, GameID {order}
+                """, (GENRE,))
+                self.assertEqual(len(expected), len(UNITS))
+                for page_size in (1, 2, 5, len(UNITS), len(UNITS) + 1):
+                    with self.subTest(column=column, order=order, page_size=page_size):
+                        rows = [tuple(row) for row in
+                                self.walk(queries.q_game_genre_page, GENRE, column, order, page_size=page_size)]
+                        self.assertEqual(rows, expected)
+                        self.assertEqual(len(set(rows)), len(rows))
+
+    def test_user_purchases_pages(self):
+        self.cursorObject.execute("SELECT UserID FROM Player ORDER BY UserID LIMIT 1")
+        user_id = self.cursorObject.fetchone()[0]
+        self.cursorObject.execute("DELETE FROM Player_Platform_Games_Play WHERE PlayerID = %s", (user_id,))
+        self.cursorObject.execute("SELECT GameID, PlatformID FROM Platform_Support_Games ORDER BY GameID, PlatformID")
+        supported = self.cursorObject.fetchall()[:20]
+        # ties on PurchaseTime and purchases without one
+        times = ["2024-01-01 10:00:00", None, "2024-01-01 10:00:00", "2023-06-01 08:30:00", None]
+        self.cursorObject.executemany(
+            "INSERT INTO Player_Platform_Games_Play (GameID, PlatformID, PlayerID, PurchasePrice, PurchaseTime) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(game, platform, user_id, "9.99", times[i % len(times)]) for i, (game, platform) in enumerate(supported)])
+        self.cursorObject.execute("COMMIT")
+
+        expected = [row[:4] for row in self.all_rows("""
+            SELECT G.Name, PF.PlatformName, PPGP.PurchasePrice, PPGP.PurchaseTime
+            FROM Player_Platform_Games_Play AS PPGP
+            JOIN Games G ON G.GameID = PPGP.GameID
+            JOIN Platform PF ON PF.PlatformID = PPGP.PlatformID
+            WHERE PPGP.PlayerID = %s
+            ORDER BY PPGP.PurchaseTime DESC, PPGP.GameID DESC, PPGP.PlatformID DESC
+        """, (user_id,))]
+        self.assertEqual(len(expected), len(supported))
+        self.assertEqual(sorted(expected, key=repr),
+                         sorted((tuple(row) for row in queries.q_user_purchases(self.cursorObject, user_id)), key=repr))
+        for page_size in (1, 3, 7, len(supported)):
+            with self.subTest(page_size=page_size):
+                rows = [tuple(row) for row in self.walk(queries.q_user_purchases_page, user_id, page_size=page_size)]
+                self.assertEqual(rows, expected)
+
+    def test_token_of_another_query(self):
+        _, token = queries.q_game_genre_page(self.cursorObject, "Action", "UnitsSold", "DESC", page_size=1)
+        self.assertIsNotNone(token)
+        with self.assertRaises(ValueError):
+            queries.q_game_genre_page(self.cursorObject, "Action", "UnitsSold", "ASC", page_size=1, token=token)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+The trigger-maintained summary tables agree with a fresh rebuild after
+rows are imported through the application. Runs on the SQLite backend:
+
+    python -m unittest discover tests
+"""
+import contextlib, io, os, random, sys, tempfile, unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import backend, initialize
+
+
+class TriggerSummaryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.connection = backend.SQLiteBackend(os.path.join(self.folder.name, "GameInfo.sqlite3")).connect()
+        self.cursorObject = self.connection.cursor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            initialize.initialize(self.cursorObject, "GameInfo")
+        self.random = random.Random(1)
+
+    def tearDown(self):
+        self.connection.close()
+        self.folder.cleanup()
+
+    def column(self, query):
+        self.cursorObject.execute(query)
+        return [row[0] for row in self.cursorObject.fetchall()]
+
+    def insert(self, table, columns, rows):
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = initialize.import_rows(self.cursorObject, table, columns, rows, columns)
+        self.assertEqual(report["errors"], [], table)
+        return report
+
+    def price(self):
+        # cents that floating point cannot hold exactly
+        return f"{self.random.randint(1, 9999) / 100:.2f}"
+
+    def test_summaries_consistent_after_inserts(self):
+        rng = self.random
+        users = self.column("SELECT UserID FROM Player")
+        self.cursorObject.execute("SELECT GameID, PlatformID FROM Platform_Support_Games")
+        supported = self.cursorObject.fetchall()
+        self.cursorObject.execute("SELECT GameID, PlatformID, PlayerID FROM Player_Platform_Games_Play")
+        played = set(self.cursorObject.fetchall())
+
+        rows = []
+        while len(rows) < 300:
+            game, platform = rng.choice(supported)
+            key = (game, platform, rng.choice(users))
+            if key not in played:
+                played.add(key)
+                rows.append([str(value) for value in key] + ["3", self.price(), "2025-03-01 10:00:00", "2025-02-01"])
+        self.insert("Player_Platform_Games_Play", ["GameID", "PlatformID", "PlayerID", "TotalPlayingTime",
+                                                  "PurchasePrice", "LastPlayTime", "PurchaseTime"], rows)
+
+        games = self.insert("Games", ["Name", "Genre", "UnitsSold", "ReleaseDate"],
+                            [[f"Test Game {i}", "Action", str(rng.randint(1, 999)), "2020-01-01"] for i in range(20)])
+        new = range(games["first_id"], games["last_id"] + 1)
+        platforms = self.column("SELECT PlatformID FROM Platform")
+        developers = self.column("SELECT DeveloperID FROM Developer LIMIT 3")
+        publishers = self.column("SELECT PublisherID FROM Publisher LIMIT 3")
+        developed = [[str(game), str(rng.choice(developers)), "2020"] for game in new]
+        # half the developers before the prices, half after: both triggers add revenue
+        self.insert("Developer_Games", ["GameID", "DeveloperID", "DevelopeFinishYear"], developed[:10])
+        self.insert("Platform_Support_Games", ["GameID", "PlatformID", "Price", "IssuedTime"],
+                    [[str(game), str(platform), self.price(), "2020-01-01"]
+                     for game in new for platform in rng.sample(platforms, 3)])
+        self.insert("Developer_Games", ["GameID", "DeveloperID", "DevelopeFinishYear"], developed[10:])
+        self.insert("Publisher_Games", ["GameID", "PublisherID", "PublishYear"],
+                    [[str(game), str(rng.choice(publishers)), "2020"] for game in new])
+
+        self.cursorObject.execute("SELECT AchievementID, GameID, PlayerID FROM Player_Unlock_Achievement")
+        unlocked = set(self.cursorObject.fetchall())
+        self.cursorObject.execute("SELECT AchievementID, GameID FROM Achievement")
+        unlocks = []
+        for achievement, game in rng.sample(self.cursorObject.fetchall(), 40):
+            player = rng.choice(users)
+            if (achievement, game, player) not in unlocked:
+                unlocks.append([str(game), str(achievement), str(player), "2026-05-05"])
+        self.insert("Player_Unlock_Achievement", ["GameID", "AchievementID", "PlayerID", "GainTime"], unlocks)
+        self.insert("Player", ["UserName", "Region"], [["Test Player", "EU"]])
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(initialize.check_summaries(self.cursorObject), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
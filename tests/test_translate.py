@@ -0,0 +1,44 @@
+"""
+The MySQL-to-SQLite rewrites in backend.translate() leave quoted strings
+and identifiers alone:
+
+    python -m unittest discover tests
+"""
+import os, sys, tempfile, unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import backend
+
+
+class TranslateTest(unittest.TestCase):
+
+    def test_rewrites_outside_quotes(self):
+        self.assertEqual(backend.translate("SELECT a / b FROM t WHERE c = %s"),
+                         ("SELECT a * 1.0 / b FROM t WHERE c = ?",))
+
+    def test_quoted_text_kept(self):
+        sql = "SELECT 'x / y', '50%s', 'it''s; %s', \"a / b\", `c / d` FROM t WHERE e = %s"
+        self.assertEqual(backend.translate(sql),
+                         ("SELECT 'x / y', '50%s', 'it''s; %s', \"a / b\", `c / d` FROM t WHERE e = ?",))
+
+    def test_separator_literal(self):
+        statements = backend.translate("SELECT GROUP_CONCAT(Name ORDER BY Name SEPARATOR ' / ') FROM t")
+        self.assertEqual(len(statements), 1)
+        self.assertIn("' / '", statements[0])
+        self.assertNotIn("SEPARATOR", statements[0])
+
+    def test_literals_reach_sqlite(self):
+        with tempfile.TemporaryDirectory() as folder:
+            connection = backend.SQLiteBackend(os.path.join(folder, "t.sqlite3")).connect()
+            try:
+                cursorObject = connection.cursor()
+                cursorObject.execute("SELECT '1 / 2', 1 / 2, '%s', %s", ("x",))
+                self.assertEqual(cursorObject.fetchone(), ("1 / 2", 0.5, "%s", "x"))
+            finally:
+                connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()